@@ -0,0 +1,67 @@
+# bench_clean.py
+# 정제기 마이크로 벤치마크: 예전 정규식 체인 vs arxiv_clean 단일 패스 (MB/s)
+# 결과가 바이트 단위로 같은지도 함께 확인
+# 예) python bench/bench_clean.py --raw output/2310.08754v4.raw.txt --repeat 20
+import argparse, pathlib, re, sys, time, unicodedata
+
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parent.parent / "clerk"))
+from arxiv_clean import clean_arxiv_text
+
+def clean_arxiv_text_legacy(text: str) -> str:
+    # 04-1-1-1-1.py 에 있던 원래 구현 (비교 기준)
+    text = unicodedata.normalize("NFKC", text)
+    lines = []
+    for line in text.splitlines():
+        if re.search(r'arXiv:\d{4}\.\d{5,}(v\d+)?', line):
+            continue
+        if re.match(r'^\s*\d+\s*$', line):
+            continue
+        lines.append(line.rstrip())
+    text = "\n".join(lines)
+    text = re.sub(r'(\w)-\n(\w)', r'\1\2', text)
+    text = text.replace("\r", "")
+    text = re.sub(r'\n{2,}', '<<<PARA>>>', text)
+    text = re.sub(r'\n', ' ', text)
+    text = re.sub(r'\s*<<<PARA>>>\s*', '\n\n', text)
+    text = re.sub(
+        r'\s*(^|\n)(\d+(\.\d+)*\s+[A-Z][^\n]{1,120})\s*',
+        lambda m: f"\n\n{m.group(2).strip()}\n\n",
+        text
+    )
+    text = re.sub(r'(Figure\s+\d+\s*:)', r'[FIGURE] \1', text, flags=re.IGNORECASE)
+    text = re.sub(r'(Table\s+\d+\s*:)',  r'[TABLE] \1',  text, flags=re.IGNORECASE)
+    text = re.sub(r'[ \t]{2,}', ' ', text)
+    text = re.sub(r'\n{3,}', '\n\n', text).strip()
+    return text
+
+def best_time(fn, text, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        out = fn(text)
+        best = min(best, time.perf_counter() - t0)
+    return best, out
+
+def main():
+    parser = argparse.ArgumentParser(description="clean_arxiv_text micro-benchmark")
+    parser.add_argument("--raw", default="output/2310.08754v4.raw.txt", help="Raw text extracted from a PDF")
+    parser.add_argument("--scale", type=int, default=1, help="Repeat the raw text this many times")
+    parser.add_argument("--repeat", type=int, default=20, help="Timed runs per implementation (best is reported)")
+    args = parser.parse_args()
+
+    raw = pathlib.Path(args.raw).read_text(encoding="utf-8")
+    text = "\n\n".join([raw] * args.scale)
+    mb = len(text.encode("utf-8")) / 1e6
+
+    t_old, out_old = best_time(clean_arxiv_text_legacy, text, args.repeat)
+    t_new, out_new = best_time(clean_arxiv_text, text, args.repeat)
+    print(f"input: {args.raw} x{args.scale} ({mb:.2f} MB)")
+    print(f"  legacy regex chain : {t_old * 1000:8.2f} ms  {mb / t_old:7.1f} MB/s")
+    print(f"  single-pass        : {t_new * 1000:8.2f} ms  {mb / t_new:7.1f} MB/s  ({t_old / t_new:.2f}x)")
+    if out_old != out_new:
+        print("[Error] 출력이 예전 구현과 다릅니다.", file=sys.stderr)
+        sys.exit(1)
+    print("  output: byte-identical")
+
+if __name__ == "__main__":
+    main()
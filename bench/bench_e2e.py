@@ -0,0 +1,110 @@
+# bench_e2e.py
+# 로컬 Gemini 대역(fake_gemini)으로 전 구간 벤치마크 (API 키/네트워크 불필요)
+# - clerk: 04-1-1-1-1.py 를 --workers 값마다 실행해 wall / req/s / chunks/s / 지연 백분위 비교
+# - chat : 03-1-2-2.py 대화 루프에 턴 N개를 흘려 넣어 turns/s / 지연 백분위
+# 예) python bench/bench_e2e.py clerk --workers 1,4,8 --latency-ms 300
+#     python bench/bench_e2e.py chat --turns 30 --stream --error-429 0.05
+import argparse, builtins, contextlib, io, pathlib, runpy, shlex, sys, tempfile, time
+
+ROOT = pathlib.Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT / "bench"))
+import fake_gemini
+
+CLERK = ROOT / "clerk" / "04-1-1-1-1.py"
+CHAT = ROOT / "chatbot" / "03-1-2-2.py"
+SUMMARY_SEP = "\n\n---\n\n"
+
+def run_script(script, argv, stdin_lines=None):
+    # 스크립트를 __main__ 으로 실행 (출력은 버리고, sys.exit 는 실패로 처리)
+    saved_argv, saved_path0, saved_input = sys.argv, sys.path[0], builtins.input
+    sys.argv = [str(script)] + argv
+    sys.path[0] = str(script.parent)
+    if stdin_lines is not None:
+        lines = iter(stdin_lines)
+        def fake_input(prompt=""):
+            try:
+                return next(lines)
+            except StopIteration:
+                raise EOFError
+        builtins.input = fake_input
+    out, err = io.StringIO(), io.StringIO()
+    try:
+        with contextlib.redirect_stdout(out), contextlib.redirect_stderr(err):
+            runpy.run_path(str(script), run_name="__main__")
+    except SystemExit as e:
+        if e.code:
+            sys.stderr.write(err.getvalue())
+            raise RuntimeError(f"{script.name} exited with {e.code}")
+    finally:
+        sys.argv, builtins.input = saved_argv, saved_input
+        sys.path[0] = saved_path0
+    return out.getvalue()
+
+def report(label, wall, units, unit_name):
+    lat = fake_gemini.STATS["latencies"]
+    calls = fake_gemini.STATS["calls"]
+    print(f"{label:>10} | {wall:>7.2f} | {calls:>5} | {calls / wall:>6.2f} | {units / wall:>8.2f} {unit_name:<8} | "
+          f"{fake_gemini.percentile(lat, 50) * 1000:>6.0f} | {fake_gemini.percentile(lat, 95) * 1000:>6.0f} | "
+          f"{fake_gemini.percentile(lat, 99) * 1000:>6.0f} | {fake_gemini.STATS['errors']:>4}")
+
+def header():
+    print(f"{'run':>10} | {'wall s':>7} | {'reqs':>5} | {'req/s':>6} | {'throughput':>17} | "
+          f"{'p50 ms':>6} | {'p95 ms':>6} | {'p99 ms':>6} | {'errs':>4}")
+
+def bench_clerk(args):
+    header()
+    for w in [int(x) for x in args.workers.split(",")]:
+        with tempfile.TemporaryDirectory() as tmp:
+            argv = ["--pdf", args.pdf, "--outdir", tmp, "--workers", str(w)]
+            if not args.cache:
+                argv.append("--no-cache")
+            argv += shlex.split(args.clerk_args)
+            fake_gemini.reset_stats()
+            t0 = time.perf_counter()
+            run_script(CLERK, argv)
+            wall = time.perf_counter() - t0
+            summaries = next(pathlib.Path(tmp).glob("*.chunk_summaries.txt"))
+            n_chunks = len(summaries.read_text(encoding="utf-8").split(SUMMARY_SEP))
+            report(f"workers={w}", wall, n_chunks, "chunks/s")
+
+def bench_chat(args):
+    header()
+    argv = shlex.split(args.chat_args) + (["--stream"] if args.stream else [])
+    turns = [f"{n}번째 질문: 감자는 어떻게 자라?" for n in range(1, args.turns + 1)]
+    fake_gemini.reset_stats()
+    t0 = time.perf_counter()
+    run_script(CHAT, argv, stdin_lines=turns)
+    wall = time.perf_counter() - t0
+    report("chat", wall, args.turns, "turns/s")
+    # 턴마다 다시 보내는 히스토리 비용 (히스토리 요약 호출 포함)
+    tokens = fake_gemini.STATS["prompt_tokens"]
+    if tokens:
+        print(f"prompt tokens: {sum(tokens)} total ({fake_gemini.STATS['cached_tokens']} cached), "
+              f"{max(tokens)} max per request, {tokens[-1]} last request")
+
+def main():
+    parser = argparse.ArgumentParser(description="End-to-end benchmark against the local Gemini stand-in")
+    sub = parser.add_subparsers(dest="target", required=True)
+    clerk = sub.add_parser("clerk", help="PDF summary pipeline (clerk/04-1-1-1-1.py)")
+    clerk.add_argument("--pdf", default=str(ROOT / "data" / "2310.08754v4.pdf"), help="Input PDF")
+    clerk.add_argument("--workers", default="1,4,8", help="Comma-separated --workers values")
+    clerk.add_argument("--cache", action="store_true", help="Keep the response cache on (cold cache per run)")
+    clerk.add_argument("--clerk-args", default="", help="Extra arguments for 04-1-1-1-1.py")
+    chat = sub.add_parser("chat", help="Multi-turn chat loop (chatbot/03-1-2-2.py)")
+    chat.add_argument("--turns", type=int, default=20, help="Messages to send")
+    chat.add_argument("--stream", action="store_true", help="Use streaming replies")
+    chat.add_argument("--chat-args", default="", help="Extra arguments for 03-1-2-2.py")
+    for p in (clerk, chat):
+        fake_gemini.add_arguments(p)
+    args = parser.parse_args()
+
+    fake_gemini.install_from_args(args)
+    print(f"fake_gemini: latency {args.latency_ms:.0f} ms (sigma {args.sigma}), "
+          f"{args.tokens_per_sec:.0f} tok/s, 429 {args.error_429:.0%}, 500 {args.error_500:.0%}")
+    if args.target == "clerk":
+        bench_clerk(args)
+    else:
+        bench_chat(args)
+
+if __name__ == "__main__":
+    main()
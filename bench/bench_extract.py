@@ -0,0 +1,48 @@
+# bench_extract.py
+# 페이지 병렬 추출 벤치마크: workers 1/2/4/8 에서 pages/sec 비교
+# 예) python bench/bench_extract.py --pdf data/2310.08754v4.pdf --pages 800
+import argparse, pathlib, sys, tempfile, time
+import fitz  # PyMuPDF
+
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parent.parent / "clerk"))
+from pdf_extract import extract_pages
+
+def replicate(src, n_pages, dst):
+    # 원본 PDF를 n_pages 이상이 될 때까지 이어 붙여 큰 문서를 만듦
+    with fitz.open(str(src)) as one, fitz.open() as big:
+        while big.page_count < n_pages:
+            big.insert_pdf(one, to_page=min(one.page_count, n_pages - big.page_count) - 1)
+        big.save(str(dst))
+
+def main():
+    parser = argparse.ArgumentParser(description="Parallel PDF extraction benchmark")
+    parser.add_argument("--pdf", default="data/2310.08754v4.pdf", help="Source PDF")
+    parser.add_argument("--pages", type=int, default=800, help="Replicate the source up to this many pages")
+    parser.add_argument("--workers", default="1,2,4,8", help="Comma-separated worker counts")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per worker count (best is reported)")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        big = pathlib.Path(tmp) / "big.pdf"
+        replicate(args.pdf, args.pages, big)
+        print(f"PDF: {big.name} ({args.pages} pages, from {args.pdf})")
+        print(f"{'workers':>7} | {'best s':>8} | {'pages/s':>9} | speedup")
+
+        baseline = None
+        reference = None
+        for w in [int(x) for x in args.workers.split(",")]:
+            best = float("inf")
+            for _ in range(args.repeat):
+                t0 = time.perf_counter()
+                pages = extract_pages(big, workers=w)
+                best = min(best, time.perf_counter() - t0)
+            if reference is None:
+                reference = pages
+            elif pages != reference:
+                print(f"[Error] workers={w}: 결과가 순차 추출과 다릅니다.", file=sys.stderr)
+                sys.exit(1)
+            baseline = baseline or best
+            print(f"{w:>7} | {best:>8.3f} | {len(pages) / best:>9.1f} | {baseline / best:.2f}x")
+
+if __name__ == "__main__":
+    main()
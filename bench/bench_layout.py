@@ -0,0 +1,75 @@
+# bench_layout.py
+# 추출 모드 비교: 평문 get_text("text") + clean_arxiv_text  vs  --layout (get_text("dict") + iter_layout_paragraphs)
+# - 속도: 추출 / 정제 / 합계 pages/s (순차, 가장 빠른 회차)
+# - 청크 품질 (References 앞까지, --max-chars 기본값으로 청크 분할):
+#   제목 단락: "3.1 Method" 처럼 한 단락으로 떨어진 섹션 제목 수
+#   끊긴 단락: 문장 끝이 아닌데 다음 단락이 소문자로 시작 (단/페이지 경계에서 잘림)
+#   숫자 잡음: 공백으로만 이어진 맨 숫자 6개 이상 (그림 눈금/축 값이 본문에 섞인 곳)
+#   중간 시작 청크: 소문자로 시작하는 청크 (문장 중간에서 잘린 청크)
+# 예) python bench/bench_layout.py --pdf data/2310.08754v4.pdf --pages 200
+import argparse, pathlib, re, sys, tempfile, time
+
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parent.parent / "clerk"))
+from arxiv_clean import HEADER_RE, SENTENCE_END, clean_arxiv_text, iter_chunks, iter_layout_paragraphs
+from pdf_extract import extract_pages
+from bench_extract import replicate
+
+TICKS_RE = re.compile(r"(?:(?<!\S)\d+(?:\.\d+)?\s+){5}\d+(?:\.\d+)?(?!\S)")
+
+def clean_text_mode(pages, keep_refs=False):
+    cleaned = clean_arxiv_text("\n\n".join(pages))
+    if not keep_refs:
+        cleaned = re.split(r'\n\s*References\s*\n', cleaned, maxsplit=1)[0]
+    return cleaned.split("\n\n")
+
+def clean_layout_mode(pages, keep_refs=False):
+    return list(iter_layout_paragraphs(pages, keep_refs=keep_refs))
+
+def quality(paras, max_chars):
+    paras = [p for p in paras if p.strip()]
+    headings = sum(bool(HEADER_RE.fullmatch(p)) for p in paras)
+    broken = sum(a[-1] not in SENTENCE_END and b[:1].islower() for a, b in zip(paras, paras[1:]))
+    ticks = sum(len(TICKS_RE.findall(p)) for p in paras)
+    chunks = list(iter_chunks(paras, max_chars=max_chars))
+    mid = sum(c[:1].islower() for c in chunks)
+    return {"paragraphs": len(paras), "headings": headings, "broken": broken, "ticks": ticks,
+            "chunks": len(chunks), "mid_start": mid}
+
+def best_of(repeat, fn, *args):
+    best, out = float("inf"), None
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        out = fn(*args)
+        best = min(best, time.perf_counter() - t0)
+    return best, out
+
+def main():
+    parser = argparse.ArgumentParser(description="Plain-text vs layout-aware extraction benchmark")
+    parser.add_argument("--pdf", default="data/2310.08754v4.pdf", help="Source PDF")
+    parser.add_argument("--pages", type=int, default=0,
+                        help="Replicate the source up to this many pages for the speed runs (0 = as is)")
+    parser.add_argument("--max-chars", type=int, default=2500, help="Chunk size for the quality metrics")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per mode (best is reported)")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        pdf = pathlib.Path(args.pdf)
+        if args.pages:
+            pdf = pathlib.Path(tmp) / "big.pdf"
+            replicate(args.pdf, args.pages, pdf)
+        modes = [("text", False, clean_text_mode), ("layout", True, clean_layout_mode)]
+        print(f"PDF: {args.pdf}" + (f" (replicated to {args.pages} pages)" if args.pages else ""))
+        print(f"{'mode':>6} | {'extract s':>9} | {'clean s':>7} | {'pages/s':>7} | "
+              f"paras | heads | broken | ticks | chunks | mid-start")
+        for name, layout, clean in modes:
+            t_ext, pages = best_of(args.repeat, extract_pages, pdf, 1, None, layout)
+            # 속도는 참고문헌까지 전부 정제 (복제본에서 첫 References 에서 멈추지 않도록)
+            t_clean, _ = best_of(args.repeat, clean, pages, True)
+            # 품질은 원본 한 부만 (복제본은 같은 내용이 반복될 뿐)
+            q = quality(clean(extract_pages(args.pdf, layout=layout)), args.max_chars)
+            print(f"{name:>6} | {t_ext:>9.3f} | {t_clean:>7.3f} | {len(pages) / (t_ext + t_clean):>7.1f} | "
+                  f"{q['paragraphs']:>5} | {q['headings']:>5} | {q['broken']:>6} | {q['ticks']:>5} | "
+                  f"{q['chunks']:>6} | {q['mid_start']:>9}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,47 @@
+# bench_session_store.py
+# 세션 저장소 이어받기 벤치마크: 전체 턴 수(1k/10k/100k)가 늘어도 load 시간은 활성 창 크기만큼인지 확인
+# 예) python bench/bench_session_store.py --turns 1000,10000,100000 --window 12
+import argparse, pathlib, sys, tempfile, time
+
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parent.parent / "chatbot"))
+from session_store import SessionStore
+
+def fill(store, sid, n_turns, window):
+    # 앞부분은 요약에 접혔다고 보고 start = n_turns - window 로 기록
+    store._db.executemany(
+        "INSERT INTO turns(session, seq, user, reply, created) VALUES (?, ?, ?, ?, ?)",
+        ((sid, i, f"질문 {i}: " + "감자 " * 20, f"답변 {i}: " + "lorem " * 60, 0.0) for i in range(n_turns)))
+    store._db.commit()
+    store.save(sid, "gemini-2.5-pro", "persona", "요약 " * 200, n_turns - window, n_turns - window,
+               turn=(n_turns - 1, "질문", "답변"))
+
+def main():
+    parser = argparse.ArgumentParser(description="Session store resume benchmark")
+    parser.add_argument("--turns", default="1000,10000,100000", help="Comma-separated session lengths")
+    parser.add_argument("--window", type=int, default=12, help="Turns in the active context window")
+    parser.add_argument("--repeat", type=int, default=50, help="Loads per session (mean is reported)")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        store = SessionStore(pathlib.Path(tmp) / "sessions.sqlite3")
+        print(f"{'turns':>8} | {'fill s':>7} | {'load ms':>8} | {'full scan ms':>12} | loaded")
+        for n in [int(x) for x in args.turns.split(",")]:
+            sid = f"s{n}"
+            t0 = time.perf_counter()
+            fill(store, sid, n, args.window)
+            fill_s = time.perf_counter() - t0
+            t0 = time.perf_counter()
+            for _ in range(args.repeat):
+                state = store.load(sid)
+            load_ms = (time.perf_counter() - t0) / args.repeat * 1000
+            # 비교: 세션의 모든 턴을 읽는 경우
+            t0 = time.perf_counter()
+            rows = store._db.execute("SELECT user, reply FROM turns WHERE session=? ORDER BY seq",
+                                     (sid,)).fetchall()
+            full_ms = (time.perf_counter() - t0) * 1000
+            print(f"{n:>8} | {fill_s:>7.2f} | {load_ms:>8.3f} | {full_ms:>12.2f} | "
+                  f"{len(state['turns'])}/{len(rows)} turns")
+        store.close()
+
+if __name__ == "__main__":
+    main()
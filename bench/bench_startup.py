@@ -0,0 +1,42 @@
+# bench_startup.py
+# 진입점 시작 시간 벤치마크: python -X importtime 으로 --help 실행 시 wall 시간과 무거운 import
+# (SDK / PyMuPDF / NumPy 가 --help 에서도 import 되는지 확인)
+# 예) python bench/bench_startup.py --repeat 5
+import argparse, os, pathlib, re, subprocess, sys, time
+
+ROOT = pathlib.Path(__file__).resolve().parent.parent
+SCRIPTS = ["clerk/04-1-1-1-1.py", "chatbot/03-1-2-2.py", "vector_store.py"]
+HEAVY = ["google.generativeai", "fitz", "numpy", "dotenv"]
+LINE_RE = re.compile(r"import time:\s+\d+ \|\s+(\d+) \|\s*(\S+)")
+
+def run_once(script, args):
+    env = dict(os.environ, PYTHONDONTWRITEBYTECODE="1")
+    t0 = time.perf_counter()
+    proc = subprocess.run([sys.executable, "-X", "importtime", str(ROOT / script)] + args,
+                          capture_output=True, text=True, cwd=ROOT, env=env)
+    wall = time.perf_counter() - t0
+    # 무거운 패키지 자체 줄의 누적 시간 (어느 깊이에서 import 됐든 한 번만 나옴)
+    heavy = {}
+    for m in LINE_RE.finditer(proc.stderr):
+        if m.group(2) in HEAVY:
+            heavy[m.group(2)] = int(m.group(1))
+    return wall, heavy
+
+def main():
+    parser = argparse.ArgumentParser(description="Cold-start benchmark for the entry points")
+    parser.add_argument("--repeat", type=int, default=5, help="Runs per script (best is reported)")
+    parser.add_argument("--args", default="--help", help="Arguments passed to each script")
+    args = parser.parse_args()
+
+    print(f"{'script':<22} | {'best ms':>7} | heavy imports at startup (ms)")
+    for script in SCRIPTS:
+        extra = args.args.split()
+        if script == "vector_store.py" and extra == ["--help"]:
+            extra = ["search", "--help"]
+        runs = [run_once(script, extra) for _ in range(args.repeat)]
+        wall, heavy = min(runs, key=lambda r: r[0])
+        heavy_txt = ", ".join(f"{k} {v / 1000:.0f}" for k, v in sorted(heavy.items(), key=lambda kv: -kv[1]))
+        print(f"{script:<22} | {wall * 1000:>7.0f} | {heavy_txt or '-'}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,49 @@
+# bench_vector_store.py
+# 벡터 저장소 벤치마크: 청크 수(1만/5만)가 늘 때 열기(시작) 시간과 상위 k 질의 지연
+# 임베딩은 API 대신 무작위 단위 벡터 (저장/질의 경로만 잼)
+# 예) python bench/bench_vector_store.py --rows 10000,50000 --dim 768
+import argparse, pathlib, sys, tempfile, time
+import numpy as np
+
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parent.parent))
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parent))
+from vector_store import VectorStore
+from fake_gemini import percentile
+
+def main():
+    parser = argparse.ArgumentParser(description="Vector store open/query benchmark")
+    parser.add_argument("--rows", default="10000,50000", help="Comma-separated store sizes")
+    parser.add_argument("--dim", type=int, default=768, help="Embedding dimension")
+    parser.add_argument("--queries", type=int, default=200, help="Queries per size")
+    parser.add_argument("-k", type=int, default=5)
+    args = parser.parse_args()
+    rng = np.random.default_rng(0)
+    embed = lambda texts: rng.standard_normal((len(texts), args.dim), dtype=np.float32)
+
+    print(f"{'rows':>7} | {'ingest s':>8} | {'open ms':>7} | {'p50 ms':>6} | {'p95 ms':>6} | {'re-add':>6}")
+    for n in [int(x) for x in args.rows.split(",")]:
+        with tempfile.TemporaryDirectory() as tmp:
+            store = VectorStore(tmp, "bench")
+            chunks = [f"chunk {i}" for i in range(n)]
+            t0 = time.perf_counter()
+            for s in range(0, n, 1000):  # 문서 하나 ≈ 청크 1000개씩
+                store.add(f"doc{s // 1000}", chunks[s:s + 1000], embed)
+            ingest_s = time.perf_counter() - t0
+            store.close()
+
+            t0 = time.perf_counter()
+            store = VectorStore(tmp, "bench")
+            open_ms = (time.perf_counter() - t0) * 1000
+            lat = []
+            for q in embed(range(args.queries)):
+                t0 = time.perf_counter()
+                store.search(q, k=args.k)
+                lat.append((time.perf_counter() - t0) * 1000)
+            # 같은 청크를 다시 넣으면 임베딩 호출 없이 끝나야 함
+            store.add("again", chunks[:1000], embed)
+            print(f"{n:>7} | {ingest_s:>8.2f} | {open_ms:>7.2f} | {percentile(lat, 50):>6.2f} | "
+                  f"{percentile(lat, 95):>6.2f} | {store.embedded:>4} new")
+            store.close()
+
+if __name__ == "__main__":
+    main()
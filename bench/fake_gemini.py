@@ -0,0 +1,349 @@
+# fake_gemini.py
+# 로컬 Gemini 대역: google.generativeai 에서 이 저장소가 쓰는 부분만 흉내 (API 키/네트워크 없이 벤치마크)
+# - configure / get_model / GenerativeModel(generate_content, stream=True, count_tokens, start_chat)
+# - ChatSession.send_message (성공한 턴만 history 에 추가)
+# - 지연: 로그정규 분포(중앙값 latency_ms, sigma) + 입력 토큰 / prefill_tokens_per_sec
+#         + 출력 토큰 / tokens_per_sec
+# - 오류 주입: error_429 / error_500 비율 (.code 에 HTTP 상태, 429 는 retry_after 초)
+# - 모델별 지연: model_latency {"gemini-1.5-flash": 120} (없는 모델은 latency_ms)
+# - 형식 위반 주입: malformed 비율로 이름에 malformed_model 이 들어간 모델의 청크 요약에서
+#   "- Limitations:" 줄을 뺌 (clerk --map-model 승격 확인용)
+# - caching.CachedContent / GenerativeModel.from_cached_content: 등록한 접두부 토큰은
+#   cached_content_token_count 로 보고하고 prefill 지연에서 뺌 (cache_min_tokens 미만이면 400)
+# - embed_content: 단어 해시 bag-of-words 벡터 (embed_dim 차원, 같은 단어가 많을수록 코사인 유사도가 큼)
+# install() 은 sys.modules 의 google.generativeai 를 이 모듈로 바꿔치기함
+#
+# 스크립트를 그대로 대역에 물려 실행:
+#   python bench/fake_gemini.py --latency-ms 300 --error-429 0.05 chatbot/03-1-2-2.py --stream
+#   python bench/fake_gemini.py clerk/04-1-1-1-1.py --pdf data/2310.08754v4.pdf --workers 4
+import argparse, math, os, random, re, runpy, sys, threading, time, types, zlib
+
+CONFIG = {
+    "latency_ms": 300.0,     # 요청당 기본 지연 (로그정규 중앙값)
+    "sigma": 0.5,            # 로그정규 분산 (0 이면 고정 지연)
+    "tokens_per_sec": 200.0, # 출력 토큰 생성 속도 (0 이면 즉시)
+    "prefill_tokens_per_sec": 0.0,  # 입력 토큰 처리 속도 (0 이면 입력 길이와 무관)
+    "output_tokens": 120,    # 응답 길이 (max_output_tokens 가 더 작으면 그쪽)
+    "error_429": 0.0,        # 429 주입 비율
+    "error_500": 0.0,        # 500 주입 비율
+    "retry_after": 1.0,      # 429 응답의 Retry-After (초, None 이면 없음)
+    "input_token_limit": 1048576,
+    "cache_min_tokens": 1024,  # cached-content 최소 크기 (실제 API 처럼 작으면 거절)
+    "embed_dim": 64,         # embed_content 벡터 차원
+    "model_latency": {},     # 모델 이름 → 지연 중앙값 ms (latency_ms 대신)
+    "malformed": 0.0,        # 형식을 어긴 청크 요약 비율
+    "malformed_model": "flash",  # 형식 위반을 주입할 모델 (이름에 포함)
+}
+STATS = {"calls": 0, "errors": 0, "latencies": [], "prompt_tokens": [], "cached_tokens": 0}
+_lock = threading.Lock()
+_rng = random.Random()
+
+class FakeAPIError(Exception):
+    # google.api_core 예외처럼 .code 에 HTTP 상태 코드
+    def __init__(self, code, message, retry_after=None):
+        super().__init__(f"{code} {message}")
+        self.code = code
+        self.message = message
+        if retry_after is not None:
+            self.retry_after = retry_after
+
+def count(text) -> int:
+    return max(1, len(text) // 4)
+
+def reset_stats():
+    with _lock:
+        STATS.update(calls=0, errors=0, latencies=[], prompt_tokens=[], cached_tokens=0)
+
+def percentile(values, q):
+    # 최근접 순위 백분위수
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, max(0, math.ceil(q / 100 * len(ordered)) - 1))]
+
+def _record(latency, ok, prompt_tokens=0, cached_tokens=0):
+    with _lock:
+        STATS["calls"] += 1
+        STATS["latencies"].append(latency)
+        if ok:
+            STATS["prompt_tokens"].append(prompt_tokens)
+            STATS["cached_tokens"] += cached_tokens
+        else:
+            STATS["errors"] += 1
+
+def _base_latency(model_name=""):
+    name = model_name[len("models/"):] if model_name.startswith("models/") else model_name
+    median = CONFIG["model_latency"].get(name, CONFIG["latency_ms"]) / 1000.0
+    if median <= 0:
+        return 0.0
+    return _rng.lognormvariate(math.log(median), CONFIG["sigma"]) if CONFIG["sigma"] else median
+
+def _maybe_fail(started):
+    roll = _rng.random()
+    code = None
+    if roll < CONFIG["error_429"]:
+        code, msg = 429, "Resource has been exhausted (e.g. check quota)."
+    elif roll < CONFIG["error_429"] + CONFIG["error_500"]:
+        code, msg = 500, "An internal error has occurred."
+    if code is None:
+        return
+    time.sleep(_base_latency() * 0.2)  # 오류 응답은 빨리 옴
+    _record(time.perf_counter() - started, ok=False)
+    raise FakeAPIError(code, msg, CONFIG["retry_after"] if code == 429 else None)
+
+def _as_text(contents) -> str:
+    # 문자열 / parts 리스트 / history 형식({"role", "parts"}) 모두 평문으로
+    if isinstance(contents, str):
+        return contents
+    if isinstance(contents, dict):
+        return " ".join(_as_text(p) for p in contents.get("parts", []))
+    if isinstance(contents, (list, tuple)):
+        return "\n".join(_as_text(c) for c in contents)
+    return str(contents)
+
+def _reply(prompt: str, n_tokens: int) -> str:
+    # 요약 프롬프트에는 출력 형식을 지키는 bullet 로, 그 외엔 평문으로 답함
+    filler = " ".join(["lorem"] * max(1, n_tokens // 4))
+    if "- Claim:" in prompt:
+        return (f"- Claim: {filler}\n- Method: {filler}\n"
+                f"- Evidence/Numbers: {len(prompt)}\n- Limitations: {filler}")
+    if "TL;DR" in prompt:
+        return f"- TL;DR: {filler}\n- 문제정의: {filler}\n- 핵심 결과: {len(prompt)}"
+    return f"(fake) {prompt.strip()[-40:]} {filler}"
+
+class _Part:
+    def __init__(self, text):
+        self.text = text
+
+class FakeResponse:
+    def __init__(self, text, prompt_tokens, candidate_tokens, cached_tokens=0):
+        self.text = text
+        self.candidates = [types.SimpleNamespace(content=types.SimpleNamespace(parts=[_Part(text)]),
+                                                 finish_reason=1)]
+        self.usage_metadata = types.SimpleNamespace(
+            prompt_token_count=prompt_tokens, candidates_token_count=candidate_tokens,
+            cached_content_token_count=cached_tokens,
+            total_token_count=prompt_tokens + candidate_tokens)
+
+class FakeStream:
+    # generate_content(stream=True): 반복하면 조각 응답, 다 돈 뒤에는 .text 로 전체
+    def __init__(self, pieces, prompt_tokens, started, on_done=None, cached_tokens=0):
+        self._pieces = pieces
+        self._prompt_tokens = prompt_tokens
+        self._cached_tokens = cached_tokens
+        self._started = started
+        self._on_done = on_done
+        self.text = None
+        self.usage_metadata = None
+
+    def __iter__(self):
+        rate = CONFIG["tokens_per_sec"]
+        out = []
+        for piece in self._pieces:
+            if rate:
+                time.sleep(count(piece) / rate)
+            out.append(piece)
+            yield FakeResponse(piece, self._prompt_tokens, count(piece), self._cached_tokens)
+        self.resolve_from("".join(out))
+
+    def resolve_from(self, text):
+        self.text = text
+        self.usage_metadata = FakeResponse(text, self._prompt_tokens, count(text),
+                                           self._cached_tokens).usage_metadata
+        _record(time.perf_counter() - self._started, ok=True, prompt_tokens=self._prompt_tokens,
+                cached_tokens=self._cached_tokens)
+        if self._on_done:
+            self._on_done(text)
+
+    def resolve(self):
+        for _ in self:
+            pass
+
+class GenerativeModel:
+    def __init__(self, model_name="gemini-1.5-pro", system_instruction=None,
+                 generation_config=None, **kwargs):
+        self.model_name = model_name if model_name.startswith("models/") else "models/" + model_name
+        self._system_instruction = system_instruction
+        self._generation_config = generation_config or {}
+        self._cached = None
+
+    @classmethod
+    def from_cached_content(cls, cached_content, generation_config=None, **kwargs):
+        model = cls(cached_content.model, generation_config=generation_config)
+        model._cached = cached_content
+        return model
+
+    def count_tokens(self, contents, **kwargs):
+        return types.SimpleNamespace(total_tokens=count(_as_text(contents)))
+
+    def generate_content(self, contents, generation_config=None, stream=False, _on_done=None,
+                         **kwargs):
+        started = time.perf_counter()
+        prompt = _as_text(contents)
+        cached_tokens = 0
+        if self._cached is not None:
+            # 등록된 접두부 + 이번 요청 (접두부 토큰은 캐시에서 읽은 것으로 침)
+            prompt = self._cached.text + "\n" + prompt
+            cached_tokens = self._cached.tokens
+        config = dict(self._generation_config, **(generation_config or {}))
+        _maybe_fail(started)
+        n_out = min(CONFIG["output_tokens"], config.get("max_output_tokens") or CONFIG["output_tokens"])
+        text = _reply(prompt, n_out)
+        if ("- Claim:" in prompt and CONFIG["malformed"] and CONFIG["malformed_model"] in self.model_name
+                and _rng.random() < CONFIG["malformed"]):
+            text = text.rsplit("\n- Limitations:", 1)[0]
+        prompt_tokens = count((self._system_instruction or "") + prompt)
+        prefill = ((prompt_tokens - cached_tokens) / CONFIG["prefill_tokens_per_sec"]
+                   if CONFIG["prefill_tokens_per_sec"] else 0.0)
+        time.sleep(_base_latency(self.model_name) + prefill)  # 첫 토큰까지
+        if stream:
+            words = text.split(" ")
+            pieces = [" ".join(words[i:i + 8]) + (" " if i + 8 < len(words) else "")
+                      for i in range(0, len(words), 8)]
+            return FakeStream(pieces, prompt_tokens, started, on_done=_on_done,
+                              cached_tokens=cached_tokens)
+        if CONFIG["tokens_per_sec"]:
+            time.sleep(count(text) / CONFIG["tokens_per_sec"])
+        _record(time.perf_counter() - started, ok=True, prompt_tokens=prompt_tokens,
+                cached_tokens=cached_tokens)
+        resp = FakeResponse(text, prompt_tokens, count(text), cached_tokens)
+        if _on_done:
+            _on_done(text)
+        return resp
+
+    def start_chat(self, history=None, **kwargs):
+        return ChatSession(self, history)
+
+class ChatSession:
+    def __init__(self, model, history=None):
+        self.model = model
+        self.history = list(history or [])
+
+    def send_message(self, content, generation_config=None, stream=False, **kwargs):
+        user = {"role": "user", "parts": [_as_text(content)]}
+        def on_done(text):
+            self.history += [user, {"role": "model", "parts": [text]}]
+        return self.model.generate_content(self.history + [user], generation_config=generation_config,
+                                           stream=stream, _on_done=on_done)
+
+class FakeCachedContent:
+    # genai.caching.CachedContent 대역: 접두부(시스템 인스트럭션 + contents) 를 보관
+    _store = {}
+
+    def __init__(self, name, model, text, tokens):
+        self.name, self.model, self.text, self.tokens = name, model, text, tokens
+        self.usage_metadata = types.SimpleNamespace(total_token_count=tokens)
+
+    @classmethod
+    def create(cls, model, *, display_name=None, system_instruction=None, contents=None, ttl=None,
+               **kwargs):
+        text = (system_instruction or "") + "\n" + _as_text(contents or [])
+        tokens = count(text)
+        if tokens < CONFIG["cache_min_tokens"]:
+            raise FakeAPIError(400, f"Cached content is too small. total_token_count={tokens}, "
+                                    f"min_total_token_count={CONFIG['cache_min_tokens']}")
+        cc = cls(f"cachedContents/fake-{len(cls._store) + 1}", model, text, tokens)
+        cls._store[cc.name] = cc
+        return cc
+
+    def delete(self):
+        self._store.pop(self.name, None)
+
+caching = types.SimpleNamespace(CachedContent=FakeCachedContent)
+
+def _embed(text, dim):
+    vec = [0.0] * dim
+    for w in re.findall(r"\w+", text.lower()):
+        vec[zlib.crc32(w.encode("utf-8")) % len(vec)] += 1.0
+    return vec
+
+def embed_content(model, content, task_type=None, title=None, output_dimensionality=None, **kwargs):
+    # 리스트면 배치 요청 한 번 ({"embedding": [[...], ...]}), 문자열이면 벡터 하나
+    started = time.perf_counter()
+    _maybe_fail(started)
+    texts = [content] if isinstance(content, str) else [_as_text(c) for c in content]
+    time.sleep(_base_latency() * 0.3)
+    _record(time.perf_counter() - started, ok=True, prompt_tokens=sum(count(t) for t in texts))
+    vecs = [_embed(t, output_dimensionality or CONFIG["embed_dim"]) for t in texts]
+    return {"embedding": vecs[0] if isinstance(content, str) else vecs}
+
+def configure(**kwargs):
+    pass
+
+def get_model(name):
+    return types.SimpleNamespace(name=name, input_token_limit=CONFIG["input_token_limit"],
+                                 output_token_limit=8192)
+
+def install(seed=None, **config):
+    # import google.generativeai 가 이 모듈을 돌려주도록 등록
+    unknown = set(config) - set(CONFIG)
+    if unknown:
+        raise ValueError(f"unknown fake_gemini options: {sorted(unknown)}")
+    CONFIG.update(config)
+    if seed is not None:
+        _rng.seed(seed)
+    os.environ.setdefault("GEMINI_API_KEY", "fake-key")
+    me = sys.modules[__name__]
+    try:
+        import google
+    except ImportError:
+        google = types.ModuleType("google")
+        google.__path__ = []
+        sys.modules["google"] = google
+    sys.modules["google.generativeai"] = me
+    google.generativeai = me
+    return me
+
+def add_arguments(parser):
+    # 벤치마크 스크립트들이 같이 쓰는 대역 설정 옵션
+    parser.add_argument("--latency-ms", type=float, default=CONFIG["latency_ms"], help="Median request latency")
+    parser.add_argument("--sigma", type=float, default=CONFIG["sigma"], help="Log-normal latency spread")
+    parser.add_argument("--tokens-per-sec", type=float, default=CONFIG["tokens_per_sec"], help="Output token rate")
+    parser.add_argument("--prefill-tokens-per-sec", type=float, default=CONFIG["prefill_tokens_per_sec"],
+                        help="Input token processing rate (0 = prompt length is free)")
+    parser.add_argument("--output-tokens", type=int, default=CONFIG["output_tokens"], help="Tokens per reply")
+    parser.add_argument("--error-429", type=float, default=0.0, help="Fraction of requests failing with 429")
+    parser.add_argument("--error-500", type=float, default=0.0, help="Fraction of requests failing with 500")
+    parser.add_argument("--cache-min-tokens", type=int, default=CONFIG["cache_min_tokens"],
+                        help="Smallest prefix accepted by caching.CachedContent.create")
+    parser.add_argument("--model-latency", action="append", default=[], metavar="MODEL=MS",
+                        help="Median latency for one model (repeatable, e.g. gemini-1.5-flash=120)")
+    parser.add_argument("--malformed", type=float, default=0.0,
+                        help="Fraction of chunk summaries that drop the Limitations field")
+    parser.add_argument("--malformed-model", default=CONFIG["malformed_model"],
+                        help="Only models whose name contains this return malformed summaries")
+    parser.add_argument("--seed", type=int, default=None, help="Random seed for latency/errors")
+
+def install_from_args(args):
+    return install(seed=args.seed, latency_ms=args.latency_ms, sigma=args.sigma,
+                   tokens_per_sec=args.tokens_per_sec,
+                   prefill_tokens_per_sec=args.prefill_tokens_per_sec, output_tokens=args.output_tokens,
+                   error_429=args.error_429, error_500=args.error_500,
+                   cache_min_tokens=args.cache_min_tokens,
+                   model_latency={k: float(v) for k, v in (m.split("=", 1) for m in args.model_latency)},
+                   malformed=args.malformed, malformed_model=args.malformed_model)
+
+def summary_line() -> str:
+    lat = STATS["latencies"]
+    return (f"fake_gemini: {STATS['calls']} requests ({STATS['errors']} injected errors), "
+            f"p50 {percentile(lat, 50) * 1000:.0f} ms / p95 {percentile(lat, 95) * 1000:.0f} ms / "
+            f"p99 {percentile(lat, 99) * 1000:.0f} ms")
+
+def main():
+    parser = argparse.ArgumentParser(description="Run a script against the local Gemini stand-in")
+    add_arguments(parser)
+    parser.add_argument("script", help="Script to run (e.g. clerk/04-1-1-1-1.py)")
+    parser.add_argument("script_args", nargs=argparse.REMAINDER, help="Arguments for the script")
+    args = parser.parse_args()
+
+    install_from_args(args)
+    script = os.path.abspath(args.script)
+    sys.argv = [script] + args.script_args
+    sys.path[0] = os.path.dirname(script)  # 스크립트 옆 모듈 import (python script.py 와 같게)
+    try:
+        runpy.run_path(script, run_name="__main__")
+    finally:
+        print(summary_line(), file=sys.stderr)
+
+if __name__ == "__main__":
+    main()
@@ -1,20 +1,16 @@
 # 03-1-1-4 (few_prompting)
 
-from dotenv import load_dotenv
-import google.generativeai as genai
-import os
 import sys
+import pathlib
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parent.parent))  # 루트 공용 모듈
+import gemini_client
+from gemini_rate_limit import RateLimiter
 
-load_dotenv()
-api_key = os.getenv("GEMINI_API_KEY")
-if not api_key:
-    print("[Error] 환경 변수 GEMINI_API_KEY가 설정되어 있지 않습니다. .env에 넣거나 세션에 설정하세요", file=sys.stderr)
-    sys.exit(1)
-    
-genai.configure(api_key = api_key)
+gemini_client.require_api_key()  # .env 로드 + 키 확인 (SDK import/configure 는 첫 호출 때, 공용 클라이언트)
 
-model = genai.GenerativeModel("gemini-1.5-pro",
+model = gemini_client.model("gemini-1.5-pro",
                               system_instruction="너는 유치원생이야. 유치원생처럼 답변해줘 ") # MODEL 설정
+limiter = RateLimiter.from_env()  # GEMINI_RPM/GEMINI_TPM, 429/503 재시도
 
 prompt = """규칙: 동물 이름의 마지막 글자로 시작하는 어린이 단어 1개만 출력.
 제약: 한글 단어 1개, 6자 이내, 일반명사 느낌. 모르면 '모름'.
@@ -35,7 +31,7 @@ prompt = """규칙: 동물 이름의 마지막 글자로 시작하는 어린이
 출력:"""
 
 try:
-    response = model.generate_content(prompt, 
+    response = limiter.call(model.generate_content, prompt, 
                                        generation_config = {"temperature":0.9} # 답변 설정 
     )
     print(response.text) 
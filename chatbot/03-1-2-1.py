@@ -1,21 +1,18 @@
 # 03-1-2-1 (Non-multi-turn)
-from dotenv import load_dotenv
-import google.generativeai as genai
 import sys
-import os
+import pathlib
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parent.parent))  # 루트 공용 모듈
+import gemini_client
+from gemini_rate_limit import RateLimiter
 
-load_dotenv()
-api_key = os.getenv("GEMINI_API_KEY")
-if not api_key:
-    print("[Error] 환경 변수 GEMINI_API_KEY가 없습니다. .env에 넣거나 세션에 설정하세요.", file=sys.stderr)
-    sys.exit(1)
-    
-genai.configure(api_key=api_key)
+gemini_client.require_api_key()  # .env 로드 + 키 확인 (SDK import/configure 는 첫 호출 때, 공용 클라이언트)
 
-model = genai.GenerativeModel(
-    model_name="gemini-1.5-pro",
+model = gemini_client.model(
+    "gemini-1.5-pro",
     system_instruction="너는 유치원생이야. 유치원생처럼 답변해줘."
 )
+limiter = RateLimiter.from_env()  # GEMINI_RPM/GEMINI_TPM, 429/503 재시도
+
 def safe_text(resp) -> str:
     """SDK 버전 차이를 대비해 응답 텍스트를 안전하게 추출"""
     if getattr(resp, "text", None):
@@ -29,6 +26,7 @@ def safe_text(resp) -> str:
             return getattr(first, "text", str(first)).strip()
     return "(응답을 파싱하지 못했어요)"
 
+gemini_client.warm()  # 첫 입력을 기다리는 동안 SDK import + 클라이언트 생성
 print("Type 'exit' to quit.")
 while True:
     try:
@@ -44,7 +42,8 @@ while True:
 
     try:
         # Non-multi-turn: 매 질문을 독립 호출
-        resp = model.generate_content(
+        resp = limiter.call(
+            model.generate_content,
             user_input,
             generation_config={
                 "temperature": 0.7,
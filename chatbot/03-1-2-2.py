@@ -1,30 +1,11 @@
 # 03-1-2-2 (Multi-turn, improved)
-from dotenv import load_dotenv
-import google.generativeai as genai
-import os, sys, time, argparse
-from typing import Optional
-
-def safe_text(resp) -> str:
-    # 후보/파츠까지 넓게 커버
-    if getattr(resp, "text", None):
-        return (resp.text or "").strip()
-    cand = getattr(resp, "candidates", None)
-    if cand:
-        content = getattr(cand[0], "content", None)
-        parts = getattr(content, "parts", None) if content else None
-        if parts:
-            first = parts[0]
-            txt = getattr(first, "text", None)
-            if txt is not None:
-                return txt.strip()
-            return str(first).strip()
-    return "(응답을 파싱하지 못했어요)"
-
-def build_model(model_name: str, system_instruction: Optional[str]) -> genai.GenerativeModel:
-    return genai.GenerativeModel(
-        model_name=model_name,
-        system_instruction=system_instruction or "You are a helpful assistant."
-    )
+import os, sys, argparse, asyncio, pathlib
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parent.parent))  # 루트 공용 모듈
+import gemini_client
+from gemini_rate_limit import RateLimiter
+from gemini_context_cache import ContextCache
+from chat_session import HELP, Conversation
+from session_store import SessionStore
 
 def main():
     parser = argparse.ArgumentParser()
@@ -32,21 +13,84 @@ def main():
     parser.add_argument("--temp", type=float, default=0.7)
     parser.add_argument("--persona", default="너는 말하는 감자야. 감자처럼 답변해줘")
     parser.add_argument("--stream", action="store_true", help="스트리밍 출력")
+    parser.add_argument("--rpm", type=int, default=int(os.getenv("GEMINI_RPM", "0") or 0), help="분당 요청 상한 (0 = 없음)")
+    parser.add_argument("--max-retries", type=int, default=5, help="429/503 재시도 횟수")
+    parser.add_argument("--history-tokens", type=int, default=8000,
+                        help="히스토리 토큰 예산; 넘으면 오래된 턴을 요약 (0 = 제한 없음)")
+    parser.add_argument("--keep-turns", type=int, default=6, help="요약하지 않고 그대로 보낼 최근 턴 수")
+    parser.add_argument("--summary-model", default="gemini-2.5-flash", help="오래된 턴 요약용 (값싼) 모델")
+    parser.add_argument("--show-tokens", action="store_true", help="턴마다 프롬프트 토큰 수 출력")
+    parser.add_argument("--session", default=None, help="세션 이름: 저장해 두고 다음 실행 때 이어서 대화")
+    parser.add_argument("--store", default=".cache/chat_sessions.sqlite3", help="세션 저장소 (SQLite)")
+    parser.add_argument("--no-store", action="store_true", help="세션을 저장하지 않음")
+    parser.add_argument("--serve", default=None, metavar="[HOST:]PORT",
+                        help="REPL 대신 HTTP 서버로 여러 세션 제공 (예: 8000, 0.0.0.0:8000)")
+    parser.add_argument("--max-sessions", type=int, default=1000, help="서버 모드 최대 세션 수")
+    parser.add_argument("--idle-ttl", type=float, default=900.0, help="이 시간(초) 동안 안 쓴 세션 정리")
+    parser.add_argument("--serve-workers", type=int, default=64, help="동시에 진행할 Gemini 호출 수")
+    parser.add_argument("--doc", default=None, help="참고 문서 (텍스트 파일): 매 턴 함께 보냄, 가능하면 컨텍스트 캐시로")
+    parser.add_argument("--no-context-cache", action="store_true", help="--doc 를 캐시하지 않고 매 턴 그대로 보냄")
+    parser.add_argument("--context-ttl", type=int, default=3600, help="컨텍스트 캐시 유지 시간(초)")
+    parser.add_argument("--index", default=None,
+                        help="논문 질의 모드: clerk 가 만든 <stem>.index 디렉터리 (질문마다 상위 청크만 보냄)")
+    parser.add_argument("--top-k", type=int, default=4, help="--index 에서 질문마다 붙일 청크 수")
     args = parser.parse_args()
 
-    load_dotenv()
-    api_key = os.getenv("GEMINI_API_KEY")
-    if not api_key:
-        print("[Error] GEMINI_API_KEY가 없습니다. .env에 넣거나 세션에 설정하세요.", file=sys.stderr)
-        sys.exit(1)
+    # SDK import 와 클라이언트(연결 풀) 생성은 첫 입력을 기다리는 동안 백그라운드에서
+    gemini_client.require_api_key()
+    gemini_client.warm()
+    limiter = RateLimiter.from_env(rpm=args.rpm, max_retries=args.max_retries)
+
+    # 세션 저장소: 이름 붙인 세션(--session)이나 서버 모드에서만
+    store = None
+    if not args.no_store and (args.session or args.serve):
+        store = SessionStore(args.store)
 
-    genai.configure(api_key=api_key)
-    model = build_model(args.model, args.persona)
+    # 참고 문서: 페르소나 + 문서 접두부는 모든 세션이 같으므로 캐시 한 건을 같이 씀
+    doc = pathlib.Path(args.doc).read_text(encoding="utf-8") if args.doc else None
+    context_cache = ContextCache(args.context_ttl, limiter) if doc and not args.no_context_cache else None
 
-    # 멀티턴 세션 시작(히스토리 사전 주입 가능)
-    chat = model.start_chat(history=[])
+    # 논문 질의: 질문마다 BM25 (+ 인덱스에 벡터가 있으면 임베딩) 상위 k 청크를 찾아 붙임
+    retriever = None
+    if args.index:
+        from chunk_index import ChunkIndex, gemini_embedder
+        index = ChunkIndex(args.index)
+        embed = None
+        if index.vectors is not None:
+            # 질문도 인덱스와 같은 모델/차원으로 임베딩
+            embed = gemini_embedder(index.meta["embed_model"], limiter, dim=index.vectors.shape[1])
 
-    print("Type 'exit' to quit.  /reset 대화 초기화  /sys {지시문} 시스템 인스트럭션 교체  /model {모델명} 모델 교체")
+        def retriever(question):
+            return [index.chunk(i) for i, _ in index.search(question, k=args.top_k, embed=embed)]
+
+    def new_conversation(session_id=None):
+        # 멀티턴 세션 시작 (세션마다 모델/페르소나를 따로 가짐, 쿼터는 limiter 로 공유)
+        # session_id 가 저장소에 있으면 모델/페르소나/요약/최근 턴을 이어받음
+        return Conversation(args.model, args.persona, temperature=args.temp, limiter=limiter,
+                            history_tokens=args.history_tokens, keep_turns=args.keep_turns,
+                            summary_model=args.summary_model, store=store, session_id=session_id,
+                            doc=doc, context_cache=context_cache, retriever=retriever)
+
+    if args.serve:
+        # 서버 모드: 한 프로세스에서 여러 세션 (chat_server.py)
+        from chat_server import serve
+        host, _, port = args.serve.rpartition(":")
+        try:
+            asyncio.run(serve(new_conversation, host=host or "127.0.0.1", port=int(port),
+                              max_sessions=args.max_sessions, idle_ttl=args.idle_ttl,
+                              workers=args.serve_workers, store=store))
+        except KeyboardInterrupt:
+            print("\nBye!")
+        finally:
+            if context_cache is not None:
+                context_cache.close()
+        return
+
+    conv = new_conversation(args.session)
+    print(HELP)
+    if conv.resumed_turns:
+        print(f"Gemini: 세션 '{args.session}'의 이전 대화 {conv.resumed_turns}턴을 이어서 할게요. "
+              f"(모델 {conv.model_name})")
     while True:
         try:
             user_input = input("You: ").strip()
@@ -56,60 +100,36 @@ def main():
 
         if not user_input:
             continue
-        low = user_input.lower()
-        if low == "exit":
+        if user_input.lower() == "exit":
             break
 
-        # 런타임 제어 명령
-        if low.startswith("/reset"):
-            chat = model.start_chat(history=[])
-            print("Gemini: 대화를 새로 시작할게요!")
-            continue
-        if low.startswith("/sys"):
-            # /sys 뒤의 내용으로 persona 교체
-            new_sys = user_input[4:].strip() or args.persona
-            model = build_model(args.model, new_sys)
-            # 대화는 유지하되, 새 모델 인스트럭션으로 재시작 (원하면 히스토리 이관 가능)
-            chat = model.start_chat(history=[])
-            print("Gemini: 시스템 인스트럭션을 갱신했어요.")
-            continue
-        if low.startswith("/model"):
-            new_model = user_input[6:].strip() or args.model
-            args.model = new_model
-            model = build_model(args.model, args.persona)
-            chat = model.start_chat(history=[])
-            print(f"Gemini: 모델을 '{args.model}'로 바꿨어요.")
+        # 런타임 제어 명령 (/reset, /sys, /model)
+        reply = conv.command(user_input)
+        if reply is not None:
+            print("Gemini:", reply)
             continue
 
         try:
-            gen_cfg = {"temperature": args.temp}
             if args.stream:
                 # 스트리밍 모드
-                stream = chat.send_message(user_input, generation_config=gen_cfg, stream=True)
                 print("Gemini: ", end="", flush=True)
-                acc = []
-                for chunk in stream:
-                    txt = safe_text(chunk)
-                    if txt:
-                        acc.append(txt)
-                        print(txt, end="", flush=True)
+                for txt in conv.send_stream(user_input):
+                    print(txt, end="", flush=True)
                 print()
             else:
-                resp = chat.send_message(user_input, generation_config=gen_cfg)
-                print("Gemini:", safe_text(resp))
+                print("Gemini:", conv.send(user_input))
+            if args.show_tokens:
+                u = conv.last_usage
+                print(f"  [tokens] prompt {u.get('prompt_tokens')} (≈{u['history_tokens']} local, "
+                      f"{u.get('cached_tokens', 0)} cached), "
+                      f"output {u.get('candidate_tokens')} | {u['history_turns']} turns kept, "
+                      f"{u['summarized_turns']} summarized"
+                      + (f", {u['retrieved']} chunks retrieved" if args.index else ""), file=sys.stderr)
         except Exception as e:
-            # 간단한 재시도 백오프
-            msg = str(e)
-            if "429" in msg or "rate" in msg.lower():
-                print("[Warn] Rate limit 감지: 1.5초 후 재시도…", file=sys.stderr)
-                time.sleep(1.5)
-                try:
-                    resp = chat.send_message(user_input, generation_config=gen_cfg)
-                    print("Gemini:", safe_text(resp))
-                except Exception as e2:
-                    print(f"[Error] 재시도 실패: {e2}", file=sys.stderr)
-            else:
-                print(f"[Error] {e}", file=sys.stderr)
+            # 429/503 은 limiter 가 백오프 후 재시도; 여기까지 오면 재시도도 실패한 것
+            print(f"[Error] {e}", file=sys.stderr)
+    if context_cache is not None:
+        context_cache.close()
 
 if __name__ == "__main__":
     main()
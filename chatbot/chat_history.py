@@ -0,0 +1,93 @@
+# chat_history.py
+# 멀티턴 히스토리 관리 (토큰 예산)
+# - 최근 keep_turns 턴은 그대로 보냄
+# - 예산(max_tokens)을 넘거나 턴이 2 × keep_turns 를 넘으면 오래된 턴을 요약 하나로 접음
+#   (요약은 값싼 모델로; 턴마다가 아니라 keep_turns 턴에 한 번꼴로 요약 호출)
+# - 요약에 실패하면 예산을 넘을 때만 오래된 턴을 버림 (슬라이딩 윈도우)
+# 토큰 수는 로컬 근사치 (clerk/token_chunker.py 와 같은 배율: ASCII 4자/토큰, 그 외 1.5자/토큰)
+import sys
+
+ASCII_CHARS_PER_TOKEN = 4.0
+OTHER_CHARS_PER_TOKEN = 1.5
+SUMMARY_CHARS = 1200
+
+SUMMARY_PROMPT = """아래는 지금까지의 대화 요약과 그 뒤에 이어진 대화입니다.
+둘을 합쳐, 이후 대화에 필요한 사실·사용자 선호·결정 사항 위주로 {max_chars}자 이내의 한국어 요약을 쓰세요.
+요약문만 출력하세요.
+
+[기존 요약]
+{summary}
+
+[이어진 대화]
+{turns}
+"""
+
+def approx_tokens(text: str) -> int:
+    n_ascii = len(text.encode("ascii", "ignore"))
+    return int(n_ascii / ASCII_CHARS_PER_TOKEN + (len(text) - n_ascii) / OTHER_CHARS_PER_TOKEN) + 1
+
+class ChatHistory:
+    def __init__(self, max_tokens=8000, keep_turns=6, summarizer=None):
+        self.max_tokens = max_tokens  # 0 이면 제한 없음 (전체 히스토리 전송)
+        self.keep_turns = max(1, keep_turns)
+        self.summarizer = summarizer  # summarizer(prompt) -> 요약문
+        self.turns = []               # [(사용자, 모델)]
+        self.summary = ""
+        self.summarized_turns = 0
+        self.start = 0                # self.turns[0] 의 전체 대화 기준 번호 (앞은 요약됐거나 reset 됨)
+
+    def clear(self):
+        self.start += len(self.turns)
+        self.turns, self.summary, self.summarized_turns = [], "", 0
+
+    def restore(self, summary, turns, start, summarized_turns):
+        # 저장된 세션 이어받기 (SessionStore.load 결과)
+        self.summary, self.turns = summary, [tuple(t) for t in turns]
+        self.start, self.summarized_turns = start, summarized_turns
+
+    def tokens(self) -> int:
+        return approx_tokens(self.summary) + sum(approx_tokens(u) + approx_tokens(m) for u, m in self.turns)
+
+    def contents(self, user_input: str) -> list:
+        # generate_content 에 넘길 대화 (요약은 맨 앞의 한 턴으로)
+        out = []
+        if self.summary:
+            out += [{"role": "user", "parts": [f"[이전 대화 요약]\n{self.summary}"]},
+                    {"role": "model", "parts": ["네, 요약 내용을 기억하고 이어서 대화할게요."]}]
+        for u, m in self.turns:
+            out += [{"role": "user", "parts": [u]}, {"role": "model", "parts": [m]}]
+        out.append({"role": "user", "parts": [user_input]})
+        return out
+
+    def add(self, user: str, reply: str):
+        self.turns.append((user, reply))
+        self.compact()
+
+    def compact(self):
+        if not self.max_tokens:
+            return
+        over = self.tokens() > self.max_tokens
+        if not over and len(self.turns) <= 2 * self.keep_turns:
+            return
+        # 최근 keep_turns 턴만 남기되, 그것만으로도 넘치면 마지막 한 턴만 남김
+        keep = self.turns[-self.keep_turns:]
+        if sum(approx_tokens(u) + approx_tokens(m) for u, m in keep) > self.max_tokens:
+            keep = self.turns[-1:]
+        old = self.turns[:len(self.turns) - len(keep)]
+        if not old:
+            return
+        if self.summarizer is not None:
+            prompt = SUMMARY_PROMPT.format(
+                max_chars=SUMMARY_CHARS, summary=self.summary or "(없음)",
+                turns="\n".join(f"사용자: {u}\n모델: {m}" for u, m in old))
+            try:
+                self.summary = self.summarizer(prompt)[:SUMMARY_CHARS * 2]
+                self.turns = keep
+                self.start += len(old)
+                self.summarized_turns += len(old)
+                return
+            except Exception as e:
+                print(f"[Warn] 히스토리 요약 실패: {e}", file=sys.stderr)
+        if over:
+            self.turns = keep  # 요약 없이 오래된 턴을 버림
+            self.start += len(old)
@@ -0,0 +1,269 @@
+# chat_server.py
+# 03-1-2-2 서버 모드: asyncio HTTP/1.1 (표준 라이브러리만), 한 프로세스에서 여러 대화 세션을 동시에
+#   POST   /chat            {"session": id?, "message": "...", "stream": false}
+#                           → {"session": id, "reply": "...", "command": false, "usage": {...}}
+#                           stream=true 면 text/plain chunked 로 조각을 바로 흘려보냄 (세션 id 는 X-Session-Id)
+#   DELETE /sessions/{id}   세션 삭제 (저장소 기록까지)
+#   GET    /health          세션 수
+# - 세션 id 가 없거나 모르는 id 면 새 세션을 만듦; /reset /sys /model 은 세션별로 동작
+# - SDK 호출, 세션 생성(저장소 load, 컨텍스트 캐시 등록), 명령 처리는 블로킹이라 스레드 풀에서 실행
+#   같은 세션의 요청은 순서대로 (세션별 Lock)
+# - 메모리 상한: idle_ttl 동안 안 쓴 세션 정리 + max_sessions 초과 시 가장 오래 안 쓴 세션부터 정리
+#   처리 중인(또는 기다리는) 요청이 있는 세션은 정리하지 않음 → 같은 id 의 Conversation 이 둘 생기지 않음
+#   (SessionStore 를 쓰면 정리된 세션도 다음 요청 때 저장소에서 이어받음)
+# - 잘못된 요청 줄/헤더는 400, 너무 큰 본문은 413 을 보내고 연결을 닫음 (남은 바이트를 다음 요청으로 읽지 않게)
+import asyncio, json, sys, threading, time, uuid
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from concurrent.futures import ThreadPoolExecutor
+
+MAX_BODY = 1 << 20
+REASONS = {200: "OK", 204: "No Content", 400: "Bad Request", 404: "Not Found",
+           405: "Method Not Allowed", 413: "Payload Too Large", 502: "Bad Gateway"}
+
+class BadRequest(Exception):
+    # 요청을 끝까지 읽을 수 없음: 응답 후 연결을 닫음
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+class SessionError(Exception):
+    # make_conversation 실패 (저장소 읽기, 컨텍스트 캐시 등록 등)
+    pass
+
+class ChatServer:
+    def __init__(self, make_conversation, max_sessions=1000, idle_ttl=900.0, workers=64,
+                 store=None):
+        self.make_conversation = make_conversation  # make_conversation(세션 id) -> Conversation
+        self.store = store
+        self.max_sessions = max_sessions
+        self.idle_ttl = idle_ttl
+        self.sessions = OrderedDict()  # id → Conversation (앞쪽이 가장 오래 안 쓴 세션)
+        self.locks = {}
+        self.active = {}    # id → 처리 중이거나 Lock 을 기다리는 요청 수 (0 이 아니면 정리 안 함)
+        self.creating = {}  # id → 스레드 풀에서 만들고 있는 Conversation (같은 id 동시 요청은 같이 기다림)
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="chat")
+        self.evicted = 0
+
+    # ---------------- Sessions ----------------
+    @asynccontextmanager
+    async def session(self, sid):
+        # 세션을 (없으면 만들어) 잡고 Lock 을 쥔 채로 (id, Conversation) 을 넘김
+        sid = sid or uuid.uuid4().hex
+        while sid not in self.sessions:
+            pending = self.creating.get(sid)
+            try:
+                if pending is None:
+                    loop = asyncio.get_running_loop()
+                    pending = self.creating[sid] = loop.run_in_executor(self.executor, self.make_conversation, sid)
+                    try:
+                        conv = await pending
+                    finally:
+                        del self.creating[sid]
+                    self.sessions[sid] = conv
+                    self.locks[sid] = asyncio.Lock()
+                else:
+                    await pending
+            except Exception as e:
+                raise SessionError(str(e)) from e
+        self.sessions.move_to_end(sid)
+        self.active[sid] = self.active.get(sid, 0) + 1
+        self._evict_over()
+        try:
+            async with self.locks[sid]:
+                yield sid, self.sessions[sid]
+        finally:
+            self.active[sid] -= 1
+            if not self.active[sid]:
+                del self.active[sid]
+
+    def _evict_over(self):
+        # max_sessions 초과분을 오래 안 쓴 세션부터 정리 (사용 중인 세션은 건너뜀)
+        over = len(self.sessions) - self.max_sessions
+        if over > 0:
+            for sid in [sid for sid in self.sessions if sid not in self.active][:over]:
+                self._drop(sid)
+
+    def _drop(self, sid):
+        self.sessions.pop(sid, None)
+        self.locks.pop(sid, None)
+        self.evicted += 1
+
+    async def evict_idle(self):
+        while True:
+            await asyncio.sleep(max(1.0, min(60.0, self.idle_ttl / 2)))
+            cutoff = time.monotonic() - self.idle_ttl
+            idle = [sid for sid, conv in self.sessions.items()
+                    if conv.last_used < cutoff and sid not in self.active]
+            for sid in idle:
+                self._drop(sid)
+            if idle:
+                print(f"[Info] idle 세션 {len(idle)}개 정리 (남은 세션 {len(self.sessions)})", file=sys.stderr)
+
+    # ---------------- HTTP ----------------
+    async def handle(self, reader, writer):
+        try:
+            while True:
+                try:
+                    req = await self.read_request(reader)
+                except BadRequest as e:
+                    await self.respond(writer, e.status, {"error": str(e)}, keep_alive=False)
+                    break
+                if req is None:
+                    break
+                method, path, headers, body = req
+                keep_alive = headers.get("connection", "").lower() != "close"
+                await self.route(writer, method, path, body, keep_alive)
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    async def read_request(self, reader):
+        line = await reader.readline()
+        if not line.strip():
+            return None
+        parts = line.decode("latin-1").split()
+        if len(parts) != 3 or not parts[2].startswith("HTTP/"):
+            raise BadRequest(400, "malformed request line")
+        method, target, _ = parts
+        headers = {}
+        while True:
+            h = await reader.readline()
+            if h in (b"\r\n", b"\n", b""):
+                break
+            k, sep, v = h.decode("latin-1").partition(":")
+            if not sep:
+                raise BadRequest(400, "malformed header")
+            headers[k.strip().lower()] = v.strip()
+        length = headers.get("content-length", "0") or "0"
+        if not length.isdigit():
+            raise BadRequest(400, "invalid Content-Length")
+        n = int(length)
+        if n > MAX_BODY:
+            raise BadRequest(413, "body too large")
+        body = await reader.readexactly(n) if n else b""
+        return method, target.split("?", 1)[0], headers, body
+
+    async def respond(self, writer, status, payload=None, keep_alive=True):
+        body = b"" if payload is None else json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        head = (f"HTTP/1.1 {status} {REASONS.get(status, '')}\r\n"
+                f"Content-Type: application/json; charset=utf-8\r\n"
+                f"Content-Length: {len(body)}\r\n"
+                f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n")
+        writer.write(head.encode("latin-1") + body)
+        await writer.drain()
+
+    async def route(self, writer, method, path, body, keep_alive):
+        if path == "/health" and method == "GET":
+            return await self.respond(writer, 200, {"sessions": len(self.sessions),
+                                                    "max_sessions": self.max_sessions,
+                                                    "evicted": self.evicted}, keep_alive)
+        if path.startswith("/sessions/") and method == "DELETE":
+            sid = path[len("/sessions/"):]
+            found = sid in self.sessions
+            lock = self.locks.get(sid)
+            if lock is not None:
+                await lock.acquire()  # 처리 중인 요청이 끝난 뒤에 정리
+            try:
+                if self.store is not None:
+                    loop = asyncio.get_running_loop()
+                    found = await loop.run_in_executor(self.executor, self.store.delete, sid) or found
+                if found and self.locks.get(sid) is lock:
+                    self._drop(sid)
+            finally:
+                if lock is not None:
+                    lock.release()
+            if not found:
+                return await self.respond(writer, 404, {"error": "unknown session"}, keep_alive)
+            return await self.respond(writer, 204, None, keep_alive)
+        if path != "/chat":
+            return await self.respond(writer, 404, {"error": "not found"}, keep_alive)
+        if method != "POST":
+            return await self.respond(writer, 405, {"error": "use POST"}, keep_alive)
+        try:
+            req = json.loads(body or b"{}")
+            message = str(req.get("message", "")).strip()
+        except (ValueError, AttributeError):
+            return await self.respond(writer, 400, {"error": "invalid JSON"}, keep_alive)
+        if not message:
+            return await self.respond(writer, 400, {"error": "empty message"}, keep_alive)
+        if not isinstance(req.get("session"), (str, type(None))):
+            return await self.respond(writer, 400, {"error": "session must be a string"}, keep_alive)
+        loop = asyncio.get_running_loop()
+        try:
+            async with self.session(req.get("session")) as (sid, conv):
+                try:
+                    # /sys, /model 은 모델을 다시 만들고 컨텍스트 캐시를 등록할 수 있어 스레드에서
+                    reply = await loop.run_in_executor(self.executor, conv.command, message)
+                    text = None
+                    if reply is None and not req.get("stream"):
+                        text = await loop.run_in_executor(self.executor, conv.send, message)
+                except Exception as e:
+                    return await self.respond(writer, 502, {"session": sid, "error": str(e)}, keep_alive)
+                if reply is not None:
+                    return await self.respond(writer, 200, {"session": sid, "reply": reply, "command": True},
+                                              keep_alive)
+                if text is None:
+                    return await self.stream_reply(writer, sid, conv, message, keep_alive)
+                await self.respond(writer, 200, {"session": sid, "reply": text, "command": False,
+                                                 "usage": conv.last_usage}, keep_alive)
+        except SessionError as e:
+            await self.respond(writer, 502, {"session": req.get("session"), "error": str(e)}, keep_alive)
+
+    async def stream_reply(self, writer, sid, conv, message, keep_alive):
+        # 스레드에서 조각을 받아 큐로 넘기고, 첫 조각이 오면 chunked 응답 시작
+        loop = asyncio.get_running_loop()
+        queue = asyncio.Queue()
+        cancelled = threading.Event()  # 클라이언트가 끊기면 조각 받기 중단
+
+        def produce():
+            try:
+                for piece in conv.send_stream(message):
+                    if cancelled.is_set():
+                        break
+                    loop.call_soon_threadsafe(queue.put_nowait, piece)
+            except Exception as e:
+                loop.call_soon_threadsafe(queue.put_nowait, e)
+            finally:
+                loop.call_soon_threadsafe(queue.put_nowait, None)
+
+        producer = loop.run_in_executor(self.executor, produce)
+        item = await queue.get()
+        if isinstance(item, Exception):
+            await producer
+            return await self.respond(writer, 502, {"session": sid, "error": str(item)}, keep_alive)
+        writer.write((f"HTTP/1.1 200 OK\r\nContent-Type: text/plain; charset=utf-8\r\n"
+                      f"Transfer-Encoding: chunked\r\nX-Session-Id: {sid}\r\n"
+                      f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n").encode("latin-1"))
+        try:
+            while item is not None:
+                if isinstance(item, Exception):
+                    item = f"\n[Error] {item}"
+                data = item.encode("utf-8")
+                writer.write(f"{len(data):x}\r\n".encode("latin-1") + data + b"\r\n")
+                await writer.drain()
+                item = await queue.get()
+            writer.write(b"0\r\n\r\n")
+            await writer.drain()
+        finally:
+            # 끊겨도 produce 가 끝날 때까지 세션 잠금을 쥐고 있어야 다음 요청과 히스토리가 안 섞임
+            cancelled.set()
+            await producer
+
+async def serve(make_conversation, host="127.0.0.1", port=8000, max_sessions=1000,
+                idle_ttl=900.0, workers=64, store=None):
+    server = ChatServer(make_conversation, max_sessions=max_sessions, idle_ttl=idle_ttl,
+                        workers=workers, store=store)
+    srv = await asyncio.start_server(server.handle, host, port)
+    print(f"Serving chat on http://{host}:{port}  (POST /chat, max_sessions={max_sessions}, "
+          f"idle_ttl={idle_ttl:.0f}s)")
+    evictor = asyncio.create_task(server.evict_idle())
+    try:
+        async with srv:
+            await srv.serve_forever()
+    finally:
+        evictor.cancel()
+        server.executor.shutdown(wait=False)
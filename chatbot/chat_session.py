@@ -0,0 +1,170 @@
+# chat_session.py
+# 03-1-2-2 대화 한 건 (REPL / 서버 모드 공용)
+# - /reset, /sys {지시문}, /model {모델명} 런타임 명령
+# - 실제 호출은 공용 RateLimiter 로 (여러 세션이 같은 쿼터를 나눠 씀)
+# - 히스토리는 ChatHistory 가 토큰 예산 안으로 관리 (오래된 턴은 값싼 모델로 요약)
+#   ChatSession 대신 매 턴 generate_content(요약 + 최근 턴 + 새 메시지) 로 보냄
+# - store(SessionStore) 가 있으면 턴마다 기록하고, 같은 session_id 로 만들면 이어받음
+#   /sys, /model 은 히스토리를 유지한 채 페르소나/모델만 바꿈 (/reset 만 대화를 비움)
+# - doc(참고 문서) 이 있으면 페르소나 + 문서를 ContextCache 로 한 번 등록하고 매 턴 참조만 함
+#   (등록 실패/캐시 없음이면 문서를 대화 맨 앞에 그대로 넣어 보냄)
+# - retriever(질문) -> [문서 조각] 이 있으면 ("ask the paper") 이번 턴에만 상위 조각을 붙여 보냄
+#   히스토리에는 질문만 남기므로 문서 길이와 무관하게 프롬프트 크기가 일정
+import time
+from typing import Optional
+import gemini_client
+from chat_history import ChatHistory, approx_tokens
+
+ASK_PROMPT = """아래 문서 조각만 근거로 질문에 답하세요. 조각에 없는 내용이면 모른다고 하고, 근거 조각 번호를 [n] 으로 표시하세요.
+
+{passages}
+
+질문: {question}"""
+
+HELP = "Type 'exit' to quit.  /reset 대화 초기화  /sys {지시문} 시스템 인스트럭션 교체  /model {모델명} 모델 교체"
+
+def safe_text(resp) -> str:
+    # 후보/파츠까지 넓게 커버
+    if getattr(resp, "text", None):
+        return (resp.text or "").strip()
+    cand = getattr(resp, "candidates", None)
+    if cand:
+        content = getattr(cand[0], "content", None)
+        parts = getattr(content, "parts", None) if content else None
+        if parts:
+            first = parts[0]
+            txt = getattr(first, "text", None)
+            if txt is not None:
+                return txt.strip()
+            return str(first).strip()
+    return "(응답을 파싱하지 못했어요)"
+
+def build_model(model_name: str, system_instruction: Optional[str]) -> gemini_client.LazyModel:
+    return gemini_client.model(model_name, system_instruction or "You are a helpful assistant.")
+
+class Conversation:
+    def __init__(self, model_name, persona, temperature=0.7, limiter=None,
+                 history_tokens=8000, keep_turns=6, summary_model="gemini-2.5-flash",
+                 store=None, session_id=None, doc=None, context_cache=None, retriever=None):
+        self.model_name = model_name
+        self.persona = persona
+        self.temperature = temperature
+        self.limiter = limiter
+        self.doc = doc
+        self.context_cache = context_cache
+        self.retriever = retriever
+        self.summary_model = gemini_client.model(summary_model) if history_tokens else None
+        self.history = ChatHistory(max_tokens=history_tokens, keep_turns=keep_turns,
+                                   summarizer=self._summarize)
+        self.store = store if session_id else None
+        self.session_id = session_id
+        self.resumed_turns = 0  # 저장소에서 이어받은 세션의 전체 턴 수
+        if self.store is not None:
+            state = self.store.load(session_id)
+            if state is not None:
+                self.model_name, self.persona = state["model"], state["persona"]
+                self.history.restore(state["summary"], state["turns"], state["start"],
+                                     state["summarized"])
+                self.resumed_turns = state["total_turns"]
+        self._build()
+        self.last_usage = {}  # 직전 턴의 토큰 수 (prompt_tokens 는 API 의 usage_metadata)
+        self.last_used = time.monotonic()
+
+    def _build(self):
+        # 모델 (재)생성: 문서가 있으면 페르소나 + 문서 접두부를 캐시에 등록해 봄
+        self.prefix = []  # 캐시를 못 쓸 때 매 턴 앞에 붙일 contents
+        self.model = None
+        if self.doc:
+            prefix = [{"role": "user", "parts": [f"[참고 문서]\n{self.doc}"]},
+                      {"role": "model", "parts": ["네, 이 문서를 참고해서 답할게요."]}]
+            if self.context_cache is not None:
+                self.model = self.context_cache.model(
+                    self.model_name, self.persona or "You are a helpful assistant.", prefix,
+                    display_name="chat-doc")
+            if self.model is None:
+                self.prefix = prefix
+        if self.model is None:
+            self.model = build_model(self.model_name, self.persona)
+
+    def _save(self, turn=None):
+        if self.store is not None:
+            h = self.history
+            self.store.save(self.session_id, self.model_name, self.persona, h.summary, h.start,
+                            h.summarized_turns, turn=turn)
+
+    def _call(self, fn, *args, **kwargs):
+        if self.limiter is None:
+            return fn(*args, **kwargs)
+        # 429/503 은 limiter 가 백오프 후 재시도
+        return self.limiter.call(fn, *args, **kwargs)
+
+    def _summarize(self, prompt: str) -> str:
+        resp = self._call(self.summary_model.generate_content, prompt,
+                          generation_config={"temperature": 0.2, "max_output_tokens": 512})
+        return safe_text(resp)
+
+    def command(self, user_input: str) -> Optional[str]:
+        # 런타임 제어 명령이면 안내 문구를, 일반 메시지면 None 을 돌려줌
+        low = user_input.lower()
+        if low.startswith("/reset"):
+            self.history.clear()
+            self._save()
+            return "대화를 새로 시작할게요!"
+        if low.startswith("/sys"):
+            # /sys 뒤의 내용으로 persona 교체 (대화는 이어서)
+            self.persona = user_input[4:].strip() or self.persona
+            self._build()
+            self._save()
+            return "시스템 인스트럭션을 갱신했어요."
+        if low.startswith("/model"):
+            self.model_name = user_input[6:].strip() or self.model_name
+            self._build()
+            self._save()
+            return f"모델을 '{self.model_name}'로 바꿨어요."
+        return None
+
+    def _send(self, user_input, stream=False):
+        self.last_used = time.monotonic()
+        message, passages = user_input, []
+        if self.retriever is not None:
+            passages = self.retriever(user_input)
+            message = ASK_PROMPT.format(
+                passages="\n\n".join(f"[{n}] {p}" for n, p in enumerate(passages, 1)), question=user_input)
+        contents = self.prefix + self.history.contents(message)
+        self.last_usage = {"history_tokens": self.history.tokens() + approx_tokens(message),
+                           "retrieved": len(passages)}
+        return self._call(self.model.generate_content, contents,
+                          generation_config={"temperature": self.temperature}, stream=stream)
+
+    def _finish(self, user_input, reply, usage):
+        # 성공한 턴만 히스토리에 넣고 (필요하면 여기서 요약), 저장소에 기록, 토큰 수 기록
+        seq = self.history.start + len(self.history.turns)
+        self.history.add(user_input, reply)
+        self._save(turn=(seq, user_input, reply))
+        self.last_usage.update(
+            prompt_tokens=getattr(usage, "prompt_token_count", None),
+            candidate_tokens=getattr(usage, "candidates_token_count", None),
+            cached_tokens=getattr(usage, "cached_content_token_count", None) or 0,
+            history_turns=len(self.history.turns),
+            summarized_turns=self.history.summarized_turns)
+        self.last_used = time.monotonic()
+
+    def send(self, user_input: str) -> str:
+        resp = self._send(user_input)
+        reply = safe_text(resp)
+        self._finish(user_input, reply, getattr(resp, "usage_metadata", None))
+        return reply
+
+    def send_stream(self, user_input: str):
+        # 응답 조각을 도착하는 대로 내보냄 (조각 사이 공백 유지)
+        acc, usage = [], None
+        for chunk in self._send(user_input, stream=True):
+            usage = getattr(chunk, "usage_metadata", None) or usage
+            try:
+                txt = chunk.text
+            except ValueError:  # 파츠 없는 조각 (종료 신호 등)
+                txt = None
+            if txt:
+                acc.append(txt)
+                yield txt
+        self._finish(user_input, "".join(acc).strip(), usage)
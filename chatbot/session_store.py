@@ -0,0 +1,75 @@
+# session_store.py
+# 대화 세션 영구 저장 (SQLite WAL, clerk/summary_cache.py 와 같은 방식)
+# - turns: 턴마다 한 줄씩 덧붙이기만 함 (session, seq) 가 기본 키 → 세션별 seq 순서 인덱스
+# - sessions: 세션 상태 한 줄 (모델, 페르소나, 롤링 요약, 활성 창 시작 seq)
+# 이어받기(load)는 sessions 한 줄 + seq >= start 인 꼬리 턴만 읽음
+# (요약에 접힌 / reset 된 앞부분 턴은 읽지 않으므로 1만 턴 세션도 비용은 창 크기만큼)
+import pathlib, sqlite3, threading, time
+
+class SessionStore:
+    def __init__(self, path):
+        self.path = pathlib.Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        # 서버 모드에서 여러 스레드가 같이 쓰므로 연결 하나를 락으로 보호
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(str(self.path), check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS sessions ("
+            " id TEXT PRIMARY KEY, model TEXT NOT NULL, persona TEXT NOT NULL,"
+            " summary TEXT NOT NULL DEFAULT '', start INTEGER NOT NULL DEFAULT 0,"
+            " summarized INTEGER NOT NULL DEFAULT 0, turns INTEGER NOT NULL DEFAULT 0,"
+            " updated REAL NOT NULL)"
+        )
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS turns ("
+            " session TEXT NOT NULL, seq INTEGER NOT NULL, user TEXT NOT NULL, reply TEXT NOT NULL,"
+            " created REAL NOT NULL, PRIMARY KEY (session, seq)) WITHOUT ROWID"
+        )
+        self._db.commit()
+
+    def load(self, sid: str):
+        # 세션 상태 + 활성 창의 턴 [(사용자, 모델)] (없는 세션이면 None)
+        with self._lock:
+            row = self._db.execute(
+                "SELECT model, persona, summary, start, summarized, turns FROM sessions WHERE id=?",
+                (sid,)).fetchone()
+            if row is None:
+                return None
+            model, persona, summary, start, summarized, n_turns = row
+            turns = self._db.execute(
+                "SELECT user, reply FROM turns WHERE session=? AND seq>=? ORDER BY seq",
+                (sid, start)).fetchall()
+        return {"model": model, "persona": persona, "summary": summary, "start": start,
+                "summarized": summarized, "total_turns": n_turns, "turns": turns}
+
+    def save(self, sid: str, model: str, persona: str, summary: str, start: int, summarized: int,
+             turn=None):
+        # 세션 상태 갱신 (+ turn=(seq, 사용자, 모델) 이면 같은 트랜잭션에서 턴 추가)
+        now = time.time()
+        with self._lock:
+            if turn is not None:
+                seq, user, reply = turn
+                self._db.execute("INSERT OR REPLACE INTO turns(session, seq, user, reply, created) "
+                                 "VALUES (?, ?, ?, ?, ?)", (sid, seq, user, reply, now))
+            self._db.execute(
+                "INSERT INTO sessions(id, model, persona, summary, start, summarized, turns, updated) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?) "
+                "ON CONFLICT(id) DO UPDATE SET model=excluded.model, persona=excluded.persona, "
+                " summary=excluded.summary, start=excluded.start, summarized=excluded.summarized, "
+                " turns=MAX(sessions.turns, excluded.turns), updated=excluded.updated",
+                (sid, model, persona, summary, start, summarized,
+                 turn[0] + 1 if turn is not None else 0, now))
+            self._db.commit()
+
+    def delete(self, sid: str) -> bool:
+        with self._lock:
+            self._db.execute("DELETE FROM turns WHERE session=?", (sid,))
+            found = self._db.execute("DELETE FROM sessions WHERE id=?", (sid,)).rowcount > 0
+            self._db.commit()
+        return found
+
+    def close(self):
+        with self._lock:
+            self._db.close()
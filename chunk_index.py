@@ -0,0 +1,150 @@
+# chunk_index.py
+# 청크 검색 인덱스 (clerk/04-1-1-1-1.py 가 <stem>.index/ 로 만들고, chatbot/03-1-2-2.py --index 가 질의)
+# - BM25 (k1=1.2, b=0.75) 역색인: 용어 → [(청크 번호, 빈도)] postings 를 uint32 배열 하나에 이어 붙임
+#   meta.json 에 용어 → (오프셋, df), 청크 길이/오프셋; postings.bin / chunks.bin 은 mmap 으로 필요한 부분만 읽음
+# - 선택: 임베딩 벡터를 float32 vectors.npy 로 저장해 np.load(mmap_mode="r") 로 매핑,
+#   BM25 순위와 코사인 순위를 RRF(reciprocal rank fusion)로 합침 (NumPy 가 없으면 BM25 만)
+# - 토큰화: 영문/숫자는 단어, 한글은 음절 bigram (형태소 분석기 없이 조사가 붙은 어절도 맞도록)
+import array, json, math, mmap, pathlib, re, sys
+from collections import Counter
+
+try:
+    import numpy as np
+except ImportError:  # 임베딩 검색만 빠짐
+    np = None
+
+K1, B = 1.2, 0.75
+EMBED_BATCH = 100  # batchEmbedContents 한 요청에 넣을 수 있는 최대 항목 수
+RRF_K = 60
+WORD_RE = re.compile(r"[0-9a-z]+|[가-힣]+")
+STOPWORDS = {"the", "of", "and", "to", "in", "is", "for", "on", "with", "as", "by", "an", "be",
+             "are", "this", "that", "we", "it", "from", "at", "or"}
+
+def tokenize(text: str) -> list:
+    out = []
+    for w in WORD_RE.findall(text.lower()):
+        if w[0] >= "가":
+            out += [w] if len(w) == 1 else [w[i:i + 2] for i in range(len(w) - 1)]
+        elif len(w) > 1 and w not in STOPWORDS:
+            out.append(w)
+    return out
+
+def gemini_embedder(model_name, limiter=None, batch=EMBED_BATCH, dim=None):
+    # embed(texts, task) -> [[float]]: batch 개씩 묶어 요청 하나씩 (limiter 의 RPM 도 요청 단위로 셈)
+    # dim: output_dimensionality (줄이면 저장/질의 비용이 비례해서 줆)
+    import gemini_client
+
+    def embed(texts, task="retrieval_document"):
+        texts, out = list(texts), []
+        for s in range(0, len(texts), batch):
+            kwargs = dict(model=model_name, content=texts[s:s + batch], task_type=task)
+            if dim:
+                kwargs["output_dimensionality"] = dim
+            genai = gemini_client.genai()
+            resp = (limiter.call(genai.embed_content, **kwargs) if limiter is not None
+                    else genai.embed_content(**kwargs))
+            out += resp["embedding"]
+        return out
+    return embed
+
+class ChunkIndex:
+    def __init__(self, path):
+        self.path = pathlib.Path(path)
+        self.meta = json.loads((self.path / "meta.json").read_text(encoding="utf-8"))
+        self.terms = self.meta["terms"]          # 용어 → [postings 오프셋(쌍 단위), df]
+        self.lengths = self.meta["lengths"]      # 청크별 토큰 수
+        self.offsets = self.meta["offsets"]      # chunks.bin 안의 청크 경계 (바이트, N + 1개)
+        self.avgdl = sum(self.lengths) / max(1, len(self.lengths))
+        self._swap = self.meta.get("byteorder", sys.byteorder) != sys.byteorder
+        self._files = []
+        self._postings = self._map("postings.bin")
+        self._chunks = self._map("chunks.bin")
+        self.vectors = None
+        if self.meta.get("embed_model") and np is not None and (self.path / "vectors.npy").exists():
+            self.vectors = np.load(self.path / "vectors.npy", mmap_mode="r")
+            self._norms = np.linalg.norm(self.vectors, axis=1) + 1e-9
+
+    def _map(self, name):
+        f = (self.path / name).open("rb")
+        self._files.append(f)
+        # 빈 파일은 mmap 할 수 없음 (청크가 없거나 용어가 없는 경우)
+        return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) if f.seek(0, 2) else b""
+
+    @classmethod
+    def build(cls, path, chunks, embed=None, embed_model=None):
+        # 청크 목록으로 인덱스를 만들어 path 디렉터리에 기록하고 연 인덱스를 돌려줌
+        path = pathlib.Path(path)
+        path.mkdir(parents=True, exist_ok=True)
+        postings, lengths, offsets, pos = {}, [], [0], 0
+        with (path / "chunks.bin").open("wb") as f:
+            for i, ch in enumerate(chunks):
+                tf = Counter(tokenize(ch))
+                lengths.append(sum(tf.values()))
+                for term, n in tf.items():
+                    postings.setdefault(term, []).append((i, n))
+                data = ch.encode("utf-8")
+                f.write(data)
+                pos += len(data)
+                offsets.append(pos)
+        flat, terms = array.array("I"), {}
+        for term in sorted(postings):
+            terms[term] = [len(flat) // 2, len(postings[term])]
+            for i, n in postings[term]:
+                flat.extend((i, n))
+        with (path / "postings.bin").open("wb") as f:
+            flat.tofile(f)
+        if embed is not None and np is not None and chunks:
+            vecs = np.asarray(embed(chunks), dtype=np.float32)
+            np.save(path / "vectors.npy", vecs)
+        else:
+            embed_model = None
+            (path / "vectors.npy").unlink(missing_ok=True)
+        meta = {"version": 1, "k1": K1, "b": B, "byteorder": sys.byteorder, "embed_model": embed_model,
+                "lengths": lengths, "offsets": offsets, "terms": terms}
+        (path / "meta.json").write_text(json.dumps(meta, ensure_ascii=False), encoding="utf-8")
+        return cls(path)
+
+    def __len__(self):
+        return len(self.lengths)
+
+    def chunk(self, i: int) -> str:
+        return self._chunks[self.offsets[i]:self.offsets[i + 1]].decode("utf-8")
+
+    def bm25(self, query: str) -> dict:
+        n, scores = len(self), {}
+        for term in set(tokenize(query)):
+            entry = self.terms.get(term)
+            if entry is None:
+                continue
+            off, df = entry
+            idf = math.log(1 + (n - df + 0.5) / (df + 0.5))
+            pairs = array.array("I")
+            pairs.frombytes(self._postings[off * 8:(off + df) * 8])
+            if self._swap:
+                pairs.byteswap()
+            for i, tf in zip(pairs[0::2], pairs[1::2]):
+                norm = K1 * (1 - B + B * self.lengths[i] / self.avgdl)
+                scores[i] = scores.get(i, 0.0) + idf * tf * (K1 + 1) / (tf + norm)
+        return scores
+
+    def search(self, query: str, k=4, embed=None) -> list:
+        # 상위 k개 [(청크 번호, 점수)]; 벡터와 embed 가 있으면 BM25 + 코사인 순위를 RRF 로 합침
+        bm = self.bm25(query)
+        if self.vectors is None or embed is None:
+            return sorted(bm.items(), key=lambda kv: -kv[1])[:k]
+        q = np.asarray(embed([query], task="retrieval_query")[0], dtype=np.float32)
+        cos = (self.vectors @ q) / (self._norms * (np.linalg.norm(q) + 1e-9))
+        fused = {}
+        for rank, i in enumerate(sorted(bm, key=lambda i: -bm[i])):
+            fused[i] = 1.0 / (RRF_K + rank + 1)
+        for rank, i in enumerate(np.argsort(-cos)[:max(k * 4, 20)].tolist()):
+            fused[i] = fused.get(i, 0.0) + 1.0 / (RRF_K + rank + 1)
+        return sorted(fused.items(), key=lambda kv: -kv[1])[:k]
+
+    def close(self):
+        for m in (self._postings, self._chunks):
+            if isinstance(m, mmap.mmap):
+                m.close()
+        for f in self._files:
+            f.close()
+        self.vectors = None
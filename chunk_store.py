@@ -0,0 +1,157 @@
+# chunk_store.py
+# 청크 컨테이너 (clerk/04-1-1-1-1.py 가 <stem>.chunks.bin / .chunks.idx 로 쓰고 index·요약 단계, vector_store 가 읽음)
+# - <base>.bin: 매직 헤더 + [uint32 길이 + UTF-8 본문] 을 이어 붙인 blob (섹션 이름도 같은 형식, 같은 이름은 한 번만)
+# - <base>.idx: 헤더(매직, 버전, 레코드 크기, 개수) + 청크마다 고정 32바이트 레코드
+#   (본문 오프셋/길이, 섹션 오프셋/길이, 시작/끝 페이지; 페이지 0 = 모름)
+# - 두 파일 모두 mmap 으로 열어 k번째 청크를 O(1) 로 읽음 (문서 전체를 읽거나 파싱하지 않음)
+# - 쓰기는 임시 파일에 하고 close() 때 .bin → .idx 순서로 교체 (.idx 가 있으면 완성된 저장소)
+# 사람이 읽는 ===== CHUNK i/N ===== 텍스트는 export_text() 로 (clerk --chunks-txt)
+# 예) python chunk_store.py output/2310.08754v4.chunks 3        # 3번째 청크와 메타데이터
+#     python chunk_store.py output/2310.08754v4.chunks --export out.chunks.txt
+import argparse, mmap, os, pathlib, struct, sys
+
+BIN_MAGIC = b"CHNKBIN1"
+IDX_HEADER = struct.Struct("<4sHHQ")   # 매직, 버전, 레코드 크기, 청크 수
+IDX_MAGIC, VERSION = b"CIDX", 1
+RECORD = struct.Struct("<QIQIII")      # 본문 오프셋, 길이, 섹션 오프셋, 길이, 시작 페이지, 끝 페이지
+LENGTH = struct.Struct("<I")
+
+def paths(base):
+    base = pathlib.Path(base)
+    return base.with_name(base.name + ".bin"), base.with_name(base.name + ".idx")
+
+def export_text(chunks, path):
+    # 예전 .chunks.txt 형식 (사람이 읽는 용도)
+    chunks = list(chunks)
+    with pathlib.Path(path).open("w", encoding="utf-8") as f:
+        for i, ch in enumerate(chunks, 1):
+            f.write(f"\n\n===== CHUNK {i}/{len(chunks)} =====\n\n")
+            f.write(ch)
+
+class ChunkWriter:
+    # 청크를 들어오는 대로 기록 (개수를 미리 몰라도 됨: 스트리밍 모드)
+    def __init__(self, base):
+        self.bin_path, self.idx_path = paths(base)
+        self.bin_path.parent.mkdir(parents=True, exist_ok=True)
+        self._bin = open(self.bin_path.with_name(self.bin_path.name + ".tmp"), "wb")
+        self._idx = open(self.idx_path.with_name(self.idx_path.name + ".tmp"), "wb")
+        self._bin.write(BIN_MAGIC)
+        self._idx.write(IDX_HEADER.pack(IDX_MAGIC, VERSION, RECORD.size, 0))
+        self._pos = len(BIN_MAGIC)
+        self._sections = {}  # 섹션 이름 → (오프셋, 길이)
+        self.count = 0
+
+    def _blob(self, data: bytes):
+        off = self._pos
+        self._bin.write(LENGTH.pack(len(data)))
+        self._bin.write(data)
+        self._pos += LENGTH.size + len(data)
+        return off + LENGTH.size, len(data)
+
+    def add(self, text: str, section: str = "", pages=(0, 0)) -> int:
+        off, n = self._blob(text.encode("utf-8"))
+        if section not in self._sections:
+            self._sections[section] = self._blob(section.encode("utf-8")) if section else (0, 0)
+        s_off, s_n = self._sections[section]
+        self._idx.write(RECORD.pack(off, n, s_off, s_n, pages[0], pages[1]))
+        self.count += 1
+        return self.count - 1
+
+    def close(self):
+        self._idx.seek(0)
+        self._idx.write(IDX_HEADER.pack(IDX_MAGIC, VERSION, RECORD.size, self.count))
+        for f, path in ((self._bin, self.bin_path), (self._idx, self.idx_path)):
+            f.flush()
+            os.fsync(f.fileno())
+            f.close()
+            os.replace(f.name, path)
+
+    def abort(self):
+        for f in (self._bin, self._idx):
+            f.close()
+            os.unlink(f.name)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, *_):
+        self.abort() if exc_type else self.close()
+
+def write_chunks(base, chunks, metas=None):
+    # metas: 청크마다 {"section": ..., "pages": (시작, 끝)} (없으면 빈 메타데이터)
+    with ChunkWriter(base) as w:
+        for i, ch in enumerate(chunks):
+            w.add(ch, **(metas[i] if metas else {}))
+    return w.count
+
+class ChunkStore:
+    def __init__(self, base):
+        self.bin_path, self.idx_path = paths(base)
+        self._files = [open(self.bin_path, "rb"), open(self.idx_path, "rb")]
+        self._bin, self._idx = (mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) for f in self._files)
+        magic, version, size, self.count = IDX_HEADER.unpack_from(self._idx, 0)
+        if magic != IDX_MAGIC or version != VERSION or size != RECORD.size or self._bin[:8] != BIN_MAGIC:
+            self.close()
+            raise ValueError(f"{self.idx_path} 는 지원하지 않는 청크 저장소 형식입니다")
+
+    def __len__(self):
+        return self.count
+
+    def _record(self, k):
+        if not 0 <= k < self.count:
+            raise IndexError(k)
+        return RECORD.unpack_from(self._idx, IDX_HEADER.size + k * RECORD.size)
+
+    def __getitem__(self, k) -> str:
+        off, n = self._record(k)[:2]
+        return self._bin[off:off + n].decode("utf-8")
+
+    def meta(self, k) -> dict:
+        off, n, s_off, s_n, p0, p1 = self._record(k)
+        return {"offset": off, "length": n, "section": self._bin[s_off:s_off + s_n].decode("utf-8"),
+                "pages": (p0, p1)}
+
+    def __iter__(self):
+        return (self[k] for k in range(self.count))
+
+    def close(self):
+        for m in (getattr(self, "_bin", None), getattr(self, "_idx", None)):
+            if m is not None:
+                m.close()
+        for f in self._files:
+            f.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *_):
+        self.close()
+
+def read_chunks(base) -> list:
+    with ChunkStore(base) as store:
+        return list(store)
+
+def main():
+    parser = argparse.ArgumentParser(description="Inspect a clerk chunk store (<stem>.chunks.bin/.idx)")
+    parser.add_argument("store", help="Store path without .bin/.idx (e.g. output/<stem>.chunks)")
+    parser.add_argument("chunks", nargs="*", type=int, help="1-based chunk numbers to print")
+    parser.add_argument("--export", default=None, help="Write the human-readable ===== CHUNK i/N ===== text here")
+    args = parser.parse_args()
+
+    with ChunkStore(args.store) as store:
+        if args.export:
+            export_text(store, args.export)
+            print(f"Exported {len(store)} chunks → {args.export}")
+            return
+        if not args.chunks:
+            print(f"{len(store)} chunks ({store.bin_path.stat().st_size} bytes)")
+        for k in args.chunks:
+            m = store.meta(k - 1)
+            p0, p1 = m["pages"]
+            pages = "NA" if not p0 else str(p0) if p0 == p1 else f"{p0}-{p1}"
+            print(f"===== CHUNK {k}/{len(store)} | section: {m['section'] or 'NA'} | pages: {pages} "
+                  f"| {m['length']} bytes @ {m['offset']} =====")
+            print(store[k - 1])
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,65 +1,36 @@
 # 04-1-1-1.py (pdf to txt + clean + chunk)
 # 04-1-1-all_in_one.py
 # PDF → raw txt → cleaned txt → chunks → chunk summaries → final brief
-import os, sys, re, unicodedata, pathlib, argparse, time
-import fitz  # PyMuPDF
-from dotenv import load_dotenv
-import google.generativeai as genai
+# 청크 요약(map)과 merge/최종 브리프(reduce)는 따로 고른 모델로 (--map-model / --reduce-model, model_router.py)
+import os, sys, json, pathlib, argparse, time
+from concurrent.futures import ThreadPoolExecutor, as_completed, wait, FIRST_COMPLETED
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parent.parent))  # 루트 공용 모듈
+import gemini_client
+from gemini_rate_limit import RateLimiter
+from arxiv_clean import iter_clean_paragraphs, iter_layout_paragraphs
+from pdf_extract import extract_pages, iter_pages, process_pool
+from provenance import Provenance, format_pages, page_offsets, split_pages
+from request_scheduler import RequestScheduler
+from summary_cache import SummaryCache, request_key
+from stage_graph import Stage, StageGraph, Checkpoint
+from token_chunker import Chunker, TokenEstimator
+from run_metrics import RunMetrics, model_key, prometheus_text
+from model_router import ModelRouter, valid_chunk_summary
+from stream_output import OrderedStream
+import chunk_store
+# chunk_index / vector_store / chunk_dedup 은 NumPy 를 불러오므로 쓰는 단계에서 import (시작 시간)
 
 # ---------------- Utils ----------------
-def clean_arxiv_text(text: str) -> str:
-    # 1) 유니코드 정규화
-    text = unicodedata.normalize("NFKC", text)
-
-    # 2) arXiv 라인/단독 페이지 번호 제거
-    lines = []
-    for line in text.splitlines():
-        if re.search(r'arXiv:\d{4}\.\d{5,}(v\d+)?', line):
-            continue
-        if re.match(r'^\s*\d+\s*$', line):  # standalone page number
-            continue
-        lines.append(line.rstrip())
-    text = "\n".join(lines)
-
-    # 3) 하이픈 줄바꿈 결합: "hyphen-\nation" -> "hyphenation"
-    text = re.sub(r'(\w)-\n(\w)', r'\1\2', text)
-
-    # 4) 단락/개행 정리
-    text = text.replace("\r", "")
-    text = re.sub(r'\n{2,}', '<<<PARA>>>', text)   # 단락 토큰
-    text = re.sub(r'\n', ' ', text)                # 문장 내부 개행 → 공백
-    text = re.sub(r'\s*<<<PARA>>>\s*', '\n\n', text)  # 단락 복원
-
-    # 5) 섹션 헤더 보강 (숫자 헤더/타이틀)
-    text = re.sub(
-        r'\s*(^|\n)(\d+(\.\d+)*\s+[A-Z][^\n]{1,120})\s*',
-        lambda m: f"\n\n{m.group(2).strip()}\n\n",
-        text
-    )
-
-    # 6) 그림/표 캡션 태깅
-    text = re.sub(r'(Figure\s+\d+\s*:)', r'[FIGURE] \1', text, flags=re.IGNORECASE)
-    text = re.sub(r'(Table\s+\d+\s*:)',  r'[TABLE] \1',  text, flags=re.IGNORECASE)
-
-    # 7) 과도 공백 정리
-    text = re.sub(r'[ \t]{2,}', ' ', text)
-    text = re.sub(r'\n{3,}', '\n\n', text).strip()
-    return text
+def write_through(items, path, sep="", fmt=str):
+    # 항목을 그대로 흘려보내면서 파일에 sep로 이어 기록 (스트리밍 모드의 중간 산출물)
+    with path.open("w", encoding="utf-8") as f:
+        for n, item in enumerate(items):
+            if n:
+                f.write(sep)
+            f.write(fmt(item))
+            yield item
 
-def split_into_chunks(text: str, max_chars=2500):
-    chunks, buf, count = [], [], 0
-    for para in text.split("\n\n"):
-        p = para.strip()
-        if not p:
-            continue
-        if count + len(p) + 2 > max_chars and buf:
-            chunks.append("\n\n".join(buf))
-            buf, count = [], 0
-        buf.append(p)
-        count += len(p) + 2
-    if buf:
-        chunks.append("\n\n".join(buf))
-    return chunks
+SUMMARY_SEP = "\n\n---\n\n"
 
 def safe_text(resp) -> str:
     # SDK 버전 차이를 대비해 응답 텍스트 안전 추출
@@ -74,7 +45,20 @@ def safe_text(resp) -> str:
             return getattr(first, "text", str(first)).strip()
     return "(응답 파싱 실패)"
 
+def piece_text(chunk) -> str:
+    # 스트리밍 조각의 텍스트: safe_text 와 달리 앞뒤 공백을 살리고 (조각 사이 띄어쓰기),
+    # 파츠 없는 조각(종료 신호 등)은 "" 로
+    try:
+        return chunk.text or ""
+    except ValueError:
+        pass
+    cand = getattr(chunk, "candidates", None)
+    content = getattr(cand[0], "content", None) if cand else None
+    return "".join(getattr(p, "text", "") for p in (getattr(content, "parts", None) or []))
+
 # ---------------- Gemini prompts ----------------
+SYSTEM_INSTRUCTION = "당신은 문서와 논문을 분석·요약하는 한국어 AI 연구원입니다. 정확하고 간결하게 답하세요."
+
 CHUNK_PROMPT_TMPL = """역할: 당신은 논문을 읽고 핵심을 뽑아내는 한국어 AI 연구원입니다.
 규칙:
 1) 아래 본문 범위 안에서만 요약하고 추정/환각 금지.
@@ -108,116 +92,700 @@ FINAL_PROMPT_TMPL = """역할: 당신은 여러 섹션 요약을 통합해 '연
 {joined}
 """
 
+# 계층 축약(--reduce-fanout)의 중간 단계: 요약 K개 → 요약 1개 (형식은 청크 요약과 동일)
+MERGE_PROMPT_TMPL = """역할: 당신은 인접한 섹션 요약들을 하나로 합치는 한국어 AI 연구원입니다.
+규칙:
+1) 아래 요약들에 있는 내용만 사용하고, 중복은 합치되 숫자는 그대로 유지.
+2) 서로 다른 주장/결과는 빠뜨리지 말고 항목별 bullet로.
+[입력: 섹션 요약들]
+{joined}
+
+출력 형식(그대로 유지):
+- Claim:
+- Method:
+- Evidence/Numbers:
+- Limitations:
+"""
+
+TOKEN_APPROX = TokenEstimator()  # TPM 예약용 (보정 없는 근사치)
+
+def generate_cached(model, prompt, generation_config, cache=None, limiter=None, metrics=None,
+                    kind="generate", on_text=None):
+    # 같은 요청(모델/시스템 인스트럭션/프롬프트/설정)에 대한 답이 캐시에 있으면 API 호출 생략
+    # limiter: 실제 API 호출을 limiter.call()로 감쌈 (RPM/TPM 조절 + 429/503 재시도)
+    # metrics: 호출 종류(kind)별 지연(대기·재시도 포함)/첫 토큰까지 시간/usage_metadata 토큰/캐시 적중 기록
+    # on_text: 있으면 stream=True 로 받아 조각마다 on_text(조각) (캐시 적중이면 전체를 한 번에)
+    key = None
+    if cache is not None:
+        key = request_key(model.model_name, SYSTEM_INSTRUCTION, prompt, generation_config)
+        hit = cache.get(key)
+        if hit is not None:
+            if metrics is not None:
+                metrics.observe(kind, 0.0, cached=True, model=model.model_name)
+            if on_text is not None:
+                on_text(hit)
+            return hit
+    t0 = time.perf_counter()
+    kwargs = {"generation_config": generation_config}
+    if on_text is not None:
+        kwargs["stream"] = True
+    if limiter is not None:
+        # TPM 은 입력 + 출력 토큰 기준 (입력은 로컬 근사치)
+        tokens = TOKEN_APPROX.count(prompt) + generation_config.get("max_output_tokens", 0)
+        on_retry = (lambda status, delay: metrics.incr("retries")) if metrics is not None else None
+        resp = limiter.call(model.generate_content, prompt, tokens=tokens, on_retry=on_retry, **kwargs)
+    else:
+        resp = model.generate_content(prompt, **kwargs)
+    if on_text is None:
+        ttft = time.perf_counter() - t0  # 블로킹 호출은 응답 전체가 와야 첫 출력
+        text = safe_text(resp)
+    else:
+        ttft, pieces = None, []
+        for chunk in resp:
+            piece = piece_text(chunk)
+            if piece:
+                if ttft is None:
+                    ttft = time.perf_counter() - t0
+                pieces.append(piece)
+                on_text(piece)
+        text = "".join(pieces).strip() or "(응답 파싱 실패)"
+    if metrics is not None:
+        metrics.observe(kind, time.perf_counter() - t0, usage=getattr(resp, "usage_metadata", None),
+                        ttft=ttft, model=model.model_name)
+    if cache is not None and text != "(응답 파싱 실패)":
+        cache.put(key, text)
+    return text
+
 def summarize_chunk(model, chunk_text, section="Unknown", pages="NA",
-                    temperature=0.3, max_tokens=512):
+                    temperature=0.3, max_tokens=512, cache=None, limiter=None, metrics=None,
+                    on_text=None):
     prompt = CHUNK_PROMPT_TMPL.format(section=section, pages=pages, body=chunk_text)
-    resp = model.generate_content(
-        prompt,
-        generation_config={"temperature": temperature, "max_output_tokens": max_tokens}
+    return generate_cached(
+        model, prompt,
+        {"temperature": temperature, "max_output_tokens": max_tokens},
+        cache=cache, limiter=limiter, metrics=metrics, kind="summarize_chunk", on_text=on_text,
     )
-    return safe_text(resp)
 
-def combine_summaries(model, summaries, temperature=0.25, max_tokens=768):
-    joined = "\n\n---\n\n".join(summaries)
+def combine_summaries(model, summaries, temperature=0.25, max_tokens=768, cache=None,
+                      limiter=None, metrics=None, on_text=None):
+    joined = SUMMARY_SEP.join(summaries)
     prompt = FINAL_PROMPT_TMPL.format(joined=joined)
-    resp = model.generate_content(
-        prompt,
-        generation_config={"temperature": temperature, "max_output_tokens": max_tokens}
+    return generate_cached(
+        model, prompt,
+        {"temperature": temperature, "max_output_tokens": max_tokens},
+        cache=cache, limiter=limiter, metrics=metrics, kind="combine_summaries", on_text=on_text,
     )
-    return safe_text(resp)
+
+def try_summarize_chunk(model, i, chunk_text, scheduler, temperature=0.25, max_tokens=512,
+                        cache=None, metrics=None, sink=None, section=None, pages="NA", escalate=None):
+    # 청크별 실패 격리: 예외 대신 "(요약 실패: ...)" 를 돌려줌
+    # sink(OrderedStream): 요약 조각을 청크 순서대로 파일/stdout 에 흘려 씀
+    # section/pages: 청크 출처 (provenance.py); 모르면 청크 번호와 "NA"
+    # escalate: 요약이 출력 형식을 어기면 이 모델로 다시 요약 (스트리밍 중이면 sink 에 최종본이 덧붙음)
+    on_text = (lambda piece: sink.piece(i, piece)) if sink is not None else None
+    section = section or f"chunk-{i}"
+    try:
+        result = summarize_chunk(model, chunk_text, section=section, pages=pages,
+                                 temperature=temperature, max_tokens=max_tokens,
+                                 cache=cache, limiter=scheduler, metrics=metrics, on_text=on_text)
+        if escalate is not None and not valid_chunk_summary(result):
+            if metrics is not None:
+                metrics.incr("escalations")
+            result = summarize_chunk(escalate, chunk_text, section=section, pages=pages,
+                                     temperature=temperature, max_tokens=max_tokens,
+                                     cache=cache, limiter=scheduler, metrics=metrics)
+    except Exception as e:
+        if metrics is not None:
+            metrics.incr("chunk_failures")
+        result = f"(요약 실패: {e})"
+    scheduler.chunk_done()
+    if sink is not None:
+        sink.done(i, result)
+    return result
+
+def merge_summaries(model, summaries, temperature=0.25, max_tokens=768, cache=None,
+                    limiter=None, metrics=None):
+    prompt = MERGE_PROMPT_TMPL.format(joined=SUMMARY_SEP.join(summaries))
+    return generate_cached(
+        model, prompt,
+        {"temperature": temperature, "max_output_tokens": max_tokens},
+        cache=cache, limiter=limiter, metrics=metrics, kind="merge_summaries",
+    )
+
+def reduce_summaries(model, summaries, scheduler, fanout=0, temperature=0.25, max_tokens=768,
+                     cache=None, label="", metrics=None, on_text=None):
+    # 계층(트리) 축약: 요약을 fanout개씩 묶어 병렬로 합치고, fanout개 이하가 될 때까지 반복한 뒤
+    # 마지막에 combine_summaries 로 최종 브리프 작성 (fanout=0 이면 한 번에 combine)
+    # on_text: 최종 브리프만 조각 단위로 흘려보냄 (중간 merge 는 블로킹)
+    level = 0
+    while fanout > 1 and len(summaries) > fanout:
+        level += 1
+        t0 = time.monotonic()
+        groups = [summaries[i:i + fanout] for i in range(0, len(summaries), fanout)]
+        futures = [scheduler.submit(merge_summaries, model, g, temperature, max_tokens,
+                                    cache, scheduler, metrics) for g in groups]
+        summaries = [f.result() for f in futures]
+        print(f"  {label}reduce level {level}: {sum(map(len, groups))} → {len(summaries)} "
+              f"({time.monotonic() - t0:.2f}s)", flush=True)
+    t0 = time.monotonic()
+    final = combine_summaries(model, summaries, temperature=temperature, max_tokens=max_tokens,
+                              cache=cache, limiter=scheduler, metrics=metrics, on_text=on_text)
+    # 스트리밍이면 브리프 본문 뒤에 줄을 바꿔 찍음
+    print(("\n" if on_text is not None else "") + f"  {label}reduce level {level + 1} (final): "
+          f"{len(summaries)} → 1 ({time.monotonic() - t0:.2f}s)", flush=True)
+    return final
+
+def chunk_source(meta) -> dict:
+    # chunk_store 메타데이터 → 프롬프트의 section/pages 인자
+    return {"section": meta["section"] or None, "pages": format_pages(meta["pages"])}
+
+def summarize_chunks(model, chunks, scheduler, temperature=0.25, max_tokens=512, cache=None,
+                     done=None, on_result=None, label="", metrics=None, sink=None, dedup=None,
+                     describe=None, escalate=None):
+    # 공유 스케줄러에 청크 요약을 넣고, 결과는 청크 순서대로 반환
+    # done: 이미 끝난 {청크 번호: 요약} (체크포인트), on_result(i, 요약): 완료 콜백
+    # dedup(DedupIndex): 앞 청크의 (근사) 중복이면 요청하지 않고 그 청크의 요약을 재사용
+    # describe(i): 청크 출처 {"section", "pages"} (프롬프트 메타), escalate: 형식 위반 시 다시 요약할 모델
+    done = done or {}
+    results = [done.get(i) for i in range(1, len(chunks) + 1)]
+    copies = {}  # 대표 청크 번호 → 요약을 재사용할 중복 청크 번호들
+    finished = len(done)
+    if sink is not None:
+        for i in sorted(done):
+            sink.done(i, done[i])
+
+    def finish(i, summary, copied=False):
+        # copied: 중복 청크 (요청을 안 했으므로 sink 에도 여기서 알림)
+        nonlocal finished
+        finished += 1
+        results[i - 1] = summary
+        if on_result:
+            on_result(i, summary)
+        if sink is not None and copied:
+            sink.done(i, summary)
+        if sink is None or not sink.echo:  # stdout 스트리밍 중엔 진행 표시를 섞지 않음
+            print(f"   - {label}chunk {i}/{len(chunks)} done ({finished}/{len(chunks)})", flush=True)
+        for d in copies.pop(i, []):
+            finish(d, summary, copied=True)
+
+    futures = {}
+    for i, ch in enumerate(chunks, 1):
+        rep = dedup.add(i, ch) if dedup is not None else None
+        if i in done:
+            continue
+        if rep is not None:
+            if metrics is not None:
+                metrics.incr("dedup_skipped")
+            if results[rep - 1] is not None:
+                finish(i, results[rep - 1], copied=True)
+            else:
+                copies.setdefault(rep, []).append(i)
+            continue
+        futures[scheduler.submit(try_summarize_chunk, model, i, ch, scheduler,
+                                 temperature, max_tokens, cache, metrics, sink,
+                                 escalate=escalate, **(describe(i) if describe else {}))] = i
+    for fut in as_completed(futures):
+        finish(futures[fut], fut.result())
+    return results
+
+def summarize_stream(model, chunks, scheduler, temperature=0.25, max_tokens=512, cache=None,
+                     done=None, on_result=None, label="", max_inflight=8, metrics=None, sink=None,
+                     dedup=None, describe=None, escalate=None):
+    # 청크 이터레이터를 받아 완성되는 즉시 요약 요청; 결과는 청크 순서 리스트로 반환
+    # 대기 중인 요청을 max_inflight개로 묶어 두어 아직 요약 안 된 청크가 메모리에 쌓이지 않게 함
+    results = dict(done or {})
+    pending = {}
+    copies = {}  # 대표 청크 번호 → 요약을 재사용할 중복 청크 번호들
+
+    def finish(i, summary, copied=False):
+        results[i] = summary
+        if on_result:
+            on_result(i, summary)
+        if sink is not None and copied:
+            sink.done(i, summary)
+        if sink is None or not sink.echo:
+            print(f"   - {label}chunk {i} done", flush=True)
+        for d in copies.pop(i, []):
+            finish(d, summary, copied=True)
+
+    def collect(futs):
+        for fut in futs:
+            finish(pending.pop(fut), fut.result())
+
+    n = 0
+    for n, ch in enumerate(chunks, 1):
+        rep = dedup.add(n, ch) if dedup is not None else None
+        if n in results:
+            if sink is not None:
+                sink.done(n, results[n])
+            continue
+        if rep is not None:
+            if metrics is not None:
+                metrics.incr("dedup_skipped")
+            if rep in results:
+                finish(n, results[rep], copied=True)
+            else:
+                copies.setdefault(rep, []).append(n)
+            continue
+        while len(pending) >= max_inflight:
+            collect(wait(pending, return_when=FIRST_COMPLETED).done)
+        pending[scheduler.submit(try_summarize_chunk, model, n, ch, scheduler,
+                                 temperature, max_tokens, cache, metrics, sink,
+                                 escalate=escalate, **(describe(n) if describe else {}))] = n
+    collect(list(pending))
+    return [results[i] for i in range(1, n + 1)]
 
 # ---------------- Main ----------------
+def run_document(pdf_path, args, models, cache, scheduler, chunker, extract_pool=None, label="",
+                 vectors=None):
+    # PDF 한 건을 단계 그래프로 처리하고 출력 파일 목록을 반환
+    # models(ModelRouter): 청크 요약은 models.map (형식 위반 시 models.escalation), 축약은 models.reduce
+    # label: 배치 모드에서 로그 앞에 붙일 문서 이름
+    outdir = pathlib.Path(args.outdir)
+    stem = pdf_path.stem
+
+    raw_file = outdir / f"{stem}.raw.txt"
+    clean_file = outdir / f"{stem}.clean.txt"
+    # 출처 사이드카: 페이지 시작 오프셋 / 정제 단락별 페이지 + 섹션 제목 (provenance.py)
+    pages_file = outdir / f"{stem}.raw.pages.json"
+    meta_file = outdir / f"{stem}.clean.meta.json"
+    # 청크: <stem>.chunks.bin (본문 blob) + .chunks.idx (고정 폭 인덱스), --chunks-txt 면 텍스트도
+    chunks_base = outdir / f"{stem}.chunks"
+    chunk_files = list(chunk_store.paths(chunks_base))
+    chunks_txt = outdir / f"{stem}.chunks.txt"
+    chunk_sum_file = outdir / f"{stem}.chunk_summaries.txt"
+    # 최종 단계 입력: 청크 요약 JSON 목록 (요약 본문에 "---" 가 있어도 .txt 를 구분자로 다시 자르지 않음)
+    chunk_sum_json = outdir / f"{stem}.chunk_summaries.json"
+    final_file = outdir / f"{stem}.summary.txt"
+    run_file = outdir / f"{stem}.run.json"
+    index_dir = outdir / f"{stem}.index"
+    metrics = RunMetrics()
+    # --stream-output: 요약 조각을 도착하는 대로 파일에 (단일 문서면 stdout 에도) 씀
+    echo = args.stream_output and not args.input_dir
+
+    def chunk_dedup():
+        if args.no_dedup:
+            return None
+        from chunk_dedup import DedupIndex
+        return DedupIndex(args.dedup_threshold)
+
+    def report_dedup(dedup):
+        if dedup is not None and dedup.exact + dedup.near:
+            saved = metrics.counters.get("dedup_skipped", 0)
+            print(f"  {label}Dedup: {dedup.exact} exact + {dedup.near} near-duplicate chunk(s) "
+                  f"reuse an earlier summary → {saved} API call(s) saved")
+
+    def chunk_sink():
+        if not args.stream_output:
+            return None
+        return OrderedStream(chunk_sum_file, sep=SUMMARY_SEP, echo=echo,
+                             header=lambda i: f"\n[{label}chunk {i}]\n")
+    graph = StageGraph(outdir / f"{stem}.stages.json", force=args.force, label=label,
+                       metrics=metrics)
+
+    # 1) PDF → raw text
+    def extract():
+        print(f"{label}[1/5] Extracting text from PDF ...")
+        # 페이지 범위를 나눠 프로세스 풀에서 추출 (배치 모드는 공유 풀 사용)
+        pages = extract_pages(pdf_path, workers=args.extract_workers, pool=extract_pool,
+                              layout=args.layout)
+        raw_file.write_text("\n\n".join(pages), encoding="utf-8")
+        pages_file.write_text(json.dumps(page_offsets(pages)), encoding="utf-8")
+        print(f"  {label}Saved:", raw_file)
+
+    # 2) Clean
+    def clean():
+        print(f"{label}[2/5] Cleaning text ...")
+        # 페이지별로 정제해 단락마다 페이지를 기록 (스트리밍 모드와 같은 결과)
+        # 레이아웃 추출은 이미 단락 단위: 끊긴 단락 잇기 + 캡션 태깅만
+        offsets = json.loads(pages_file.read_text(encoding="utf-8"))
+        pages = split_pages(raw_file.read_text(encoding="utf-8"), offsets)
+        clean_paras = iter_layout_paragraphs if args.layout else iter_clean_paragraphs
+        prov = Provenance()
+        cleaned = "\n\n".join(prov.track(clean_paras(pages, keep_refs=args.keep_refs, with_pages=True)))
+        clean_file.write_text(cleaned, encoding="utf-8")
+        prov.save(meta_file)
+        print(f"  {label}Saved:", clean_file)
+
+    # 3) Chunk
+    def chunk():
+        print(f"{label}[3/5] Splitting into chunks ...")
+        prov = Provenance.load(meta_file)
+        pairs = list(chunker(clean_file.read_text(encoding="utf-8").split("\n\n"), with_ids=True))
+        chunks = [c for c, _ in pairs]
+        chunk_store.write_chunks(chunks_base, chunks, [prov.chunk_meta(ids) for _, ids in pairs])
+        print(f"  {label}Chunks: {len(chunks)} | Saved:", chunk_files[1])
+        export_chunks(chunks)
+
+    def export_chunks(chunks):
+        if args.chunks_txt:
+            chunk_store.export_text(chunks, chunks_txt)
+            print(f"  {label}Saved:", chunks_txt)
+
+    # 4) Summarize each chunk (완료된 청크는 체크포인트에 즉시 기록)
+    def summarize():
+        print(f"{label}[4/5] Summarizing chunks with Gemini (workers={args.workers}) ...")
+        with chunk_store.ChunkStore(chunks_base) as store:
+            chunks = list(store)
+            sources = [chunk_source(store.meta(k)) for k in range(len(store))]
+        ckpt = Checkpoint(outdir / f"{stem}.chunk_summaries.partial.jsonl",
+                          graph.fingerprint(summarize_stage), resume=args.resume)
+        if ckpt.done:
+            print(f"  {label}Resuming: {len(ckpt.done)}/{len(chunks)} chunks already summarized")
+
+        def on_result(i, s):
+            if not s.startswith("(요약 실패"):
+                ckpt.record(i, s)
+
+        sink, dedup = chunk_sink(), chunk_dedup()
+        try:
+            chunk_summaries = summarize_chunks(models.map, chunks, scheduler,
+                                               temperature=0.25, max_tokens=512, cache=cache,
+                                               done=ckpt.done, on_result=on_result, label=label,
+                                               metrics=metrics, sink=sink, dedup=dedup,
+                                               describe=lambda i: sources[i - 1],
+                                               escalate=models.escalation)
+        finally:
+            if sink is not None:
+                sink.close()
+        report_dedup(dedup)
+        return finish_summaries(ckpt, chunk_summaries)
+
+    def finish_summaries(ckpt, chunk_summaries):
+        # 스트리밍으로 써 둔 파일도 최종 텍스트로 다시 씀 (조각 사이 공백/실패 표시 정리)
+        chunk_sum_file.write_text(SUMMARY_SEP.join(chunk_summaries), encoding="utf-8")
+        chunk_sum_json.write_text(json.dumps(chunk_summaries, ensure_ascii=False), encoding="utf-8")
+        print(f"  {label}Saved:", chunk_sum_file)
+        failed = sum(s.startswith("(요약 실패") for s in chunk_summaries)
+        # 실패 청크가 있으면 체크포인트를 남겨 --resume 으로 이어서 처리
+        ckpt.close(remove=not failed)
+        if failed:
+            print(f"  [Warn] {label}{failed} chunk(s) failed; rerun with --resume to retry them", file=sys.stderr)
+            return False
+
+    # 1~4) 스트리밍: 페이지 → 정제 단락 → 청크 → 요약 요청까지 제너레이터로 연결
+    # 메모리에는 처리 중인 몇 페이지와 대기 중인 청크만 올라감
+    def stream():
+        print(f"{label}[1-4/5] Streaming extract → clean → chunk → summarize "
+              f"(workers={args.workers}) ...")
+        ckpt = Checkpoint(outdir / f"{stem}.chunk_summaries.partial.jsonl",
+                          graph.fingerprint(stream_stage), resume=args.resume)
+        if ckpt.done:
+            print(f"  {label}Resuming: {len(ckpt.done)} chunks already summarized")
+
+        def on_result(i, s):
+            if not s.startswith("(요약 실패"):
+                ckpt.record(i, s)
+
+        # 청크는 나오는 대로 출처와 함께 저장소에 추가 (개수를 미리 알 필요 없음)
+        writer = chunk_store.ChunkWriter(chunks_base)
+        prov, sources = Provenance(), []
+
+        def store_chunks(items):
+            for c, ids in items:
+                meta = prov.chunk_meta(ids)
+                writer.add(c, **meta)
+                sources.append(chunk_source(meta))
+                yield c
+
+        pages = write_through(iter_pages(pdf_path, layout=args.layout), raw_file, sep="\n\n")
+        clean_paras = iter_layout_paragraphs if args.layout else iter_clean_paragraphs
+        paras = write_through(prov.track(clean_paras(pages, keep_refs=args.keep_refs, with_pages=True)),
+                              clean_file, sep="\n\n")
+        sink, dedup = chunk_sink(), chunk_dedup()
+        try:
+            chunk_summaries = summarize_stream(models.map, store_chunks(chunker(paras, with_ids=True)), scheduler,
+                                               temperature=0.25, max_tokens=512, cache=cache,
+                                               done=ckpt.done, on_result=on_result, label=label,
+                                               max_inflight=max(4, 2 * args.workers), metrics=metrics,
+                                               sink=sink, dedup=dedup, describe=lambda i: sources[i - 1],
+                                               escalate=models.escalation)
+        except BaseException:
+            writer.abort()
+            raise
+        finally:
+            if sink is not None:
+                sink.close()
+        writer.close()
+        report_dedup(dedup)
+        print(f"  {label}Saved:", raw_file)
+        print(f"  {label}Saved:", clean_file)
+        print(f"  {label}Chunks: {len(chunk_summaries)} | Saved:", chunk_files[1])
+        if args.chunks_txt:
+            export_chunks(chunk_store.read_chunks(chunks_base))
+        return finish_summaries(ckpt, chunk_summaries)
+
+    # 청크 검색 인덱스 (BM25 + 선택적 임베딩): chatbot/03-1-2-2.py --index 로 질의
+    def index():
+        from chunk_index import ChunkIndex, gemini_embedder
+        print(f"{label}[index] Building retrieval index ...")
+        chunks = chunk_store.read_chunks(chunks_base)
+        embed = None
+        if vectors is not None:
+            # 공용 벡터 저장소를 거쳐 임베딩 (이미 본 내용의 청크는 API 호출 없이 재사용)
+            # 차원을 안 줬으면 저장소 차원으로 (기본 차원 벡터가 저장소와 안 맞아 버려지지 않게)
+            raw_embed = gemini_embedder(args.embed_model, scheduler.limiter, dim=args.embed_dim or vectors.dim)
+            embed = lambda texts: vectors.vectors(vectors.add(stem, texts, raw_embed))
+        try:
+            idx = ChunkIndex.build(index_dir, chunks, embed=embed, embed_model=args.embed_model)
+        except ValueError as e:
+            # 저장소와 차원이 다른 임베딩 등: 이 단계만 실패로 남기고 나머지 단계는 계속
+            print(f"  [Warn] {label}index failed: {e}", file=sys.stderr)
+            return False
+        dims = "" if idx.vectors is None else f", {idx.vectors.shape[1]}-dim vectors"
+        print(f"  {label}Index: {len(idx)} chunks, {len(idx.terms)} terms{dims} | Saved:", index_dir)
+        idx.close()
+
+    # 5) Combine into final brief
+    def combine():
+        print(f"{label}[5/5] Composing final research brief ...")
+        chunk_summaries = json.loads(chunk_sum_json.read_text(encoding="utf-8"))
+        sink = (OrderedStream(final_file, echo=echo, header=lambda i: f"\n[{label}final brief]\n")
+                if args.stream_output else None)
+        try:
+            final = reduce_summaries(models.reduce, chunk_summaries, scheduler,
+                                     fanout=args.reduce_fanout, temperature=0.25,
+                                     max_tokens=768, cache=cache, label=label, metrics=metrics,
+                                     on_text=(lambda piece: sink.piece(1, piece)) if sink else None)
+        except Exception as e:
+            final = f"(최종 요약 실패: {e})"
+        if sink is not None:
+            sink.done(1, final)
+            sink.close()
+        final_file.write_text(final, encoding="utf-8")
+        print(f"  {label}Saved:", final_file)
+        if final.startswith("(최종 요약 실패"):
+            return False
+
+    txt_out = [chunks_txt] if args.chunks_txt else []
+    summarize_stage = Stage("chunk_summaries", chunk_files, [chunk_sum_file, chunk_sum_json], summarize,
+                            params={"model": models.map.model_name, "system": SYSTEM_INSTRUCTION,
+                                    "escalate_model": models.escalation and models.escalation.model_name,
+                                    "prompt": CHUNK_PROMPT_TMPL,
+                                    "temperature": 0.25, "max_tokens": 512,
+                                    "dedup": None if args.no_dedup else args.dedup_threshold})
+    if args.streaming:
+        stream_stage = Stage("stream", [pdf_path],
+                             [raw_file, clean_file, *chunk_files, chunk_sum_file, chunk_sum_json] + txt_out, stream,
+                             params={**summarize_stage.params, **chunker.params,
+                                     "keep_refs": args.keep_refs, "layout": args.layout})
+        graph.add(stream_stage)
+        last = "stream"
+    else:
+        graph.add(Stage("raw", [pdf_path], [raw_file, pages_file], extract, params={"layout": args.layout}))
+        graph.add(Stage("clean", [raw_file, pages_file], [clean_file, meta_file], clean,
+                        params={"keep_refs": args.keep_refs, "layout": args.layout}), after=["raw"])
+        graph.add(Stage("chunks", [clean_file, meta_file], chunk_files + txt_out, chunk,
+                        params=chunker.params), after=["clean"])
+        graph.add(summarize_stage, after=["chunks"])
+        last = "chunk_summaries"
+    if not args.no_index:
+        graph.add(Stage("index", chunk_files, [index_dir / "meta.json"], index,
+                        # 벡터 저장소를 못 열어 BM25 만으로 만든 인덱스는 다음 실행에서 다시 빌드
+                        params={"embed_model": args.embed_model, "embed_dim": args.embed_dim,
+                                "vectors": vectors is not None, "version": 1}),
+                  after=["stream" if args.streaming else "chunks"])
+    graph.add(Stage("summary", [chunk_sum_json], [final_file], combine,
+                    params={"model": models.reduce.model_name, "system": SYSTEM_INSTRUCTION,
+                            "prompt": FINAL_PROMPT_TMPL, "merge_prompt": MERGE_PROMPT_TMPL,
+                            "reduce_fanout": args.reduce_fanout,
+                            "temperature": 0.25, "max_tokens": 768}),
+              after=[last])
+    graph.run()
+    # 단계별 시간, 호출별 지연/토큰, 재시도·실패 횟수
+    report = metrics.write(run_file, doc=stem, pdf=str(pdf_path), map_model=models.map.model_name,
+                           reduce_model=models.reduce.model_name, workers=args.workers,
+                           streaming=args.streaming)
+    brief = report["calls"].get("combine_summaries", {})
+    ttft = f", brief TTFT {brief['ttft_p50_s']:.2f}s" if brief.get("requests") else ""
+    print(f"  {label}Run: {report['wall_s']:.2f}s wall, {report['cpu_s']:.2f}s CPU, "
+          f"{report['tokens']['prompt']} prompt ({report['tokens']['cached']} cached) + "
+          f"{report['tokens']['candidates']} output tokens{ttft} "
+          f"| Saved: {run_file}")
+    # 모델 계층별 지연/토큰/비용 (+ 형식 위반으로 큰 모델에 다시 보낸 청크 수)
+    for name, m in report["models"].items():
+        cost = "n/a" if m["cost_usd"] is None else f"${m['cost_usd']:.4f}"
+        print(f"  {label}Model {name}: {m['requests']} requests ({m['cache_hits']} cached), "
+              f"p50 {m['p50_s']:.2f}s / p95 {m['p95_s']:.2f}s, "
+              f"{m['prompt_tokens']} + {m['candidate_tokens']} tokens, {cost}")
+    if report["counters"].get("escalations"):
+        print(f"  {label}Escalated {report['counters']['escalations']} chunk summaries "
+              f"to {model_key(models.escalation.model_name)} (format check failed)")
+    files = [raw_file, clean_file, chunk_files[1]] + txt_out + [chunk_sum_file, chunk_sum_json, final_file,
+                                                                run_file]
+    return files + ([] if args.no_index else [index_dir])
+
+
+def run_batch(pdfs, args, models, cache, scheduler, chunker, vectors=None):
+    # 여러 PDF를 한 프로세스에서 처리
+    # - 추출: 프로세스 풀 / 정제·청크: 문서 스레드 / 요약: 공유 스케줄러
+    started = time.monotonic()
+    docs_done, failed = 0, []
+    with process_pool(args.extract_workers or None) as extract_pool, \
+            ThreadPoolExecutor(max_workers=max(1, args.docs_in_flight)) as doc_pool:
+        futures = {doc_pool.submit(run_document, p, args, models, cache, scheduler, chunker,
+                                   extract_pool, f"{p.stem}: ", vectors): p for p in pdfs}
+        for fut in as_completed(futures):
+            pdf = futures[fut]
+            try:
+                fut.result()
+            except Exception as e:
+                failed.append(pdf)
+                print(f"[Error] {pdf}: {e}", file=sys.stderr)
+            docs_done += 1
+            elapsed = time.monotonic() - started
+            print(f"[docs {docs_done}/{len(pdfs)}] {pdf.name} | "
+                  f"{docs_done / elapsed * 60:.2f} docs/min, "
+                  f"{scheduler.chunks_done / elapsed:.2f} chunks/sec, "
+                  f"{scheduler.completed / elapsed:.2f} requests/sec", flush=True)
+    return failed
+
 def main():
     parser = argparse.ArgumentParser(description="PDF→TXT→Clean→Chunk→Summarize pipeline")
-    parser.add_argument("--pdf", required=True, help="PDF file path")
+    src = parser.add_mutually_exclusive_group(required=True)
+    src.add_argument("--pdf", help="PDF file path")
+    src.add_argument("--input-dir", help="Process every PDF in this directory (batch mode)")
+    parser.add_argument("--glob", default="*.pdf", help="File pattern inside --input-dir")
     parser.add_argument("--outdir", default="output", help="Output directory")
     parser.add_argument("--model", default="gemini-1.5-pro", help="Gemini model name")
+    parser.add_argument("--map-model", default=None,
+                        help="Model for chunk summaries (default: --model; e.g. gemini-1.5-flash)")
+    parser.add_argument("--reduce-model", default=None,
+                        help="Model for merges and the final brief, and for re-summarizing chunks whose "
+                             "summary breaks the Claim/Method/Evidence/Limitations format (default: --model)")
+    parser.add_argument("--no-escalate", action="store_true",
+                        help="Keep map-model chunk summaries even when they fail the format check")
     parser.add_argument("--max-chars", type=int, default=2500, help="Max chars per chunk")
+    parser.add_argument("--chunk-tokens", type=int, default=0,
+                        help="Size chunks by tokens instead of --max-chars (0 = off)")
+    parser.add_argument("--overlap-tokens", type=int, default=0,
+                        help="Tokens of trailing context repeated at the start of the next chunk")
+    parser.add_argument("--pack-context", type=float, default=0.0,
+                        help="Fill chunks up to this fraction of the model's input token limit (e.g. 0.5)")
     parser.add_argument("--keep-refs", action="store_true", help="Keep References section")
+    parser.add_argument("--chunks-txt", action="store_true",
+                        help="Also export chunks as human-readable <stem>.chunks.txt (===== CHUNK i/N =====)")
+    parser.add_argument("--layout", action="store_true",
+                        help="Layout-aware extraction: drop headers/footers and figure labels by position and font, "
+                             "detect headings by font, emit paragraphs in reading order")
+    parser.add_argument("--workers", type=int, default=1, help="Concurrent chunk summary requests")
+    parser.add_argument("--reduce-fanout", type=int, default=0,
+                        help="Combine summaries in a tree, K at a time (0 = one combine call)")
+    parser.add_argument("--rpm", type=int, default=int(os.getenv("GEMINI_RPM", "0") or 0),
+                        help="Max Gemini requests per minute (0 = unlimited)")
+    parser.add_argument("--tpm", type=int, default=int(os.getenv("GEMINI_TPM", "0") or 0),
+                        help="Max Gemini tokens per minute, input + output (0 = unlimited)")
+    parser.add_argument("--max-retries", type=int, default=5,
+                        help="Retries per request on 429/500/503 (exponential backoff with jitter)")
+    parser.add_argument("--extract-workers", type=int, default=0,
+                        help="PDF extraction processes (0 = CPU count in batch mode, sequential for a single PDF)")
+    parser.add_argument("--docs-in-flight", type=int, default=4, help="Documents processed concurrently in batch mode")
+    parser.add_argument("--streaming", action="store_true",
+                        help="Stream pages through clean/chunk/summarize with bounded memory")
+    parser.add_argument("--cache-dir", default=None, help="Response cache directory (default: <outdir>/.cache)")
+    parser.add_argument("--cache-max-mb", type=int, default=256, help="Response cache size limit (MB)")
+    parser.add_argument("--no-cache", action="store_true", help="Disable the response cache")
+    parser.add_argument("--resume", action="store_true", help="Reuse checkpointed chunk summaries from an interrupted run")
+    parser.add_argument("--force", action="store_true", help="Recompute every stage even if inputs are unchanged")
+    parser.add_argument("--dedup-threshold", type=float, default=0.8,
+                        help="Reuse the summary of an earlier chunk when MinHash Jaccard similarity is at least this")
+    parser.add_argument("--no-dedup", action="store_true", help="Summarize every chunk, even exact duplicates")
+    parser.add_argument("--stream-output", action="store_true",
+                        help="Stream chunk summaries and the final brief to their files (and stdout) as tokens arrive")
+    parser.add_argument("--metrics-prom", default=None,
+                        help="Also write run metrics in Prometheus text format to this file")
+    parser.add_argument("--no-index", action="store_true", help="Skip the chunk retrieval index (<stem>.index/)")
+    parser.add_argument("--embed-model", default=None,
+                        help="Also store chunk embeddings in the index (e.g. models/text-embedding-004)")
+    parser.add_argument("--embed-dim", type=int, default=None,
+                        help="Embedding output_dimensionality (smaller = faster search, e.g. 256)")
+    parser.add_argument("--vector-store", default=None,
+                        help="Shared embedding store for --embed-model (default: <outdir>/vectors)")
     args = parser.parse_args()
 
-    load_dotenv()
-    api_key = os.getenv("GEMINI_API_KEY")
-    if not api_key:
-        print("[Error] GEMINI_API_KEY가 없습니다. .env에 키를 넣으세요.", file=sys.stderr)
-        sys.exit(1)
+    # SDK 는 첫 요청 때 import + configure (응답 캐시만으로 끝나는 실행은 SDK 를 불러오지 않음)
+    gemini_client.require_api_key()
+    map_name, reduce_name = args.map_model or args.model, args.reduce_model or args.model
+    map_model = gemini_client.model(map_name, system_instruction=SYSTEM_INSTRUCTION)
+    reduce_model = (map_model if reduce_name == map_name
+                    else gemini_client.model(reduce_name, system_instruction=SYSTEM_INSTRUCTION))
+    models = ModelRouter(map_model, reduce_model, escalate=not args.no_escalate)
 
-    genai.configure(api_key=api_key)
-    model = genai.GenerativeModel(
-        model_name=args.model,
-        system_instruction="당신은 문서와 논문을 분석·요약하는 한국어 AI 연구원입니다. 정확하고 간결하게 답하세요."
-    )
-
-    pdf_path = pathlib.Path(args.pdf)
     outdir = pathlib.Path(args.outdir)
     outdir.mkdir(parents=True, exist_ok=True)
-    stem = pdf_path.stem
 
-    # 1) PDF → raw text
-    print("[1/5] Extracting text from PDF ...")
-    pages = []
-    with fitz.open(str(pdf_path)) as doc:
-        for pg in doc:
-            pages.append(pg.get_text("text"))
-    raw_text = "\n\n".join(pages)
-    raw_file = outdir / f"{stem}.raw.txt"
-    raw_file.write_text(raw_text, encoding="utf-8")
-    print("  Saved:", raw_file)
+    cache = None
+    if not args.no_cache:
+        cache = SummaryCache(args.cache_dir or outdir / ".cache",
+                             max_bytes=args.cache_max_mb * 1024 * 1024)
+    limiter = RateLimiter(rpm=args.rpm, tpm=args.tpm, max_retries=args.max_retries)
+    scheduler = RequestScheduler(workers=args.workers, limiter=limiter)
 
-    # 2) Clean
-    print("[2/5] Cleaning text ...")
-    cleaned = clean_arxiv_text(raw_text)
-    if not args.keep_refs:
-        cleaned = re.split(r'\n\s*References\s*\n', cleaned, maxsplit=1)[0]
-    clean_file = outdir / f"{stem}.clean.txt"
-    clean_file.write_text(cleaned, encoding="utf-8")
-    print("  Saved:", clean_file)
+    # 임베딩: output 전체가 같이 쓰는 벡터 저장소 (NumPy 가 없으면 BM25 인덱스만)
+    vectors = None
+    if args.embed_model and not args.no_index:
+        from vector_store import VectorStore
+        try:
+            vectors = VectorStore(args.vector_store or outdir / "vectors", args.embed_model)
+            vectors.check_dim(args.embed_dim)
+        except (RuntimeError, ValueError) as e:
+            if vectors is not None:
+                vectors.close()
+                vectors = None
+            print(f"[Warn] 임베딩 없이 BM25 인덱스만 만듭니다: {e}", file=sys.stderr)
 
-    # 3) Chunk
-    print("[3/5] Splitting into chunks ...")
-    chunks = split_into_chunks(cleaned, max_chars=args.max_chars)
-    chunks_file = outdir / f"{stem}.chunks.txt"
-    with chunks_file.open("w", encoding="utf-8") as f:
-        for i, ch in enumerate(chunks, 1):
-            f.write(f"\n\n===== CHUNK {i}/{len(chunks)} =====\n\n")
-            f.write(ch)
-    print(f"  Chunks: {len(chunks)} | Saved:", chunks_file)
-
-    # 4) Summarize each chunk
-    print("[4/5] Summarizing chunks with Gemini ...")
-    chunk_summaries = []
-    for i, ch in enumerate(chunks, 1):
-        print(f"   - chunk {i}/{len(chunks)} ...", end="", flush=True)
+    # 청크 크기: 글자 수(--max-chars) 또는 토큰 수(--chunk-tokens / --pack-context)
+    # 청크는 map 모델에 보내므로 그 모델 기준으로 크기를 잼
+    estimator = TokenEstimator(models.map, cache_file=pathlib.Path(args.cache_dir or outdir / ".cache")
+                               / "token_calibration.json")
+    chunk_tokens = args.chunk_tokens
+    if args.pack_context:
         try:
-            s = summarize_chunk(model, ch, section=f"chunk-{i}", pages="NA",
-                                temperature=0.25, max_tokens=512)
+            limit = gemini_client.genai().get_model(models.map.model_name).input_token_limit
         except Exception as e:
-            s = f"(요약 실패: {e})"
-        chunk_summaries.append(s)
-        print(" done")
-
-    chunk_sum_file = outdir / f"{stem}.chunk_summaries.txt"
-    chunk_sum_file.write_text("\n\n---\n\n".join(chunk_summaries), encoding="utf-8")
-    print("  Saved:", chunk_sum_file)
+            print(f"[Error] 모델 입력 한도를 가져오지 못했습니다: {e}", file=sys.stderr)
+            sys.exit(1)
+        overhead = estimator.count(SYSTEM_INSTRUCTION + CHUNK_PROMPT_TMPL)
+        chunk_tokens = max(1, int(limit * args.pack_context) - overhead)
+        print(f"Packing chunks to {chunk_tokens} tokens "
+              f"({args.pack_context:.0%} of {limit} input tokens)")
+    chunker = Chunker(max_chars=args.max_chars, max_tokens=chunk_tokens,
+                      overlap_tokens=args.overlap_tokens, estimator=estimator)
 
-    # 5) Combine into final brief
-    print("[5/5] Composing final research brief ...")
     try:
-        final = combine_summaries(model, chunk_summaries,
-                                  temperature=0.25, max_tokens=768)
-    except Exception as e:
-        final = f"(최종 요약 실패: {e})"
-    final_file = outdir / f"{stem}.summary.txt"
-    final_file.write_text(final, encoding="utf-8")
-    print("  Saved:", final_file)
-
-    print("\nDone ✅")
-    print("Files:")
-    print(" -", raw_file)
-    print(" -", clean_file)
-    print(" -", chunks_file)
-    print(" -", chunk_sum_file)
-    print(" -", final_file)
+        if args.input_dir:
+            pdfs = sorted(pathlib.Path(args.input_dir).glob(args.glob))
+            if not pdfs:
+                print(f"[Error] {args.input_dir} 에 '{args.glob}' 파일이 없습니다.", file=sys.stderr)
+                sys.exit(1)
+            print(f"Batch: {len(pdfs)} PDFs (workers={args.workers}, rpm={args.rpm or '∞'})")
+            failed = run_batch(pdfs, args, models, cache, scheduler, chunker, vectors)
+            print(f"\nDone ✅ {len(pdfs) - len(failed)}/{len(pdfs)} documents")
+        else:
+            files = run_document(pathlib.Path(args.pdf), args, models, cache, scheduler, chunker,
+                                 vectors=vectors)
+            print("\nDone ✅")
+            print("Files:")
+            for f in files:
+                print(" -", f)
+        if args.metrics_prom:
+            # 문서별 <stem>.run.json 을 모아 Prometheus 텍스트 형식으로
+            stems = [p.stem for p in pdfs] if args.input_dir else [pathlib.Path(args.pdf).stem]
+            runs = [outdir / f"{stem}.run.json" for stem in stems]
+            reports = [json.loads(r.read_text(encoding="utf-8")) for r in runs if r.exists()]
+            pathlib.Path(args.metrics_prom).write_text(prometheus_text(reports), encoding="utf-8")
+            print(f"Metrics: {args.metrics_prom}")
+    finally:
+        scheduler.shutdown()
+        if vectors is not None:
+            print(f"  Vectors: {vectors.embedded} embedded, {vectors.reused} reused "
+                  f"({len(vectors)} in {vectors.path})")
+            vectors.close()
+        if limiter.retries:
+            print(f"  Rate limit: {limiter.retries} retries ({limiter.throttled} throttled)")
+        if cache is not None:
+            print(f"  Cache: {cache.hits} hits / {cache.misses} misses ({cache.path})")
+            cache.close()
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -1,19 +1,22 @@
 # 04-1-1-1.py (pdf to txt)
 import os
-import fitz  
+from pdf_extract import extract_pages
 
 pdf_file_path = r"C:\AIAGENT\data\2310.08754v4.pdf"   # raw string로 경로 안전하게
 output_dir    = r"C:\AIAGENT\output"                 
+extract_workers = os.cpu_count() or 1                 # 페이지 범위를 나눠 병렬 추출할 프로세스 수
 
-os.makedirs(output_dir, exist_ok=True)
+# 프로세스 풀(spawn) 사용 시 메인 모듈 재실행을 막기 위해 main 가드 필요
+if __name__ == "__main__":
+    os.makedirs(output_dir, exist_ok=True)
 
-base = os.path.splitext(os.path.basename(pdf_file_path))[0]
-txt_file_path = os.path.join(output_dir, base + ".txt")
+    base = os.path.splitext(os.path.basename(pdf_file_path))[0]
+    txt_file_path = os.path.join(output_dir, base + ".txt")
 
-with fitz.open(pdf_file_path) as doc:                  # 컨텍스트 매니저로 열고 닫기 자동
+    pages = extract_pages(pdf_file_path, workers=extract_workers)   # 페이지 순서대로 합쳐진 결과
     with open(txt_file_path, "w", encoding="utf-8") as f:
-        for page in doc:
-            f.write(page.get_text("text"))             # 기본 텍스트 추출
-            f.write("\n")                              # 페이지 구분용 줄바꿈
+        for text in pages:
+            f.write(text)                                  # 기본 텍스트 추출
+            f.write("\n")                                  # 페이지 구분용 줄바꿈
 
-print("Saved:", txt_file_path)
\ No newline at end of file
+    print("Saved:", txt_file_path)
\ No newline at end of file
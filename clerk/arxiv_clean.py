@@ -0,0 +1,206 @@
+# arxiv_clean.py
+# arXiv 논문 텍스트 정제 + 청크 분할 (04-1-1-1-1.py, 04-1-1-1-1-v1.py 공용)
+# (--layout 추출 결과는 iter_layout_paragraphs 가 단락 단위로만 정리)
+#
+# clean_arxiv_text 는 예전 정규식 체인(약 10번의 전체 텍스트 패스)과
+# 바이트 단위로 같은 결과를 내는 한 번의 줄 단위 상태 기계:
+#   1) NFKC  2) arXiv 라인/단독 페이지 번호 제거  3) 하이픈 줄바꿈 결합
+#   4) 단락 묶기(빈 줄 = 단락 경계, 단락 내 개행 → 공백)  5) 섹션 헤더 분리
+#   6) 과도 공백 정리 (단락별, 필요할 때만)  7) 그림/표 캡션 태깅 (마지막에 정규식 한 번)
+# 공백 정리를 캡션 태깅보다 먼저 해도 캡션 패턴(\s+, \s*)의 매칭 위치는 같음
+import re, unicodedata
+
+ARXIV_RE = re.compile(r'arXiv:\d{4}\.\d{5}')
+# 섹션 헤더: "3.1 Method ..." — 대문자 뒤 최대 120자까지 한 줄로 떼어냄
+HEADER_RE = re.compile(r'\d+(?:\.\d+)*\s+[A-Z][^\n]{1,120}')
+SECTION_NO_RE = re.compile(r'\d+(?:\.\d+)*')
+# 첫 글자를 문자 집합으로 두면 sre가 후보 위치만 빠르게 훑음 (re.IGNORECASE 와 같은 매칭)
+CAPTION_RE = re.compile(r'(?:[Ff](?i:igure)|[Tt](?i:able))\s+\d+\s*:')
+SPACES_RE = re.compile(r'[ \t]{2,}')
+REFS_PARA_RE = re.compile(r'\s*References\s*')
+NUMBER_RE = re.compile(r'[\d.,%±]+')
+FOOTNOTE_TAG = "[FOOTNOTE] "
+SENTENCE_END = ".!?:"
+
+def _is_word(ch: str) -> bool:
+    return ch.isalnum() or ch == "_"
+
+def _tag_caption(m):
+    return ("[FIGURE] " if m.group()[0] in "Ff" else "[TABLE] ") + m.group()
+
+def _lines(text: str):
+    # 2) + 3): 걸러낸 줄을 내보내면서 "단어-\n단어" 는 한 줄로 합침
+    # 정규식 (\w)-\n(\w) 은 겹치지 않게 매칭되므로, 직전 결합에 쓰인 글자(다음 줄 첫 글자)는
+    # 다시 하이픈 앞 글자로 쓰일 수 없음 → consumed 로 추적
+    cur, consumed = None, 0
+    for line in text.splitlines():
+        if "arXiv:" in line and ARXIV_RE.search(line):
+            continue
+        stripped = line.strip()
+        if stripped and stripped.isdecimal():  # standalone page number
+            continue
+        line = line.rstrip()
+        if (cur and line and len(cur) - 2 >= consumed and cur[-1] == "-"
+                and _is_word(cur[-2]) and _is_word(line[0])):
+            consumed = len(cur)  # 합친 줄에서 line[1]의 위치
+            cur = cur[:-1] + line
+            continue
+        if cur is not None:
+            yield cur
+        cur, consumed = line, 0
+    if cur is not None:
+        yield cur
+
+def _paragraphs(text: str):
+    # 4): 빈 줄(연속 개행 2개 이상)로 단락을 나누고 단락 안의 줄은 공백으로 이음
+    # 첫 단락 앞 빈 줄이 1개면 공백 하나가 붙고, 2개 이상이면 단락 토큰이라 앞 공백이 지워짐
+    buf, lead, first = [], 0, True
+    for line in _lines(text):
+        if line:
+            buf.append(line)
+            continue
+        if buf:
+            para = " ".join(buf)
+            if first:
+                yield (" " + para) if lead == 1 else (para.lstrip() if lead >= 2 else para)
+            else:
+                yield para.lstrip()
+            buf, first = [], False
+        elif first:
+            lead += 1
+    if buf:
+        para = " ".join(buf)
+        if first:
+            yield (" " + para) if lead == 1 else (para.lstrip() if lead >= 2 else para)
+        else:
+            yield para.lstrip()
+
+def _split_headers(paras):
+    # 5): 단락 맨 앞의 번호 헤더를 떼어 별도 단락으로
+    # 헤더 뒤 공백(\s*)이 단락 경계까지 삼키면 다음 단락은 헤더 후보가 아님
+    # "3.1" 만 있는 단락은 다음 단락 첫 글자와 이어서 헤더가 될 수 있음 (\s+ 가 경계를 넘음)
+    out = []
+    eligible = True
+    i = 0
+    while i < len(paras):
+        para = paras[i]
+        m = None
+        if eligible and para[:1].isdecimal():
+            if SECTION_NO_RE.fullmatch(para) and i + 1 < len(paras):
+                m = HEADER_RE.match(para + "\n\n" + paras[i + 1])
+                if m:
+                    i += 1
+                    para = para + "\n\n" + paras[i]
+            else:
+                m = HEADER_RE.match(para)
+        if m is None:
+            out.append(para)
+            eligible = True
+        else:
+            out.append(m.group().strip())
+            rest = para[m.end():].lstrip()
+            if rest:
+                out.append(rest)
+            eligible = bool(rest)
+        i += 1
+    return out
+
+def clean_arxiv_text(text: str) -> str:
+    text = unicodedata.normalize("NFKC", text)
+    paras = _split_headers(list(_paragraphs(text)))
+    paras = [SPACES_RE.sub(" ", p) if ("  " in p or "\t" in p) else p for p in paras]
+    text = "\n\n".join(paras)
+    if "\n\n\n" in text:
+        text = re.sub(r'\n{3,}', '\n\n', text)
+    return CAPTION_RE.sub(_tag_caption, text).strip()
+
+def split_into_chunks(text: str, max_chars=2500):
+    return list(iter_chunks(text.split("\n\n"), max_chars=max_chars))
+
+def iter_chunks(paragraphs, max_chars=2500, with_ids=False):
+    # split_into_chunks 의 점진 버전: 청크가 완성되는 즉시 yield
+    # with_ids: (청크, 들어간 단락 번호 목록) 으로 내보냄 (번호 = paragraphs 안의 위치, 출처 추적용)
+    buf, ids, count = [], [], 0
+    for k, para in enumerate(paragraphs):
+        p = para.strip()
+        if not p:
+            continue
+        if count + len(p) + 2 > max_chars and buf:
+            yield ("\n\n".join(buf), ids) if with_ids else "\n\n".join(buf)
+            buf, ids, count = [], [], 0
+        buf.append(p)
+        ids.append(k)
+        count += len(p) + 2
+    if buf:
+        yield ("\n\n".join(buf), ids) if with_ids else "\n\n".join(buf)
+
+def iter_clean_paragraphs(pages, keep_refs=False, with_pages=False):
+    # 페이지 단위로 정제해 단락을 하나씩 내보냄 (문서 전체 문자열을 만들지 않음)
+    # 페이지를 "\n\n"으로 이은 원문에서 페이지 경계는 항상 단락 경계라서
+    # 페이지별 정제 결과를 이으면 clean_arxiv_text(전체)와 같음
+    # (예외: 페이지 끝의 "3.1" 같은 번호 단락 + 다음 페이지 제목처럼 경계를 넘는 헤더 매칭)
+    # with_pages: (단락, (시작 페이지, 끝 페이지)) 로 내보냄 (1부터)
+    first, in_refs = True, False
+    for pno, page in enumerate(pages, 1):
+        if in_refs:
+            continue  # 참고문헌 이후 페이지는 소비만 (raw 파일은 끝까지 기록되도록)
+        for para in clean_arxiv_text(page).split("\n\n"):
+            if not para:
+                continue
+            # 일괄 모드의 re.split(r'\n\s*References\s*\n', ...)[0] 과 같은 위치에서 중단
+            if not keep_refs and not first and REFS_PARA_RE.fullmatch(para):
+                in_refs = True
+                break
+            first = False
+            yield (para, (pno, pno)) if with_pages else para
+
+def _is_float(para: str) -> bool:
+    # 본문 흐름 밖 조각: 각주, 그림/표 캡션, 표 셀 (" | " 로 이은 블록, 숫자 위주 블록)
+    if para.startswith(FOOTNOTE_TAG) or CAPTION_RE.match(para) or para.count(" | ") >= 2:
+        return True
+    words = para.split()
+    return len(words) >= 4 and sum(bool(NUMBER_RE.fullmatch(w)) for w in words) >= 0.4 * len(words)
+
+def _continues(prev: str, para: str) -> bool:
+    # 단/페이지 경계에서 끊긴 단락의 뒷부분인가 (앞이 문장 끝이 아니고 소문자로 시작)
+    return bool(prev) and prev[-1] not in SENTENCE_END and para[:1].islower()
+
+def iter_layout_paragraphs(pages, keep_refs=False, with_pages=False):
+    # pdf_layout 이 블록 단위 단락으로 뽑은 페이지를 정리 (줄 단위 정규식 패스 없음)
+    # - 끊긴 단락 잇기: 사이에 낀 각주/캡션/표 셀은 미뤘다가 이은 단락 뒤에 내보냄
+    # - NFKC, 과도 공백 정리, 캡션 태깅, References 제목 단락에서 중단 (iter_clean_paragraphs 와 같음)
+    # with_pages: (단락, (시작 페이지, 끝 페이지)) — 이어 붙인 단락은 여러 페이지에 걸침
+    cur, span, floats, first, in_refs = None, None, [], True, False
+
+    def flush():
+        out = ([] if cur is None else [(cur, span)]) + floats
+        floats.clear()
+        return [(CAPTION_RE.sub(_tag_caption, p), pp) if with_pages else CAPTION_RE.sub(_tag_caption, p)
+                for p, pp in out]
+
+    for pno, page in enumerate(pages, 1):
+        if in_refs:
+            continue  # 참고문헌 이후 페이지는 소비만 (raw 파일은 끝까지 기록되도록)
+        for para in page.split("\n\n"):
+            para = unicodedata.normalize("NFKC", para).strip()
+            if not para:
+                continue
+            if "  " in para or "\t" in para:
+                para = SPACES_RE.sub(" ", para)
+            if not keep_refs and not first and REFS_PARA_RE.fullmatch(para):
+                in_refs = True
+                break
+            first = False
+            if cur is not None and _continues(cur, para):
+                if cur.endswith("-") and cur[-2:-1].isalpha():
+                    cur = cur[:-1] + para
+                else:
+                    cur = f"{cur} {para}"
+                span = (span[0], pno)
+                continue
+            if cur is not None and cur[-1] not in SENTENCE_END and _is_float(para):
+                floats.append((para, (pno, pno)))
+                continue
+            yield from flush()
+            cur, span = para, (pno, pno)
+    yield from flush()
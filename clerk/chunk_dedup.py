@@ -0,0 +1,72 @@
+# chunk_dedup.py
+# 요약 전 청크 중복 제거: 같은(또는 거의 같은) 청크는 앞 청크의 요약을 재사용하고 API 호출을 생략
+# - 정확 중복: 공백/대소문자를 정규화한 본문의 sha256
+# - 근사 중복: 단어 5-gram shingle 의 MinHash (64개 해시) + LSH (16 band × 4 row) 로 후보를 찾고
+#   추정 Jaccard 유사도가 threshold 이상이면 중복 (머리말/표 캡션 반복, 부록에 다시 실린 본문 등)
+# 청크가 들어오는 순서대로 add() 하므로 스트리밍 모드에서도 그대로 씀
+import hashlib, random, re, zlib
+
+try:
+    import numpy as np
+except ImportError:  # 순수 파이썬으로 서명 계산 (청크 수백 개까지는 충분)
+    np = None
+
+SHINGLE = 5
+NUM_PERM = 64
+BANDS = 16
+MERSENNE = (1 << 61) - 1
+
+_rng = random.Random(20231012)  # 실행마다 같은 해시 함수 (서명이 재현되도록)
+_A = [_rng.randrange(1, 1 << 31) for _ in range(NUM_PERM)]
+_B = [_rng.randrange(0, 1 << 31) for _ in range(NUM_PERM)]
+
+def normalize(text: str) -> str:
+    return " ".join(text.lower().split())
+
+def shingles(text: str, k=SHINGLE) -> set:
+    words = re.findall(r"\w+", text.lower())
+    if len(words) <= k:
+        return {zlib.crc32(" ".join(words).encode("utf-8"))}
+    return {zlib.crc32(" ".join(words[i:i + k]).encode("utf-8")) for i in range(len(words) - k + 1)}
+
+def minhash(sh: set) -> tuple:
+    if np is not None:
+        x = np.fromiter(sh, dtype=np.uint64, count=len(sh))
+        a = np.array(_A, dtype=np.uint64)[:, None]
+        b = np.array(_B, dtype=np.uint64)[:, None]
+        return tuple(((a * x + b) % np.uint64(MERSENNE)).min(axis=1).tolist())
+    return tuple(min((a * x + b) % MERSENNE for x in sh) for a, b in zip(_A, _B))
+
+class DedupIndex:
+    def __init__(self, threshold=0.8):
+        self.threshold = threshold
+        self._exact = {}      # 정규화 본문 해시 → 청크 번호
+        self._sigs = {}       # 청크 번호 → MinHash 서명
+        self._buckets = {}    # (band, 서명 조각) → [청크 번호]
+        self.exact = 0
+        self.near = 0
+
+    def add(self, i, text):
+        # 청크 i 를 등록하고, 앞선 청크의 중복이면 그 청크 번호를 돌려줌 (아니면 None)
+        key = hashlib.sha256(normalize(text).encode("utf-8")).hexdigest()
+        if key in self._exact:
+            self.exact += 1
+            return self._exact[key]
+        sig = minhash(shingles(text))
+        rows = NUM_PERM // BANDS
+        bands = [(b, sig[b * rows:(b + 1) * rows]) for b in range(BANDS)]
+        best, best_sim = None, self.threshold
+        for j in {j for band in bands for j in self._buckets.get(band, ())}:
+            sim = sum(x == y for x, y in zip(sig, self._sigs[j])) / NUM_PERM
+            if sim > best_sim or (sim == best_sim and (best is None or j < best)):
+                best, best_sim = j, sim
+        if best is not None:
+            # 중복 청크는 대표로 쓰지 않음 (다음 청크는 원본과 비교)
+            self.near += 1
+            self._exact[key] = best
+            return best
+        self._exact[key] = i
+        self._sigs[i] = sig
+        for band in bands:
+            self._buckets.setdefault(band, []).append(i)
+        return None
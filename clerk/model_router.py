@@ -0,0 +1,23 @@
+# model_router.py
+# 호출 종류별 모델 선택 (--map-model / --reduce-model)
+# - map: 청크 요약 (호출 수가 청크 수만큼이라 싼 모델, 예: gemini-1.5-flash)
+# - reduce: 중간 merge + 최종 브리프 (호출 몇 번뿐이라 큰 모델)
+# - 승격: map 모델의 청크 요약이 CHUNK_PROMPT_TMPL 출력 형식(Claim/Method/Evidence/Limitations)을
+#   지키지 않으면 그 청크만 reduce 모델로 다시 요약 (두 모델이 같거나 --no-escalate 면 승격 없음)
+import re
+
+# "- Claim:" 네 줄이 순서대로 (모델이 붙이는 **굵게**, 머리 기호 * 는 허용)
+CHUNK_FIELDS = ("Claim", "Method", "Evidence/Numbers", "Limitations")
+FIELD_RE = re.compile(r"^[ \t]*[-*•][ \t]*\**(" + "|".join(map(re.escape, CHUNK_FIELDS)) + r")\**[ \t]*:",
+                      re.MULTILINE)
+
+def valid_chunk_summary(text: str) -> bool:
+    return [m.group(1) for m in FIELD_RE.finditer(text)] == list(CHUNK_FIELDS)
+
+class ModelRouter:
+    def __init__(self, map_model, reduce_model, escalate=True):
+        self.map = map_model
+        self.reduce = reduce_model
+        # 승격 대상 (없으면 None): 같은 모델로 같은 프롬프트를 다시 보내 봐야 응답 캐시 적중뿐
+        same = map_model.model_name == reduce_model.model_name
+        self.escalation = reduce_model if escalate and not same else None
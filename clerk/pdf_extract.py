@@ -0,0 +1,69 @@
+# pdf_extract.py
+# PDF → 페이지별 텍스트 (프로세스 풀에서 피클 가능하도록 별도 모듈)
+# workers > 1 이면 페이지 범위를 나눠 ProcessPoolExecutor로 병렬 추출
+# (각 워커가 fitz 문서를 직접 열고, 결과는 페이지 순서대로 합침)
+# layout=True 면 페이지마다 pdf_layout.page_text (블록/글꼴 기반 단락) 로 추출
+import os, multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+MIN_PAGES_PER_SHARD = 8
+SHARDS_PER_WORKER = 4  # 페이지마다 비용이 달라서 워커당 여러 조각으로 나눠 부하 분산
+
+def process_pool(max_workers=None):
+    # 호출하는 쪽은 이미 스케줄러/문서 스레드가 도는 프로세스라 fork 는 잠긴 락째로 복제될 수 있음 → spawn
+    return ProcessPoolExecutor(max_workers=max_workers, mp_context=multiprocessing.get_context("spawn"))
+
+def _open(pdf_path):
+    import fitz  # PyMuPDF: 실제로 PDF 를 열 때만 import (--help 등 시작 시간 단축)
+    return fitz.open(str(pdf_path))
+
+def page_count(pdf_path) -> int:
+    with _open(pdf_path) as doc:
+        return doc.page_count
+
+def page_ranges(n_pages: int, workers: int):
+    n_shards = max(1, min(workers * SHARDS_PER_WORKER, n_pages // MIN_PAGES_PER_SHARD))
+    size, extra = divmod(n_pages, n_shards)
+    start = 0
+    for k in range(n_shards):
+        stop = start + size + (1 if k < extra else 0)
+        yield start, stop
+        start = stop
+
+def _page_text(page, layout=False) -> str:
+    if layout:
+        from pdf_layout import page_text
+        return page_text(page)
+    return page.get_text("text")
+
+def _extract_range(pdf_path, start: int, stop: int, layout=False) -> list:
+    with _open(pdf_path) as doc:
+        return [_page_text(doc[i], layout) for i in range(start, stop)]
+
+def extract_pages(pdf_path, workers=1, pool=None, layout=False) -> list:
+    # pool: 이미 만들어 둔 프로세스 풀 (배치 모드에서 공유)
+    if pool is None and workers <= 1:
+        return _extract_range(pdf_path, 0, page_count(pdf_path), layout)
+    n_pages = page_count(pdf_path)
+    n_workers = workers if workers > 1 else (os.cpu_count() or 1)
+    ranges = list(page_ranges(n_pages, n_workers))
+    if pool is None:
+        with process_pool(min(workers, len(ranges))) as own_pool:
+            return _gather(own_pool, pdf_path, ranges, layout)
+    return _gather(pool, pdf_path, ranges, layout)
+
+def _gather(pool, pdf_path, ranges, layout=False) -> list:
+    futures = [pool.submit(_extract_range, pdf_path, start, stop, layout) for start, stop in ranges]
+    pages = []
+    for fut in futures:
+        pages.extend(fut.result())
+    return pages
+
+def extract_text(pdf_path, workers=1, pool=None, layout=False) -> str:
+    return "\n\n".join(extract_pages(pdf_path, workers=workers, pool=pool, layout=layout))
+
+def iter_pages(pdf_path, layout=False):
+    # 페이지를 하나씩 내보내는 제너레이터 (스트리밍 모드: 문서 전체를 메모리에 두지 않음)
+    with _open(pdf_path) as doc:
+        for pg in doc:
+            yield _page_text(pg, layout)
@@ -0,0 +1,103 @@
+# pdf_layout.py
+# 레이아웃 기반 추출 (--layout): page.get_text("dict") 의 블록/줄/스팬 위치와 글꼴로
+# 평문 추출 + 정규식 정제가 추측하던 것을 페이지에서 바로 판단
+# - 머리말/꼬리말: 위아래 여백 띠 안에만 있는 블록, 세로로 쓴 줄(arXiv 스탬프) 제거
+# - 그림 눈금/범례: 본문 글자 크기의 FIGURE_RATIO 미만 글꼴 블록 제거
+# - 섹션 제목: 짧은 블록이 전부 굵은 글꼴이거나 본문보다 훨씬 큰 글꼴 → 한 줄 단락 ("3.1 Method")
+# - 각주: 페이지 아래쪽의 작은 글꼴 블록 → "[FOOTNOTE] " 로 표시 (정제 단계가 끊긴 단락 뒤로 미룸)
+# - 읽기 순서: 두 단 페이지는 양 단에 걸친 블록(제목, 큰 그림 캡션)을 경계로 왼쪽 단 → 오른쪽 단
+# - 블록 = 단락: 줄은 공백으로 잇고 줄 끝 하이픈은 다음 줄이 소문자로 시작할 때만 결합
+# - 표: 셀마다 한 줄인 블록(짧은 줄 CELL_LINES 개 이상)은 셀을 " | " 로 이음
+# 페이지 텍스트는 단락을 빈 줄로 이은 것 (arxiv_clean.iter_layout_paragraphs 가 받아서 정리)
+
+MARGIN = 0.07          # 페이지 높이 대비 머리말/꼬리말 띠
+FIGURE_RATIO = 0.7     # 이보다 작은 글꼴(본문 대비)은 그림 안 글자
+FOOTNOTE_RATIO = 0.85  # 이보다 작은 글꼴이 페이지 아래쪽(FOOTNOTE_ZONE)에 있으면 각주
+FOOTNOTE_ZONE = 0.75
+HEADING_RATIO = 1.2    # 굵지 않아도 이보다 큰 글꼴의 짧은 블록은 제목
+HEADING_MAX_CHARS = 120
+CELL_LINES = 3         # 표 셀 블록: 이만큼 이상의 줄이 평균 CELL_CHARS 자 미만
+CELL_CHARS = 12
+BOLD = 16              # span["flags"] 의 굵은 글꼴 비트
+
+def _line_text(line) -> str:
+    return "".join(s["text"] for s in line["spans"]).strip()
+
+def _join_lines(lines) -> str:
+    out = ""
+    for text in lines:
+        if not text:
+            continue
+        if out.endswith("-") and len(out) > 1 and out[-2].isalpha() and text[0].islower():
+            out = out[:-1] + text
+        else:
+            out = f"{out} {text}" if out else text
+    return out
+
+def _body_size(blocks) -> float:
+    # 글자 수로 가중한 가장 흔한 글꼴 크기 (0.5pt 단위)
+    counts = {}
+    for b in blocks:
+        for line in b["lines"]:
+            for s in line["spans"]:
+                size = round(s["size"] * 2) / 2
+                counts[size] = counts.get(size, 0) + len(s["text"].strip())
+    return max(counts, key=counts.get) if counts else 0.0
+
+def _reading_order(blocks, width):
+    # 두 단 페이지: 양 단에 걸친 블록 사이 구간마다 왼쪽 단 전체 → 오른쪽 단 전체
+    mid = width / 2
+    blocks = sorted(blocks, key=lambda b: (b["bbox"][1], b["bbox"][0]))
+    left = [b for b in blocks if b["bbox"][2] <= mid + 10 and len(b["lines"]) >= 3]
+    right = [b for b in blocks if b["bbox"][0] >= mid - 10 and len(b["lines"]) >= 3]
+    if not left or not right:
+        return blocks  # 한 단
+    out, seg = [], []
+    for b in blocks:
+        x0, _, x1, _ = b["bbox"]
+        if x0 < mid - 20 and x1 > mid + 20:
+            out += sorted(seg, key=lambda s: (s["bbox"][0] >= mid - 10, s["bbox"][1]))
+            seg = []
+            out.append(b)
+        else:
+            seg.append(b)
+    return out + sorted(seg, key=lambda s: (s["bbox"][0] >= mid - 10, s["bbox"][1]))
+
+def page_paragraphs(page) -> list:
+    import fitz
+    flags = fitz.TEXT_PRESERVE_LIGATURES | fitz.TEXT_PRESERVE_WHITESPACE | fitz.TEXT_MEDIABOX_CLIP
+    d = page.get_text("dict", flags=flags)  # 이미지 블록은 빼고 (디코딩 비용)
+    height, width = d["height"], d["width"]
+    blocks = []
+    for b in d["blocks"]:
+        if b.get("type") != 0:
+            continue
+        # 가로로 쓴 줄만 (회전된 arXiv 스탬프, 세로 축 이름 제외)
+        lines = [l for l in b["lines"] if abs(l["dir"][0] - 1) < 1e-3 and _line_text(l)]
+        x0, y0, x1, y1 = b["bbox"]
+        if not lines or y1 < MARGIN * height or y0 > (1 - MARGIN) * height:
+            continue
+        blocks.append(dict(b, lines=lines))
+    body = _body_size(blocks)
+    paras = []
+    for b in _reading_order(blocks, width):
+        spans = [s for line in b["lines"] for s in line["spans"] if s["text"].strip()]
+        size = max(s["size"] for s in spans)
+        if size < FIGURE_RATIO * body:
+            continue
+        lines = [_line_text(l) for l in b["lines"]]
+        text = _join_lines(lines)
+        if len(text) <= HEADING_MAX_CHARS and len(lines) <= 3 and (
+                all(s["flags"] & BOLD for s in spans) and size >= body - 0.5
+                or size >= HEADING_RATIO * body):
+            paras.append(text)
+        elif len(lines) >= CELL_LINES and sum(map(len, lines)) < CELL_CHARS * len(lines):
+            paras.append(" | ".join(lines))
+        elif size < FOOTNOTE_RATIO * body and b["bbox"][1] > FOOTNOTE_ZONE * height:
+            paras.append("[FOOTNOTE] " + text)
+        else:
+            paras.append(text)
+    return paras
+
+def page_text(page) -> str:
+    return "\n\n".join(page_paragraphs(page))
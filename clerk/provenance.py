@@ -0,0 +1,78 @@
+# provenance.py
+# 청크 출처(페이지 범위 + 섹션 제목) 추적 → 요약 프롬프트의 section="...", pages="..." 에 채움
+# - 추출: "\n\n" 으로 이은 raw 텍스트에서 페이지마다 시작 글자 오프셋 (<stem>.raw.pages.json)
+#   → 정제 단계가 raw 를 다시 페이지로 나눠 페이지별로 정제
+# - 정제: 단락 번호 → (시작, 끝 페이지), 섹션 제목 단락 번호 목록 (<stem>.clean.meta.json)
+# - 청크: 청커가 돌려준 단락 번호 목록 → {"section", "pages"} (chunk_store 레코드에 저장)
+# 단락을 지나가며 기록만 하므로 스트리밍 모드에서도 그대로 씀 (단락당 튜플 하나)
+import json, pathlib
+from arxiv_clean import HEADER_RE
+
+# 번호 없는 섹션 제목 (번호 있는 제목은 HEADER_RE: "3.1 Method")
+NAMED_SECTIONS = {"Abstract", "Introduction", "Related Work", "Conclusion", "Conclusions",
+                  "Acknowledgements", "Acknowledgments", "Appendix", "References"}
+TITLE_MAX_WORDS = 12  # 이보다 긴 "3.1 Data While creating ..." 는 제목이 아니라 본문 단락
+PAGE_SEP = "\n\n"
+
+def is_heading(para: str) -> bool:
+    if para in NAMED_SECTIONS:
+        return True
+    return len(para.split()) <= TITLE_MAX_WORDS and bool(HEADER_RE.fullmatch(para))
+
+def page_offsets(pages) -> list:
+    # PAGE_SEP.join(pages) 안에서 페이지마다 시작 오프셋
+    offsets, pos = [], 0
+    for page in pages:
+        offsets.append(pos)
+        pos += len(page) + len(PAGE_SEP)
+    return offsets
+
+def split_pages(raw: str, offsets) -> list:
+    ends = [o - len(PAGE_SEP) for o in offsets[1:]] + [len(raw)]
+    return [raw[o:e] for o, e in zip(offsets, ends)]
+
+def format_pages(pages) -> str:
+    # (3, 4) → "3-4", (3, 3) → "3", 모름(0) → "NA"
+    p0, p1 = pages
+    if not p0:
+        return "NA"
+    return str(p0) if p0 == p1 else f"{p0}-{p1}"
+
+class Provenance:
+    def __init__(self, pages=None, headings=None):
+        self.pages = pages if pages is not None else []            # 단락 번호 → (시작, 끝 페이지)
+        self.headings = headings if headings is not None else []   # [(단락 번호, 제목)] 순서대로
+
+    def track(self, items):
+        # (단락, (시작, 끝 페이지)) 이터레이터를 받아 기록하며 단락만 흘려보냄
+        for para, span in items:
+            if is_heading(para):
+                self.headings.append((len(self.pages), para))
+            self.pages.append(tuple(span))
+            yield para
+
+    def chunk_meta(self, ids) -> dict:
+        # 청크 단락 번호 목록 → 첫 단락이 속한 섹션 (+ 청크 안에서 시작하는 섹션들), 페이지 범위
+        ids = [k for k in ids if k < len(self.pages)]
+        if not ids:
+            return {"section": "", "pages": (0, 0)}
+        first, last = min(ids), max(ids)
+        titles = []
+        for k, title in self.headings:
+            if k > last:
+                break
+            if k <= first:
+                titles = [title]
+            else:
+                titles.append(title)
+        spans = [self.pages[k] for k in ids]
+        return {"section": " / ".join(titles), "pages": (min(s[0] for s in spans), max(s[1] for s in spans))}
+
+    def save(self, path):
+        data = {"pages": self.pages, "headings": self.headings}
+        pathlib.Path(path).write_text(json.dumps(data, ensure_ascii=False), encoding="utf-8")
+
+    @classmethod
+    def load(cls, path):
+        data = json.loads(pathlib.Path(path).read_text(encoding="utf-8"))
+        return cls([tuple(p) for p in data["pages"]], [tuple(h) for h in data["headings"]])
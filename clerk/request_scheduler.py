@@ -0,0 +1,41 @@
+# request_scheduler.py
+# 여러 문서가 공유하는 Gemini 요청 스케줄러
+# - 동시 요청 수 상한 (스레드 풀)
+# - RPM/TPM 상한 + 429/503 백오프: 공용 RateLimiter (gemini_rate_limit.py)
+#   실제 API 호출만 call()로 감쌈 (캐시 적중은 대기 없음)
+import threading, time
+from concurrent.futures import ThreadPoolExecutor
+from gemini_rate_limit import RateLimiter
+
+class RequestScheduler:
+    def __init__(self, workers=1, limiter=None):
+        self._pool = ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="gemini")
+        self.limiter = limiter or RateLimiter()
+        self._lock = threading.Lock()
+        self.started = time.monotonic()
+        self.completed = 0     # 끝난 작업 전체 (청크 요약 + 중간 merge)
+        self.chunks_done = 0   # 끝난 청크 요약(map) 호출만 (배치 진행률의 chunks/sec)
+
+    def call(self, fn, *args, tokens=0, on_retry=None, **kwargs):
+        return self.limiter.call(fn, *args, tokens=tokens, on_retry=on_retry, **kwargs)
+
+    def submit(self, fn, *args, **kwargs):
+        def task():
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                with self._lock:
+                    self.completed += 1
+        return self._pool.submit(task)
+
+    def chunk_done(self):
+        with self._lock:
+            self.chunks_done += 1
+
+    def rate(self) -> float:
+        # 완료 작업/초 (스케줄러 생성 시점부터)
+        elapsed = time.monotonic() - self.started
+        return self.completed / elapsed if elapsed > 0 else 0.0
+
+    def shutdown(self):
+        self._pool.shutdown(wait=True)
@@ -0,0 +1,198 @@
+# run_metrics.py
+# 문서 한 건 처리의 계측: 단계별 wall/CPU 시간, API 호출별 지연·토큰(usage_metadata)·캐시 적중·재시도
+# run_document 가 문서마다 하나 만들어 <stem>.run.json 으로 기록 (--metrics-prom 이면 Prometheus 텍스트도)
+# TTFT(첫 토큰까지 시간): 스트리밍 호출은 첫 조각 도착, 블로킹 호출은 응답 전체 도착까지
+# CPU 시간은 process_time (프로세스 전체) 이라 배치 모드에서 다른 문서 작업도 섞여 들어감
+# 모델별(--map-model / --reduce-model 계층) 지연·토큰도 따로 모으고 PRICES 로 비용(USD) 추정
+import json, threading, time
+from contextlib import contextmanager
+
+# 100만 토큰당 USD (입력, 출력) — 128k 이하 프롬프트 공개 가격 기준, 표에 없는 모델은 비용 null
+# 컨텍스트 캐시에서 읽은 입력 토큰은 입력 가격의 CACHED_RATE 배
+PRICES = {
+    "gemini-1.5-pro": (1.25, 5.00),
+    "gemini-1.5-flash": (0.075, 0.30),
+    "gemini-1.5-flash-8b": (0.0375, 0.15),
+    "gemini-2.0-flash": (0.10, 0.40),
+    "gemini-2.0-flash-lite": (0.075, 0.30),
+    "gemini-2.5-pro": (1.25, 10.00),
+    "gemini-2.5-flash": (0.30, 2.50),
+}
+CACHED_RATE = 0.25
+
+def model_key(name) -> str:
+    # "models/gemini-1.5-flash-002" → "gemini-1.5-flash-002"
+    return name[len("models/"):] if name.startswith("models/") else name
+
+def cost_usd(model, prompt_tokens, candidate_tokens, cached_tokens=0):
+    # 버전 접미사(-002, -latest)는 가장 긴 접두부가 맞는 항목 가격으로
+    name = model_key(model)
+    match = max((m for m in PRICES if name == m or name.startswith(m + "-")), key=len, default=None)
+    if match is None:
+        return None
+    p_in, p_out = PRICES[match]
+    fresh = prompt_tokens - cached_tokens
+    return (fresh * p_in + cached_tokens * p_in * CACHED_RATE + candidate_tokens * p_out) / 1e6
+
+def _new_rec():
+    return {"requests": 0, "cache_hits": 0, "latencies": [], "ttfts": [], "prompt_tokens": 0,
+            "candidate_tokens": 0, "cached_tokens": 0}
+
+def _summary(rec) -> dict:
+    lat = rec["latencies"]
+    return {
+        "requests": rec["requests"], "cache_hits": rec["cache_hits"],
+        "wall_s": round(sum(lat), 4),
+        "p50_s": round(_pct(lat, 50), 4), "p95_s": round(_pct(lat, 95), 4),
+        "max_s": round(max(lat, default=0.0), 4),
+        "ttft_p50_s": round(_pct(rec["ttfts"], 50), 4),
+        "ttft_p95_s": round(_pct(rec["ttfts"], 95), 4),
+        "prompt_tokens": rec["prompt_tokens"], "candidate_tokens": rec["candidate_tokens"],
+        "cached_tokens": rec["cached_tokens"],
+    }
+
+def _pct(values, q):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q / 100 * len(ordered)))]
+
+class RunMetrics:
+    def __init__(self):
+        self.started = time.time()
+        self._wall0 = time.perf_counter()
+        self._cpu0 = time.process_time()
+        self.stages = {}    # 이름 → {"status", "wall_s", "cpu_s"}
+        self.calls = {}     # 종류(summarize_chunk 등) → 지연 목록 + 토큰 합계
+        self.models = {}    # 모델 이름 → 같은 형식 (계층별 지연/비용)
+        self.counters = {}  # retries, chunk_failures ...
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def stage(self, name):
+        wall0, cpu0 = time.perf_counter(), time.process_time()
+        rec = {"status": "ran"}
+        self.stages[name] = rec
+        try:
+            yield rec
+        finally:
+            rec["wall_s"] = round(time.perf_counter() - wall0, 4)
+            rec["cpu_s"] = round(time.process_time() - cpu0, 4)
+
+    def skip(self, name):
+        self.stages[name] = {"status": "skipped", "wall_s": 0.0, "cpu_s": 0.0}
+
+    def incr(self, name, n=1):
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + n
+
+    def observe(self, kind, wall_s, usage=None, cached=False, ttft=None, model=None):
+        # API 호출 한 번 (캐시 적중이면 cached=True, usage 는 응답의 usage_metadata)
+        # model: 호출한 모델 이름 (있으면 모델별로도 집계)
+        with self._lock:
+            recs = [self.calls.setdefault(kind, _new_rec())]
+            if model:
+                recs.append(self.models.setdefault(model_key(model), _new_rec()))
+            for rec in recs:
+                if cached:
+                    rec["cache_hits"] += 1
+                    continue
+                rec["requests"] += 1
+                rec["latencies"].append(wall_s)
+                if ttft is not None:
+                    rec["ttfts"].append(ttft)
+                if usage is not None:
+                    rec["prompt_tokens"] += getattr(usage, "prompt_token_count", 0) or 0
+                    rec["candidate_tokens"] += getattr(usage, "candidates_token_count", 0) or 0
+                    # 컨텍스트 캐시에서 읽은 입력 토큰 (prompt_tokens 에 포함됨)
+                    rec["cached_tokens"] += getattr(usage, "cached_content_token_count", 0) or 0
+
+    def report(self, **extra) -> dict:
+        calls = {kind: _summary(rec) for kind, rec in self.calls.items()}
+        models = {}
+        for name, rec in self.models.items():
+            models[name] = _summary(rec)
+            cost = cost_usd(name, rec["prompt_tokens"], rec["candidate_tokens"], rec["cached_tokens"])
+            models[name]["cost_usd"] = None if cost is None else round(cost, 6)
+        costs = [m["cost_usd"] for m in models.values()]
+        return {
+            **extra,
+            "started": time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(self.started)),
+            "wall_s": round(time.perf_counter() - self._wall0, 4),
+            "cpu_s": round(time.process_time() - self._cpu0, 4),
+            "stages": self.stages,
+            "calls": calls,
+            "models": models,
+            "cost_usd": None if None in costs else round(sum(costs), 6),
+            "tokens": {
+                "prompt": sum(c["prompt_tokens"] for c in calls.values()),
+                "candidates": sum(c["candidate_tokens"] for c in calls.values()),
+                "cached": sum(c["cached_tokens"] for c in calls.values()),
+            },
+            "counters": dict(self.counters),
+        }
+
+    def write(self, path, **extra) -> dict:
+        rep = self.report(**extra)
+        path.write_text(json.dumps(rep, ensure_ascii=False, indent=2), encoding="utf-8")
+        return rep
+
+def prometheus_text(reports) -> str:
+    # 문서별 report() 목록 → Prometheus 텍스트 형식 (node_exporter textfile collector 용)
+    metrics = {
+        "clerk_run_seconds": ("gauge", "Document wall time"),
+        "clerk_stage_seconds": ("gauge", "Stage time by clock (wall/cpu)"),
+        "clerk_requests_total": ("counter", "Gemini requests sent"),
+        "clerk_cache_hits_total": ("counter", "Requests answered from the response cache"),
+        "clerk_request_seconds_total": ("counter", "Total Gemini request latency"),
+        "clerk_ttft_seconds": ("gauge", "Time to first token by call (p50/p95)"),
+        "clerk_tokens_total": ("counter", "Tokens reported by usage_metadata"),
+        "clerk_events_total": ("counter", "Retries, chunk failures and other events"),
+        "clerk_model_requests_total": ("counter", "Gemini requests sent by model"),
+        "clerk_model_request_seconds_total": ("counter", "Total Gemini request latency by model"),
+        "clerk_model_tokens_total": ("counter", "Tokens reported by usage_metadata by model"),
+        "clerk_model_cost_usd": ("gauge", "Estimated token cost by model (models with a known price)"),
+    }
+    samples = {name: [] for name in metrics}
+
+    def labels(**kv):
+        esc = lambda v: str(v).replace("\\", "\\\\").replace('"', '\\"')
+        return "{" + ",".join(f'{k}="{esc(v)}"' for k, v in kv.items()) + "}"
+
+    for rep in reports:
+        doc = rep.get("doc", "")
+        samples["clerk_run_seconds"].append((labels(doc=doc), rep["wall_s"]))
+        for stage, rec in rep["stages"].items():
+            for clock in ("wall", "cpu"):
+                samples["clerk_stage_seconds"].append(
+                    (labels(doc=doc, stage=stage, clock=clock), rec[f"{clock}_s"]))
+        for call, rec in rep["calls"].items():
+            samples["clerk_requests_total"].append((labels(doc=doc, call=call), rec["requests"]))
+            samples["clerk_cache_hits_total"].append((labels(doc=doc, call=call), rec["cache_hits"]))
+            samples["clerk_request_seconds_total"].append((labels(doc=doc, call=call), rec["wall_s"]))
+            for q in ("50", "95"):
+                samples["clerk_ttft_seconds"].append(
+                    (labels(doc=doc, call=call, quantile=f"0.{q}"), rec.get(f"ttft_p{q}_s", 0.0)))
+            samples["clerk_tokens_total"].append(
+                (labels(doc=doc, call=call, type="prompt"), rec["prompt_tokens"]))
+            samples["clerk_tokens_total"].append(
+                (labels(doc=doc, call=call, type="candidates"), rec["candidate_tokens"]))
+            samples["clerk_tokens_total"].append(
+                (labels(doc=doc, call=call, type="cached"), rec.get("cached_tokens", 0)))
+        for model, rec in rep.get("models", {}).items():
+            samples["clerk_model_requests_total"].append((labels(doc=doc, model=model), rec["requests"]))
+            samples["clerk_model_request_seconds_total"].append((labels(doc=doc, model=model), rec["wall_s"]))
+            for kind, key in (("prompt", "prompt_tokens"), ("candidates", "candidate_tokens"),
+                              ("cached", "cached_tokens")):
+                samples["clerk_model_tokens_total"].append((labels(doc=doc, model=model, type=kind), rec[key]))
+            if rec.get("cost_usd") is not None:
+                samples["clerk_model_cost_usd"].append((labels(doc=doc, model=model), rec["cost_usd"]))
+        for event, n in rep["counters"].items():
+            samples["clerk_events_total"].append((labels(doc=doc, event=event), n))
+
+    lines = []
+    for name, (kind, help_text) in metrics.items():
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} {kind}")
+        lines += [f"{name}{lbl} {value}" for lbl, value in samples[name]]
+    return "\n".join(lines) + "\n"
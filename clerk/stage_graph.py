@@ -0,0 +1,139 @@
+# stage_graph.py
+# 파이프라인 단계 의존성 그래프 + 단계별 지문(fingerprint)
+# 지문 = sha256(단계 이름, 파라미터, 입력 파일 내용 해시)
+# 지문이 매니페스트에 기록된 값과 같고 출력 파일이 모두 있으면 단계를 건너뜀
+import hashlib, json, pathlib
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional
+
+def file_digest(path) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    return h.hexdigest()
+
+@dataclass
+class Stage:
+    name: str
+    inputs: List[pathlib.Path]
+    outputs: List[pathlib.Path]
+    run: Callable[[], Optional[bool]]
+    params: Dict = field(default_factory=dict)
+
+class StageGraph:
+    def __init__(self, manifest_path, force=False, label="", metrics=None):
+        self.manifest_path = pathlib.Path(manifest_path)
+        self.force = force
+        self.label = label
+        self.metrics = metrics  # RunMetrics: 단계별 wall/CPU 시간 기록
+        self.stages: Dict[str, Stage] = {}
+        self.deps: Dict[str, List[str]] = {}
+        self.manifest = {}
+        if self.manifest_path.exists():
+            try:
+                self.manifest = json.loads(self.manifest_path.read_text(encoding="utf-8"))
+            except ValueError:
+                self.manifest = {}  # 깨진 매니페스트는 무시하고 전부 재계산
+
+    def add(self, stage: Stage, after=()):
+        self.stages[stage.name] = stage
+        self.deps[stage.name] = list(after)
+
+    def fingerprint(self, stage: Stage) -> str:
+        payload = json.dumps({
+            "stage": stage.name,
+            "params": stage.params,
+            "inputs": [file_digest(p) for p in stage.inputs],
+        }, ensure_ascii=False, sort_keys=True)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def is_fresh(self, stage: Stage) -> bool:
+        if self.force:
+            return False
+        if not all(p.exists() for p in stage.inputs + stage.outputs):
+            return False
+        return self.manifest.get(stage.name) == self.fingerprint(stage)
+
+    def order(self) -> List[str]:
+        # 위상 정렬 (등록 순서를 최대한 유지)
+        seen, out = set(), []
+        def visit(name, stack=()):
+            if name in seen:
+                return
+            if name in stack:
+                raise ValueError(f"stage cycle: {' -> '.join(stack + (name,))}")
+            for dep in self.deps[name]:
+                visit(dep, stack + (name,))
+            seen.add(name)
+            out.append(name)
+        for name in self.stages:
+            visit(name)
+        return out
+
+    def run(self):
+        for n, name in enumerate(self.order(), 1):
+            stage = self.stages[name]
+            if self.is_fresh(stage):
+                print(f"{self.label}[{n}/{len(self.stages)}] {name}: unchanged, skipped")
+                if self.metrics is not None:
+                    self.metrics.skip(name)
+                continue
+            # run()이 False를 돌려주면 (예: 일부 청크 실패) 완료로 기록하지 않음
+            if self.metrics is not None:
+                with self.metrics.stage(name) as rec:
+                    ok = stage.run() is not False
+                    rec["status"] = "ran" if ok else "failed"
+            else:
+                ok = stage.run() is not False
+            if not ok:
+                self.manifest.pop(name, None)
+            else:
+                self.manifest[name] = self.fingerprint(stage)
+            self._save()
+
+    def _save(self):
+        tmp = self.manifest_path.with_suffix(self.manifest_path.suffix + ".tmp")
+        tmp.write_text(json.dumps(self.manifest, indent=2, sort_keys=True), encoding="utf-8")
+        tmp.replace(self.manifest_path)
+
+# ---------------- Chunk summary checkpoint ----------------
+class Checkpoint:
+    # 청크 요약 결과를 완료되는 즉시 한 줄씩(JSONL) 덧붙여 기록
+    # 첫 줄은 단계 지문; 지문이 다르면 이전 체크포인트는 무효
+    def __init__(self, path, fingerprint: str, resume=False):
+        self.path = pathlib.Path(path)
+        self.fingerprint = fingerprint
+        self.done: Dict[int, str] = {}
+        if resume and self.path.exists():
+            self._load()
+        # 읽어 들인 기록만으로 다시 써서 끊긴 줄을 정리
+        lines = [json.dumps({"fingerprint": fingerprint})]
+        lines += [json.dumps({"i": i, "summary": s}, ensure_ascii=False)
+                  for i, s in sorted(self.done.items())]
+        self.path.write_text("\n".join(lines) + "\n", encoding="utf-8")
+        self._f = self.path.open("a", encoding="utf-8")
+
+    def _load(self):
+        with self.path.open(encoding="utf-8") as f:
+            lines = f.read().splitlines()
+        try:
+            if not lines or json.loads(lines[0]).get("fingerprint") != self.fingerprint:
+                return
+        except ValueError:
+            return
+        for line in lines[1:]:
+            try:
+                rec = json.loads(line)
+            except ValueError:
+                break  # 중간에 끊긴 마지막 줄
+            self.done[rec["i"]] = rec["summary"]
+
+    def record(self, i: int, summary: str):
+        self._f.write(json.dumps({"i": i, "summary": summary}, ensure_ascii=False) + "\n")
+        self._f.flush()
+
+    def close(self, remove=False):
+        self._f.close()
+        if remove:
+            self.path.unlink(missing_ok=True)
@@ -0,0 +1,73 @@
+# stream_output.py
+# 토큰 스트리밍 출력 (--stream-output): 응답 조각을 도착하는 대로 파일(+ stdout)에 씀
+# 청크 요약은 여러 워커가 동시에 받으므로 순서를 지켜서:
+# - 맨 앞(아직 안 끝난 가장 작은 번호) 항목의 조각은 바로 쓰고, 뒤 항목 조각은 모아 뒀다가
+#   앞 항목이 끝나면 이어서 씀 → 파일은 항상 청크 순서대로 자람
+# - 조각 없이 끝난 항목(응답 캐시 적중, 체크포인트, 실패)은 최종 텍스트를 한 번에 씀
+# 단계가 끝나면 호출자가 최종 텍스트로 파일을 다시 써서 공백 차이 등을 정리함
+import sys, threading
+
+class OrderedStream:
+    def __init__(self, path, sep="", echo=False, header=None, first=1):
+        self.path = path
+        self.sep = sep
+        self.echo = echo        # stdout 에도 출력 (단일 문서 모드)
+        self.header = header    # header(i) -> stdout 에만 찍을 항목 머리말
+        self.head = first       # 지금 바로 쓰는 항목 번호
+        self._pending = {}      # 번호 → 모아 둔 조각
+        self._finals = {}       # 끝난 뒤 아직 못 쓴 항목의 최종 텍스트
+        self._started = set()   # 조각을 하나라도 쓴 항목
+        self._text = {}         # 번호 → 받은 조각 전체 (최종 텍스트와 비교용)
+        self._written = 0       # 파일에 시작한 항목 수 (구분자용)
+        self._lock = threading.Lock()
+        self._f = open(path, "w", encoding="utf-8")
+
+    def _emit(self, i, text):
+        if i not in self._started:
+            self._started.add(i)
+            if self._written:
+                self._f.write(self.sep)
+            self._written += 1
+            if self.echo and self.header:
+                sys.stdout.write(self.header(i))
+        self._f.write(text)
+        self._f.flush()
+        if self.echo:
+            sys.stdout.write(text)
+            sys.stdout.flush()
+
+    def piece(self, i, text):
+        if not text:
+            return
+        with self._lock:
+            self._text.setdefault(i, []).append(text)
+            if i == self.head:
+                self._emit(i, text)
+            else:
+                self._pending.setdefault(i, []).append(text)
+
+    def done(self, i, final):
+        # 항목 i 완료: 조각으로 다 못 쓴 부분(최종 텍스트)을 마무리하고 다음 항목들을 이어서 씀
+        with self._lock:
+            self._finals[i] = final
+            while self.head in self._finals:
+                i = self.head
+                streamed = self._pending.pop(i, [])
+                for text in streamed:
+                    self._emit(i, text)
+                final = self._finals.pop(i)
+                if i not in self._started:
+                    self._emit(i, final)
+                elif "".join(self._text.get(i, [])).strip() != final.strip():
+                    self._emit(i, "\n" + final)  # 스트림 도중 실패 등: 최종 텍스트를 덧붙임
+                self._text.pop(i, None)
+                if self.echo:
+                    sys.stdout.write("\n")
+                self.head += 1
+            # 새 맨 앞 항목이 진행 중이면 모아 둔 조각부터 씀 (이후 조각은 piece 에서 바로)
+            for text in self._pending.pop(self.head, []):
+                self._emit(self.head, text)
+
+    def close(self):
+        with self._lock:
+            self._f.close()
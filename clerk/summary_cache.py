@@ -0,0 +1,73 @@
+# summary_cache.py
+# Gemini 응답 캐시 (SQLite, 크기 기준 LRU 제거)
+# 키 = sha256(모델명, 시스템 인스트럭션, 프롬프트, generation_config)
+# 총 크기는 열 때 한 번 합산하고 이후 put/제거 때 갱신 (put 마다 전체 SUM 을 하지 않음)
+import hashlib, json, pathlib, sqlite3, threading, time
+
+def request_key(model_name: str, system_instruction: str, prompt: str, generation_config: dict) -> str:
+    payload = json.dumps(
+        [model_name, system_instruction, prompt, generation_config],
+        ensure_ascii=False, sort_keys=True,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+class SummaryCache:
+    def __init__(self, cache_dir, max_bytes=256 * 1024 * 1024):
+        self.path = pathlib.Path(cache_dir) / "responses.sqlite3"
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        # 워커 스레드에서 같이 쓰므로 연결 하나를 락으로 보호
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(str(self.path), check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS entries ("
+            " key TEXT PRIMARY KEY, value TEXT NOT NULL,"
+            " size INTEGER NOT NULL, last_used REAL NOT NULL)"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS idx_last_used ON entries(last_used)")
+        self._db.commit()
+        self.total = self._db.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+
+    def get(self, key: str):
+        with self._lock:
+            row = self._db.execute("SELECT value FROM entries WHERE key=?", (key,)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self._db.execute("UPDATE entries SET last_used=? WHERE key=?", (time.time(), key))
+            self._db.commit()
+            self.hits += 1
+            return row[0]
+
+    def put(self, key: str, value: str):
+        size = len(value.encode("utf-8"))
+        with self._lock:
+            old = self._db.execute("SELECT size FROM entries WHERE key=?", (key,)).fetchone()
+            self._db.execute(
+                "INSERT OR REPLACE INTO entries(key, value, size, last_used) VALUES (?, ?, ?, ?)",
+                (key, value, size, time.time()),
+            )
+            self.total += size - (old[0] if old else 0)
+            self._evict()
+            self._db.commit()
+
+    def _evict(self):
+        # 총 크기가 상한을 넘으면 가장 오래 안 쓴 항목부터 제거 (last_used 인덱스로 조금씩)
+        while self.total > self.max_bytes:
+            batch = self._db.execute(
+                "SELECT key, size FROM entries ORDER BY last_used LIMIT 64").fetchall()
+            if not batch:
+                self.total = 0
+                break
+            for key, size in batch:
+                self._db.execute("DELETE FROM entries WHERE key=?", (key,))
+                self.total -= size
+                if self.total <= self.max_bytes:
+                    break
+
+    def close(self):
+        with self._lock:
+            self._db.close()
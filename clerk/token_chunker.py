@@ -0,0 +1,198 @@
+# token_chunker.py
+# 토큰 수 기준 청크 분할 (+ 겹침, 섹션 헤더 경계 존중)
+# 토큰 수는 로컬 근사치: ASCII는 약 4자/토큰, 한글 등은 약 1.5자/토큰
+# 모델의 count_tokens 로 한 번 보정한 배율(scale)을 모델별로 파일에 캐시
+import json, math, pathlib, re, sys, threading
+from arxiv_clean import HEADER_RE, iter_chunks
+
+CALIBRATION_CHARS = 4000  # 보정에 쓰는 앞부분 텍스트 길이
+SENTENCE_END_RE = re.compile(r'(?<=[.!?。])\s+')
+
+class TokenEstimator:
+    ASCII_CHARS_PER_TOKEN = 4.0
+    OTHER_CHARS_PER_TOKEN = 1.5
+
+    def __init__(self, model=None, cache_file=None):
+        self.model = model
+        self.cache_file = pathlib.Path(cache_file) if cache_file else None
+        self.scale = 1.0
+        self.calibrated = model is None
+        self._lock = threading.Lock()
+        if self.cache_file and self.cache_file.exists() and model is not None:
+            try:
+                cached = json.loads(self.cache_file.read_text(encoding="utf-8"))
+            except ValueError:
+                cached = {}
+            if model.model_name in cached:
+                self.scale = cached[model.model_name]
+                self.calibrated = True
+
+    def approx(self, text: str) -> float:
+        n_ascii = len(text.encode("ascii", "ignore"))
+        return (n_ascii / self.ASCII_CHARS_PER_TOKEN
+                + (len(text) - n_ascii) / self.OTHER_CHARS_PER_TOKEN)
+
+    def count(self, text: str) -> int:
+        return max(1, math.ceil(self.approx(text) * self.scale))
+
+    def calibrate(self, sample: str):
+        # count_tokens 한 번으로 근사치 배율을 맞춤 (실패하면 배율 1.0 유지)
+        with self._lock:
+            if self.calibrated or not sample:
+                return
+            self.calibrated = True
+            try:
+                actual = self.model.count_tokens(sample).total_tokens
+            except Exception as e:
+                print(f"[Warn] count_tokens 보정 실패, 근사치 사용: {e}", file=sys.stderr)
+                return
+            self.scale = actual / max(1.0, self.approx(sample))
+            if self.cache_file:
+                cached = {}
+                if self.cache_file.exists():
+                    try:
+                        cached = json.loads(self.cache_file.read_text(encoding="utf-8"))
+                    except ValueError:
+                        pass
+                cached[self.model.model_name] = self.scale
+                self.cache_file.parent.mkdir(parents=True, exist_ok=True)
+                self.cache_file.write_text(json.dumps(cached, indent=2), encoding="utf-8")
+
+def is_header(para: str) -> bool:
+    # clean_arxiv_text 가 따로 떼어 둔 번호 섹션 헤더 ("3.1 Method")
+    return HEADER_RE.fullmatch(para) is not None
+
+def split_long_paragraph(para, max_tokens, count):
+    # max_tokens 보다 긴 단락은 문장 경계에서 나눔 (문장 하나가 넘치면 글자 수로 자름)
+    pieces, buf, total = [], [], 0
+    for sent in SENTENCE_END_RE.split(para):
+        n = count(sent)
+        while n > max_tokens:
+            cut = max(1, int(len(sent) * max_tokens / n))
+            if buf:
+                pieces.append(" ".join(buf))
+                buf, total = [], 0
+            pieces.append(sent[:cut])
+            sent = sent[cut:]
+            n = count(sent)
+        if buf and total + n + 1 > max_tokens:
+            pieces.append(" ".join(buf))
+            buf, total = [], 0
+        buf.append(sent)
+        total += n + 1
+    if buf:
+        pieces.append(" ".join(buf))
+    return pieces
+
+def tail_sentences(paras, max_tokens, count):
+    # 청크 끝에서부터 max_tokens 안에 드는 문장들 (청크 전체는 넘기지 않음)
+    sents = [x for p in paras for x in SENTENCE_END_RE.split(p)]
+    tail, acc = [], 0
+    for sent in reversed(sents[1:]):
+        n = count(sent)
+        if acc + n > max_tokens:
+            break
+        tail.insert(0, sent)
+        acc += n + 1
+    return " ".join(tail)
+
+def iter_token_chunks(paragraphs, max_tokens, count, overlap_tokens=0, section_fill=0.5,
+                      with_ids=False):
+    # 단락을 max_tokens 까지 채워 청크로 묶음
+    # - 섹션 헤더를 만났을 때 이미 section_fill 이상 찼으면 헤더 앞에서 끊음
+    # - 헤더가 청크 맨 끝에 홀로 남지 않게 다음 청크로 넘김
+    # - overlap_tokens: 앞 청크 끝 단락들을 다음 청크 앞에 다시 넣음 (새 섹션 시작이면 생략)
+    # - with_ids: (청크, 들어간 단락 번호 목록) 으로 내보냄 (겹침은 앞 청크 마지막 단락 번호)
+    buf, sizes, ids, total = [], [], [], 0
+
+    def flush(overlap):
+        # 현재 버퍼를 청크로 내보내고, 다음 청크로 넘길 단락(끝 헤더 또는 겹침)을 버퍼에 남김
+        # 반환: (청크 또는 None, 겹침을 넘겼는지)
+        nonlocal buf, sizes, ids, total
+        carry, overlapped = [], False
+        if buf and is_header(buf[-1]):
+            carry = [(buf.pop(), sizes.pop(), ids.pop())]
+        elif overlap and overlap_tokens:
+            tail = tail_sentences(buf, overlap_tokens, count)
+            if tail:
+                carry, overlapped = [(tail, count(tail), ids[-1])], True
+        chunk = None
+        if buf:
+            chunk = ("\n\n".join(buf), sorted(set(ids))) if with_ids else "\n\n".join(buf)
+        buf = [p for p, _, _ in carry]
+        sizes = [n for _, n, _ in carry]
+        ids = [k for _, _, k in carry]
+        total = sum(sizes) + len(sizes)
+        return chunk, overlapped
+
+    # 긴 단락을 자를 때는 겹침이 들어갈 자리를 남겨 둠
+    piece_tokens = max(1, max_tokens - overlap_tokens)
+
+    def pieces():
+        for k, para in enumerate(paragraphs):
+            p = para.strip()
+            if not p:
+                continue
+            n = count(p)
+            if n > max_tokens:
+                for piece in split_long_paragraph(p, piece_tokens, count):
+                    yield piece, count(piece), k
+            else:
+                yield p, n, k
+
+    for p, n, k in pieces():
+        if buf and is_header(p) and total >= section_fill * max_tokens:
+            chunk, _ = flush(overlap=False)  # 새 섹션은 겹침 없이 시작
+            if chunk:
+                yield chunk
+        elif buf and total + n + 1 > max_tokens:
+            chunk, overlapped = flush(overlap=True)
+            if chunk:
+                yield chunk
+            if overlapped and total + n + 1 > max_tokens:
+                buf, sizes, ids, total = [], [], [], 0  # 겹침 때문에 넘치면 겹침을 버림
+        buf.append(p)
+        sizes.append(n)
+        ids.append(k)
+        total += n + 1  # 단락 구분("\n\n")을 대략 1토큰으로
+    if buf:
+        yield ("\n\n".join(buf), sorted(set(ids))) if with_ids else "\n\n".join(buf)
+
+class Chunker:
+    # 단락 이터레이터 → 청크 이터레이터; params 는 청크 단계 지문에 들어감
+    def __init__(self, max_chars=2500, max_tokens=0, overlap_tokens=0, estimator=None):
+        self.max_chars = max_chars
+        self.max_tokens = max_tokens
+        self.overlap_tokens = overlap_tokens
+        self.estimator = estimator
+
+    @property
+    def params(self):
+        if not self.max_tokens:
+            return {"max_chars": self.max_chars}
+        # 보정 배율은 모델별로 캐시되므로 모델 이름으로 대신함
+        model = self.estimator.model
+        return {"max_tokens": self.max_tokens, "overlap_tokens": self.overlap_tokens,
+                "token_model": model.model_name if model is not None else "approx"}
+
+    def __call__(self, paragraphs, with_ids=False):
+        # with_ids: (청크, 단락 번호 목록) — 단락 번호로 페이지/섹션 출처를 찾음 (provenance.py)
+        if not self.max_tokens:
+            return iter_chunks(paragraphs, max_chars=self.max_chars, with_ids=with_ids)
+        return self._token_chunks(iter(paragraphs), with_ids)
+
+    def _token_chunks(self, paragraphs, with_ids=False):
+        # 앞부분 단락을 모아 (캐시가 없을 때만) 토큰 배율을 먼저 보정
+        head, size = [], 0
+        if not self.estimator.calibrated:
+            for p in paragraphs:
+                head.append(p)
+                size += len(p)
+                if size >= CALIBRATION_CHARS:
+                    break
+            self.estimator.calibrate("\n\n".join(head))
+        def all_paragraphs():
+            yield from head
+            yield from paragraphs
+        return iter_token_chunks(all_paragraphs(), self.max_tokens, self.estimator.count,
+                                 overlap_tokens=self.overlap_tokens, with_ids=with_ids)
@@ -1,16 +1,10 @@
 # gemini_api_security.py
-from dotenv import load_dotenv
+# 키/연결 점검: .env 로드, 키 확인, configure 는 공용 클라이언트(gemini_client)로, 여기는 진단 출력만
 import os
 import sys
 import textwrap
-
-# 외부 라이브러리
-try:
-    import google.generativeai as genai
-except Exception as e:
-    print("❌ 'google-generativeai'가 설치되지 않았습니다. 먼저 다음을 실행하세요.")
-    print("   pip install google-generativeai python-dotenv")
-    sys.exit(1)
+import gemini_client
+from gemini_rate_limit import RateLimiter
 
 def mask_key(key: str) -> str:
     if not key or len(key) < 8:
@@ -18,13 +12,10 @@ def mask_key(key: str) -> str:
     return f"{key[:8]}...{key[-4:]}"
 
 def load_env():
-    # .env 로드
-    load_dotenv()
-    api_key = os.getenv("GEMINI_API_KEY")
-    model = os.getenv("GEMINI_MODEL", "gemini-1.5-pro")
-
-    # 필수값 검증
-    if not api_key:
+    # .env 로드 + 필수값 검증 (공용 클라이언트); 없으면 설정 방법을 덧붙이고 종료
+    try:
+        api_key = gemini_client.require_api_key()
+    except SystemExit:
         print(textwrap.dedent("""
         ❌ GEMINI_API_KEY가 설정되지 않았습니다.
            1) 프로젝트 루트에 .env 파일 생성
@@ -32,13 +23,18 @@ def load_env():
               GEMINI_API_KEY=YOUR_GEMINI_API_KEY_HERE
            3) 다시 실행
         """).strip())
-        sys.exit(1)
-
+        raise
+    model = os.getenv("GEMINI_MODEL", "gemini-1.5-pro")
     return api_key, model
 
-def configure_gemini(api_key: str):
+def configure_gemini():
+    # 공용 클라이언트의 SDK import + configure 를 여기서 미리 해서 오류를 단계별로 보여줌
     try:
-        genai.configure(api_key=api_key)
+        gemini_client.genai()
+    except ImportError:
+        print("❌ 'google-generativeai'가 설치되지 않았습니다. 먼저 다음을 실행하세요.")
+        print("   pip install google-generativeai python-dotenv")
+        sys.exit(1)
     except Exception as e:
         print("❌ Gemini 구성 중 오류:", e)
         sys.exit(1)
@@ -49,9 +45,9 @@ def quick_test(model_name: str):
     라이브러리에서 예외 메시지로 표출됩니다.
     """
     try:
-        model = genai.GenerativeModel(model_name)
+        model = gemini_client.model(model_name)
         prompt = "Say only the word: OK"
-        resp = model.generate_content(prompt)
+        resp = RateLimiter.from_env().call(model.generate_content, prompt)
         text = getattr(resp, "text", "").strip()
         if text.upper() == "OK":
             print("✅ 연결 테스트 성공 (모델:", model_name, ")")
@@ -73,7 +69,7 @@ def main():
     print("🔐 Loaded API key:", mask_key(api_key))
     print("🤖 Using model   :", model)
 
-    configure_gemini(api_key)
+    configure_gemini()
     quick_test(model)
 
 if __name__ == "__main__":
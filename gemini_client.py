@@ -0,0 +1,81 @@
+# gemini_client.py
+# 모든 진입점이 같이 쓰는 Gemini 클라이언트 (chatbot/, clerk/, 루트 스크립트 공용)
+# - google.generativeai 는 처음 실제로 쓸 때 import: --help, 인자 오류, 응답 캐시만으로 끝나는 실행은
+#   SDK import 비용(≈0.8초)을 내지 않음 (python bench/bench_startup.py 로 확인)
+# - .env 로드 + 키 확인 + genai.configure() 는 프로세스에서 한 번만 (스레드 안전 memo)
+# - SDK 는 서비스별 클라이언트(gRPC 채널 / REST 세션)를 configure 단위로 memo 하므로 모든 요청이
+#   같은 연결 풀을 재사용 (keep-alive); GEMINI_TRANSPORT=rest|grpc 로 전송 방식 선택
+# - warm(): 백그라운드 스레드에서 SDK import + 클라이언트 생성을 미리 해 둠 (REPL 입력 대기 중 등)
+import os, sys, threading
+
+_lock = threading.RLock()
+_key = None
+_genai = None
+
+def require_api_key() -> str:
+    # .env 를 읽고 GEMINI_API_KEY 를 확인 (없으면 안내 후 종료); SDK 는 import 하지 않음
+    global _key
+    with _lock:
+        if _key is None:
+            from dotenv import load_dotenv
+            load_dotenv()
+            key = os.getenv("GEMINI_API_KEY")
+            if not key:
+                print("[Error] GEMINI_API_KEY가 없습니다. .env에 넣거나 세션에 설정하세요.", file=sys.stderr)
+                sys.exit(1)
+            _key = key
+        return _key
+
+def genai():
+    # 설정을 마친 google.generativeai 모듈 (첫 호출에서 import + configure)
+    global _genai
+    if _genai is not None:
+        return _genai
+    with _lock:
+        if _genai is None:
+            key = require_api_key()
+            import google.generativeai as sdk
+            kwargs = {"api_key": key}
+            if os.getenv("GEMINI_TRANSPORT"):
+                kwargs["transport"] = os.getenv("GEMINI_TRANSPORT")
+            sdk.configure(**kwargs)
+            _genai = sdk
+        return _genai
+
+def warm():
+    # SDK import 와 generative 클라이언트(연결 풀) 생성을 백그라운드에서 미리
+    def run():
+        try:
+            genai()
+            import google.generativeai.client as client
+            client.get_default_generative_client()
+        except Exception:
+            pass  # 실제 호출 때 다시 시도하고 거기서 오류를 보여줌
+    threading.Thread(target=run, name="gemini-warm", daemon=True).start()
+
+class LazyModel:
+    # genai.GenerativeModel 대역: model_name 은 SDK 없이 알 수 있고, 실제 모델은 첫 호출 때 만듦
+    def __init__(self, model_name, system_instruction=None, **kwargs):
+        self.model_name = model_name if model_name.startswith(("models/", "tunedModels/")) else "models/" + model_name
+        self._name = model_name
+        self._kwargs = dict(kwargs, system_instruction=system_instruction) if system_instruction else kwargs
+        self._model = None
+
+    def _get(self):
+        if self._model is None:
+            with _lock:
+                if self._model is None:
+                    self._model = genai().GenerativeModel(model_name=self._name, **self._kwargs)
+        return self._model
+
+    def generate_content(self, *args, **kwargs):
+        return self._get().generate_content(*args, **kwargs)
+
+    def count_tokens(self, *args, **kwargs):
+        return self._get().count_tokens(*args, **kwargs)
+
+    def start_chat(self, *args, **kwargs):
+        return self._get().start_chat(*args, **kwargs)
+
+def model(model_name, system_instruction=None, **kwargs) -> LazyModel:
+    return LazyModel(model_name, system_instruction, **kwargs)
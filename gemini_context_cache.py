@@ -0,0 +1,59 @@
+# gemini_context_cache.py
+# 공유 프롬프트 접두부(시스템 인스트럭션 + 페르소나 + 참고 문서) 캐싱 (chatbot/03-1-2-2.py --doc)
+# clerk 는 쓰지 않음: 고정 지침 접두부는 API 최소 캐시 크기에 못 미치고, 템플릿 중간에서 자르면 프롬프트가 달라짐
+# - Gemini cached-content API (genai.caching.CachedContent) 로 접두부를 한 번 등록하고
+#   이후 요청은 GenerativeModel.from_cached_content 로 접두부를 참조만 함
+# - 모델이 캐싱을 지원하지 않거나 접두부가 최소 토큰 수보다 작으면 등록이 실패 → 접두부를 그대로 보냄
+# - 캐시/비캐시 토큰은 응답의 usage_metadata.cached_content_token_count 로 확인
+import datetime, hashlib, json, sys, threading
+import gemini_client
+
+def cached_tokens(usage) -> int:
+    return getattr(usage, "cached_content_token_count", 0) or 0
+
+class ContextCache:
+    def __init__(self, ttl_s=3600, limiter=None):
+        self.ttl = datetime.timedelta(seconds=ttl_s)
+        self.limiter = limiter
+        self._entries = {}  # 키 → 캐시된 모델 (등록 실패면 None)
+        self._created = []
+        self._lock = threading.Lock()
+        self.registered = 0
+        self.fallbacks = 0
+
+    def model(self, model_name, system_instruction, contents, display_name=None):
+        # (모델, 시스템 인스트럭션, 접두 contents) 를 한 번만 등록하고 캐시된 모델을 돌려줌
+        # 등록할 수 없으면 None (호출자는 접두부를 요청에 직접 넣음)
+        key = hashlib.sha256(json.dumps([model_name, system_instruction, contents],
+                                        ensure_ascii=False, sort_keys=True).encode("utf-8")).hexdigest()
+        with self._lock:
+            if key in self._entries:
+                return self._entries[key]
+            name = model_name if model_name.startswith("models/") else "models/" + model_name
+            try:
+                genai = gemini_client.genai()
+                create = genai.caching.CachedContent.create
+                kwargs = dict(display_name=display_name, system_instruction=system_instruction,
+                              contents=contents, ttl=self.ttl)
+                cc = (self.limiter.call(create, name, **kwargs) if self.limiter is not None
+                      else create(name, **kwargs))
+                cached = genai.GenerativeModel.from_cached_content(cached_content=cc)
+                self._created.append(cc)
+                self.registered += 1
+            except Exception as e:
+                print(f"[Info] 컨텍스트 캐시 미사용 ({display_name or model_name}): {e}", file=sys.stderr)
+                cached = None
+                self.fallbacks += 1
+            self._entries[key] = cached
+            return cached
+
+    def close(self):
+        # 만든 캐시를 지움 (TTL 전에 저장 비용이 끝나도록)
+        with self._lock:
+            for cc in self._created:
+                try:
+                    cc.delete()
+                except Exception:
+                    pass
+            self._created.clear()
+            self._entries.clear()
@@ -0,0 +1,148 @@
+# gemini_rate_limit.py
+# Gemini 호출 공용 레이트 리미터 (chatbot/, clerk/ 스크립트 공용)
+# - RPM / TPM 토큰 버킷: 호출 직전에 acquire() 로 쿼터 안에서 간격 조절
+# - 429/500/503: 지수 백오프 + 지터, Retry-After(retry_delay) 우선
+# - 429 이면 리미터 전체를 잠시 멈춰 동시 요청이 한꺼번에 다시 몰리지 않게 함
+# - 재시도 예산: 성공할 때마다 조금씩 쌓이고 재시도마다 1씩 소모 (재시도 폭주 방지)
+import os, random, re, sys, threading, time
+
+RETRY_STATUSES = {429, 500, 503}
+_RETRY_AFTER_RES = [
+    re.compile(r'retry_delay\s*\{\s*seconds:\s*(\d+)'),
+    re.compile(r'retry in\s+(\d+(?:\.\d+)?)\s*s', re.IGNORECASE),
+]
+_API_ERRORS = None
+
+def _api_errors():
+    # google.api_core 재시도 대상 예외 → 상태 코드 (처음 쓸 때 import, 없으면 빈 목록)
+    global _API_ERRORS
+    if _API_ERRORS is None:
+        try:
+            from google.api_core import exceptions as gexc
+            _API_ERRORS = [(gexc.ResourceExhausted, 429), (gexc.TooManyRequests, 429),
+                           (gexc.InternalServerError, 500), (gexc.ServiceUnavailable, 503)]
+        except ImportError:
+            _API_ERRORS = []
+    return _API_ERRORS
+
+def error_status(e: Exception):
+    # google.api_core 예외는 .code 에 HTTP 상태 코드를 담고 있음
+    # 메시지 문자열은 보지 않음 (파일 이름/본문에 "500" 이 들어간 일반 예외까지 재시도하지 않게)
+    code = getattr(e, "code", None)
+    if isinstance(code, int):
+        return code
+    for cls, status in _api_errors():
+        if isinstance(e, cls):
+            return status
+    return None
+
+def retry_after(e: Exception):
+    # Retry-After 헤더 / retry_after 속성 / 메시지의 retry_delay 순으로 확인 (초)
+    value = getattr(e, "retry_after", None)
+    if value is None:
+        headers = getattr(getattr(e, "response", None), "headers", None) or {}
+        value = headers.get("Retry-After")
+    if value is not None:
+        try:
+            return float(value)
+        except (TypeError, ValueError):
+            pass
+    msg = str(e)
+    for rx in _RETRY_AFTER_RES:
+        m = rx.search(msg)
+        if m:
+            return float(m.group(1))
+    return None
+
+class TokenBucket:
+    # 예약 방식: 부족하면 잔량이 음수가 되고 그만큼 기다림 (큰 요청도 언젠가는 통과)
+    def __init__(self, per_minute: float, capacity=None):
+        self.rate = per_minute / 60.0
+        self.capacity = capacity if capacity is not None else max(1.0, self.rate)  # 약 1초 분량
+        self.level = self.capacity
+        self.stamp = time.monotonic()
+
+    def reserve(self, n: float, now: float) -> float:
+        self.level = min(self.capacity, self.level + (now - self.stamp) * self.rate)
+        self.stamp = now
+        self.level -= n
+        return 0.0 if self.level >= 0 else -self.level / self.rate
+
+class RateLimiter:
+    def __init__(self, rpm=0, tpm=0, max_retries=5, base_delay=1.0, max_delay=60.0,
+                 retry_budget=10.0, retry_ratio=0.1):
+        self.rpm_bucket = TokenBucket(rpm) if rpm else None
+        self.tpm_bucket = TokenBucket(tpm, capacity=max(1.0, tpm / 60.0)) if tpm else None
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.budget_cap = retry_budget
+        self.budget = retry_budget
+        self.retry_ratio = retry_ratio
+        self.requests = 0
+        self.retries = 0
+        self.throttled = 0
+        self._cooldown_until = 0.0
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls, **kwargs):
+        # GEMINI_RPM / GEMINI_TPM / GEMINI_MAX_RETRIES (없으면 쿼터 조절 없이 재시도만)
+        kwargs.setdefault("rpm", int(os.getenv("GEMINI_RPM", "0") or 0))
+        kwargs.setdefault("tpm", int(os.getenv("GEMINI_TPM", "0") or 0))
+        kwargs.setdefault("max_retries", int(os.getenv("GEMINI_MAX_RETRIES", "5") or 5))
+        return cls(**kwargs)
+
+    def acquire(self, tokens=0):
+        with self._lock:
+            now = time.monotonic()
+            wait = max(0.0, self._cooldown_until - now)
+            if self.rpm_bucket:
+                wait = max(wait, self.rpm_bucket.reserve(1, now))
+            if self.tpm_bucket and tokens:
+                wait = max(wait, self.tpm_bucket.reserve(tokens, now))
+        if wait > 0:
+            time.sleep(wait)
+
+    def _backoff(self, attempt: int, hint):
+        delay = random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+        if hint is not None:
+            delay = min(self.max_delay, hint) + random.uniform(0, self.base_delay)
+        return delay
+
+    def _spend_retry(self) -> bool:
+        with self._lock:
+            if self.budget < 1.0:
+                return False
+            self.budget -= 1.0
+            self.retries += 1
+            return True
+
+    def call(self, fn, *args, tokens=0, on_retry=None, **kwargs):
+        # fn(*args, **kwargs) 를 쿼터 안에서 호출하고, 일시적 오류는 백오프 후 재시도
+        # on_retry(status, delay): 재시도할 때마다 호출 (호출자별 계측용)
+        attempt = 0
+        while True:
+            self.acquire(tokens)
+            try:
+                result = fn(*args, **kwargs)
+            except Exception as e:
+                status = error_status(e)
+                if status not in RETRY_STATUSES or attempt >= self.max_retries or not self._spend_retry():
+                    raise
+                delay = self._backoff(attempt, retry_after(e))
+                if status == 429:
+                    with self._lock:
+                        self.throttled += 1
+                        self._cooldown_until = max(self._cooldown_until, time.monotonic() + delay)
+                attempt += 1
+                if on_retry is not None:
+                    on_retry(status, delay)
+                print(f"[Warn] {status} 응답: {delay:.1f}초 후 재시도 ({attempt}/{self.max_retries})",
+                      file=sys.stderr)
+                time.sleep(delay)
+                continue
+            with self._lock:
+                self.requests += 1
+                self.budget = min(self.budget_cap, self.budget + self.retry_ratio)
+            return result
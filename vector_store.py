@@ -0,0 +1,178 @@
+# vector_store.py
+# output/ 전체 청크의 임베딩 저장소 (문서 간 의미 검색)
+# - vectors.f32: 단위 길이로 정규화한 float32 행렬을 덧붙이기만 함 (행 번호 = 바이트 오프셋 / (dim * 4))
+#   np.memmap 으로 열어 시작할 때 전체를 읽지 않음; 질의는 행렬 × 벡터 한 번 + argpartition 상위 k
+# - rows.sqlite3: 행 번호 → (내용 해시, 문서, 청크 번호, 본문) 사이드카 테이블 + 모델/차원 메타
+# - 같은 내용(sha256)의 청크는 한 번만 임베딩 → 같은 논문을 다시 넣으면 API 호출 없음
+# - 임베딩은 batchEmbedContents 최대 크기(EMBED_BATCH)로 묶어 요청 (chunk_index.gemini_embedder)
+# 예) python vector_store.py ingest output/ --model models/text-embedding-004
+#     python vector_store.py search "tokenizer vocabulary size" -k 5
+# 질의 지연은 행 수 × 차원에 비례 (단일 코어 기준 5만 × 256차원 ≈ 3 ms, 3만 × 768차원 ≈ 9 ms)
+import argparse, hashlib, os, pathlib, sqlite3, sys, threading, time
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+def content_hash(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+class VectorStore:
+    def __init__(self, path, model):
+        if np is None:
+            raise RuntimeError("vector_store 는 NumPy 가 필요합니다 (pip install numpy)")
+        self.path = pathlib.Path(path)
+        self.path.mkdir(parents=True, exist_ok=True)
+        self.model = model
+        self.vec_file = self.path / "vectors.f32"
+        self.embedded = 0  # 이번 실행에서 실제로 임베딩한 청크 수 (나머지는 해시로 재사용)
+        self.reused = 0
+        # 배치 모드에서 여러 문서 스레드가 같이 쓰므로 연결 하나를 락으로 보호
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(str(self.path / "rows.sqlite3"), check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL)")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS rows ("
+            " row INTEGER PRIMARY KEY, hash TEXT NOT NULL UNIQUE, doc TEXT NOT NULL,"
+            " chunk INTEGER NOT NULL, text TEXT NOT NULL)"
+        )
+        self._db.commit()
+        meta = dict(self._db.execute("SELECT key, value FROM meta").fetchall())
+        if meta.get("model", model) != model:
+            raise ValueError(f"{self.path} 는 {meta['model']} 임베딩 저장소입니다 (요청: {model})")
+        self.dim = int(meta["dim"]) if "dim" in meta else None
+        self.rows = self._db.execute("SELECT COALESCE(MAX(row) + 1, 0) FROM rows").fetchone()[0]
+        self._matrix = None
+        self._remap()
+
+    def _remap(self):
+        # 커밋된 행까지만 매핑 (기록 도중 끊겨 남은 꼬리 바이트는 무시, 다음 append 때 잘라냄)
+        self._matrix = (np.memmap(self.vec_file, dtype=np.float32, mode="r", shape=(self.rows, self.dim))
+                        if self.rows else None)
+
+    def __len__(self):
+        return self.rows
+
+    def lookup(self, hashes) -> dict:
+        # 내용 해시 → 행 번호 (이미 임베딩된 것만)
+        found = {}
+        hashes = list(hashes)
+        for s in range(0, len(hashes), 500):
+            part = hashes[s:s + 500]
+            found.update(self._db.execute(
+                f"SELECT hash, row FROM rows WHERE hash IN ({','.join('?' * len(part))})", part).fetchall())
+        return found
+
+    def add(self, doc, chunks, embed):
+        # 청크 목록을 넣고 각 청크의 행 번호를 돌려줌 (새 내용만 embed(texts) 로 임베딩해 덧붙임)
+        # 임베딩(네트워크)은 락 밖에서: 조회 → 임베딩 → 다시 락을 잡고 그 사이 다른 스레드가 넣은 것은 빼고 기록
+        hashes = [content_hash(c) for c in chunks]
+        with self._lock:
+            rows = self.lookup(hashes)
+        new, seen = [], set()
+        for i, h in enumerate(hashes):
+            if h not in rows and h not in seen:
+                new.append(i)
+                seen.add(h)
+        vecs = None
+        if new:
+            vecs = np.asarray(embed([chunks[i] for i in new]), dtype=np.float32)
+            vecs /= np.linalg.norm(vecs, axis=1, keepdims=True) + 1e-9
+        with self._lock:
+            if new:
+                rows.update(self.lookup([hashes[i] for i in new]))
+                keep = [n for n, i in enumerate(new) if hashes[i] not in rows]
+                new, vecs = [new[n] for n in keep], vecs[keep]
+            self.reused += len(chunks) - len(new)
+            if new:
+                self.check_dim(vecs.shape[1])
+                if self.dim is None:
+                    self.dim = vecs.shape[1]
+                    self._db.execute("INSERT OR REPLACE INTO meta(key, value) VALUES ('model', ?), ('dim', ?)",
+                                     (self.model, str(self.dim)))
+                with self.vec_file.open("ab") as f:
+                    f.truncate(self.rows * self.dim * 4)
+                    f.write(vecs.tobytes())
+                    f.flush()
+                    os.fsync(f.fileno())
+                self._db.executemany(
+                    "INSERT INTO rows(row, hash, doc, chunk, text) VALUES (?, ?, ?, ?, ?)",
+                    ((self.rows + n, hashes[i], doc, i, chunks[i]) for n, i in enumerate(new)))
+                self._db.commit()
+                for n, i in enumerate(new):
+                    rows[hashes[i]] = self.rows + n
+                self.rows += len(new)
+                self.embedded += len(new)
+                self._remap()
+        return [rows[h] for h in hashes]
+
+    def check_dim(self, dim):
+        # 저장소와 다른 차원(--embed-dim 변경 등)은 API 를 부르기 전에 거절
+        if dim is not None and self.dim is not None and dim != self.dim:
+            raise ValueError(f"{self.path} 는 {self.dim}차원 저장소입니다 (요청: {dim}차원)")
+
+    def vectors(self, rows):
+        return np.asarray(self._matrix[rows])
+
+    def search(self, query_vec, k=5) -> list:
+        # 코사인 상위 k개 [(점수, 문서, 청크 번호, 본문)]
+        if self._matrix is None:
+            return []
+        q = np.asarray(query_vec, dtype=np.float32)
+        scores = self._matrix @ (q / (np.linalg.norm(q) + 1e-9))
+        k = min(k, len(scores))
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        out = []
+        for r in top.tolist():
+            doc, chunk, text = self._db.execute("SELECT doc, chunk, text FROM rows WHERE row=?", (r,)).fetchone()
+            out.append((float(scores[r]), doc, chunk, text))
+        return out
+
+    def close(self):
+        with self._lock:
+            self._matrix = None
+            self._db.close()
+
+def main():
+    import gemini_client
+    from chunk_index import gemini_embedder
+    from chunk_store import read_chunks
+
+    parser = argparse.ArgumentParser(description="Embed clerk chunks into a shared vector store and search it")
+    parser.add_argument("--store", default="output/vectors", help="Vector store directory")
+    parser.add_argument("--model", default="models/text-embedding-004", help="Embedding model")
+    parser.add_argument("--dim", type=int, default=None, help="output_dimensionality (e.g. 256)")
+    sub = parser.add_subparsers(dest="cmd", required=True)
+    ingest = sub.add_parser("ingest", help="Embed every <stem>.chunks store in a directory")
+    ingest.add_argument("outdir", nargs="?", default="output")
+    search = sub.add_parser("search", help="Top-k chunks across all ingested documents")
+    search.add_argument("query")
+    search.add_argument("-k", type=int, default=5)
+    args = parser.parse_args()
+
+    gemini_client.require_api_key()
+    store = VectorStore(args.store, args.model)
+    embed = gemini_embedder(args.model, dim=args.dim or store.dim)
+    try:
+        if args.cmd == "ingest":
+            t0 = time.perf_counter()
+            files = sorted(pathlib.Path(args.outdir).glob("*.chunks.idx"))
+            for path in files:
+                store.add(path.name[:-len(".chunks.idx")], read_chunks(path.with_suffix("")), embed)
+            print(f"Ingested {len(files)} documents in {time.perf_counter() - t0:.2f}s: "
+                  f"{store.embedded} embedded, {store.reused} reused | {len(store)} vectors ({store.path})")
+        else:
+            q = embed([args.query], task="retrieval_query")[0]
+            t0 = time.perf_counter()
+            hits = store.search(q, k=args.k)
+            print(f"Top {len(hits)} of {len(store)} chunks ({(time.perf_counter() - t0) * 1000:.2f} ms)")
+            for score, doc, chunk, text in hits:
+                print(f"\n[{score:.3f}] {doc} #{chunk + 1}\n{text[:300]}")
+    finally:
+        store.close()
+
+if __name__ == "__main__":
+    sys.exit(main())